@@ -0,0 +1,309 @@
+"""选中公司的增量汇总
+
+SelectionAggregator 维护选中公司的各类计数器。选中或取消一个公司时只按
+该公司的字段做加减，不再遍历整个选择；render 生成带标签的文本片段，
+可以用一次 Text.insert 写入。
+
+繁荣效果按修正矩阵累加数值，显示真实的合计效果（如 +15%畜牧场吞吐量），
+无法解析的条目仍按原文计数。
+
+计数器的键是公司模型中的名称ID，只在显示时换回名称；设置了 locale 时，
+render 显示的是该语言的文字，to_dict 仍输出内部ID。
+
+SummaryCache 按 (选择的位集, 数据版本) 缓存汇总结果，切换方案或反复勾选
+同一个公司时直接取用。
+"""
+
+from collections import Counter, OrderedDict
+
+from company_model import FIELD_TABLES, LIST_FIELDS, SINGLE_FIELDS
+from company_modifiers import ModifierMatrix, parse_modifier
+
+
+# 缓存的汇总结果数
+SUMMARY_CACHE_SIZE = 64
+
+
+class SummaryCache:
+    """汇总结果的 LRU，键是 (选择的位集, 数据版本)，见 CompanyRepository.selection_mask"""
+
+    def __init__(self, size=SUMMARY_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def company_items(record, unparsed_bonuses=None):
+    """提取公司记录参与汇总的名称ID
+
+    传入 unparsed_bonuses 时，繁荣字段只保留这些无法解析的条目。
+    """
+    singles = []
+    for field in SINGLE_FIELDS:
+        for vid in record.value_ids(field):
+            singles.append((field, vid))
+
+    lists = []
+    for field in LIST_FIELDS:
+        if field == "繁荣" and unparsed_bonuses is not None:
+            lists.append((field, unparsed_bonuses))
+        elif record.value_ids(field):
+            lists.append((field, record.value_ids(field)))
+
+    return singles, lists, record.special_luxury
+
+
+class SelectionAggregator:
+    """选中公司的运行计数器，company_data 是 CompanyModel"""
+
+    def __init__(self, company_data, modifiers=None):
+        self.company_data = company_data
+        self.modifiers = modifiers or ModifierMatrix(company_data)
+        self.selected = set()
+        self.counters = {field: Counter() for field in SINGLE_FIELDS + LIST_FIELDS}
+        self.special_luxuries = 0
+        self.modifier_sums, self.modifier_counts = self.modifiers.empty_totals()
+        # 建立条件（company_eligibility.EligibilityMask），设置后汇总中列出
+        # 选中公司里无法建立的公司及其缺少的条件
+        self.eligibility = None
+        # 显示语言（company_locale.Locale），None 表示直接显示内部ID
+        self.locale = None
+        self._items = {}
+
+    def _get_items(self, company):
+        """取得（并缓存）公司的汇总字段"""
+        items = self._items.get(company)
+        if items is None:
+            items = company_items(
+                self.company_data.record(company),
+                self.modifiers.unparsed.get(company, []),
+            )
+            items += (self.modifiers.row(company),)
+            self._items[company] = items
+        return items
+
+    def _apply(self, company, delta):
+        """把一个公司的字段按 delta(+1/-1) 计入计数器"""
+        singles, lists, special, modifier_row = self._get_items(company)
+        counters = self.counters
+        for field, value in singles:
+            self._bump(counters[field], value, delta)
+        for field, values in lists:
+            counter = counters[field]
+            for value in values:
+                self._bump(counter, value, delta)
+        if special:
+            self.special_luxuries += delta
+        sums, counts = self.modifier_sums, self.modifier_counts
+        # 热重载可能新增修正列
+        missing = len(self.modifiers.columns) - len(sums)
+        if missing > 0:
+            sums.extend([0.0] * missing)
+            counts.extend([0] * missing)
+        for col, value in modifier_row:
+            sums[col] += delta * value
+            counts[col] += delta
+
+    @staticmethod
+    def _bump(counter, key, delta):
+        count = counter[key] + delta
+        if count:
+            counter[key] = count
+        else:
+            del counter[key]
+
+    def add(self, company):
+        """选中一个公司"""
+        if company not in self.selected and company in self.company_data:
+            self.selected.add(company)
+            self._apply(company, 1)
+
+    def remove(self, company):
+        """取消选中一个公司"""
+        if company in self.selected:
+            self.selected.discard(company)
+            self._apply(company, -1)
+
+    def forget(self, company):
+        """丢弃公司的缓存字段（公司数据被修改后调用）"""
+        self._items.pop(company, None)
+
+    def set_selection(self, companies):
+        """切换到新的选择，只对差异部分做增减"""
+        companies = set(companies)
+        if len(companies) < len(self.selected - companies):
+            # 大量取消时从零开始累加更快
+            self.clear()
+        for company in self.selected - companies:
+            self.remove(company)
+        for company in companies - self.selected:
+            self.add(company)
+
+    def clear(self):
+        """清空选择"""
+        self.selected.clear()
+        for counter in self.counters.values():
+            counter.clear()
+        self.special_luxuries = 0
+        self.modifier_sums, self.modifier_counts = self.modifiers.empty_totals()
+
+    def names(self, field):
+        """返回字段中出现过的名称，按名称排序"""
+        names = self.company_data.table(field).names
+        return sorted(names[vid] for vid in self.counters[field])
+
+    def counts(self, field):
+        """返回 [(名称, 公司数)]，按公司数排序，次数相同按名称"""
+        names = self.company_data.table(field).names
+        items = [(names[vid], count) for vid, count in self.counters[field].items()]
+        items.sort(key=lambda x: (-x[1], x[0]))
+        return items
+
+    def to_dict(self):
+        """把汇总结果转为可写入JSON的字典"""
+
+        def by_count(field):
+            items = self.counts(field)
+            return [{"name": name, "count": count} for name, count in items]
+
+        modifiers = self.modifiers.format_totals(
+            self.modifier_sums, self.modifier_counts
+        )
+        return {
+            "count": len(self.selected),
+            "techs": self.names("科技"),
+            "regions": self.names("地块"),
+            "buildings": by_count("建筑"),
+            "optional_buildings": by_count("建筑_可选"),
+            "modifiers": [
+                {"effect": effect, "count": count} for effect, count in modifiers
+            ],
+            "unparsed_bonuses": by_count("繁荣"),
+            "luxuries": self.names("名贵"),
+            "special_luxuries": self.special_luxuries,
+            "companies": sorted(self.selected),
+            "blocked": {
+                company: self.eligibility.reasons(company)
+                for company in self.blocked()
+            },
+        }
+
+    def blocked(self):
+        """选中公司中在当前建立条件下无法建立的公司，按名称排序"""
+        if self.eligibility is None:
+            return []
+        return [c for c in sorted(self.selected) if c not in self.eligibility]
+
+    def render(self, icons=None):
+        """生成汇总文本，返回 [(文本, 标签), ...]
+
+        传入列表 icons 时，向其中追加可以显示图标的行 (行号, 图标种类, 名称)，
+        行号从1开始，与 Text 组件的行号一致。
+        """
+        if not self.selected:
+            return [("请从左侧选择公司查看信息", ())]
+
+        counters = self.counters
+        locale = self.locale
+
+        def display(kind, name):
+            return name if locale is None else locale.text(kind, name)
+
+        segments = [(f"# 公司信息汇总 ({len(self.selected)} 个公司) \n", "h1")]
+        body = ["\n"]
+
+        def section(title, lines, kind=None, names=()):
+            segments.append(("".join(body), ()))
+            body.clear()
+            if icons is not None and kind is not None:
+                # 标题在下一行，条目从标题的下一行开始
+                first = sum(text.count("\n") for text, _ in segments) + 2
+                icons.extend(
+                    (first + k, kind, name)
+                    for k, name in enumerate(names)
+                    if name is not None
+                )
+            segments.append((f"## {title}\n", "h2"))
+            body.extend(lines)
+            body.append("\n")
+
+        # 科技、地块、名贵按名称排序，建筑和繁荣按出现次数排序（次数相同按名称）
+        for field, title in (("科技", "所需科技"), ("地块", "所需地块")):
+            if counters[field]:
+                kind = FIELD_TABLES[field]
+                lines = [f"- {display(kind, value)}\n" for value in self.names(field)]
+                section(title, lines)
+
+        for field, title in (("建筑", "基础建筑"), ("建筑_可选", "可选建筑")):
+            if counters[field]:
+                counts = self.counts(field)
+                section(
+                    title,
+                    [
+                        f"- {display('buildings', value)} ({count}个公司)\n"
+                        for value, count in counts
+                    ],
+                    "buildings",
+                    [value for value, _ in counts],
+                )
+
+        # 繁荣效果：先列出合计后的修正，再列出无法解析的原文
+        bonuses = self.modifiers.format_totals(self.modifier_sums, self.modifier_counts)
+        bonuses += self.counts("繁荣")
+        if bonuses:
+            modifiers = [parse_modifier(bonus) for bonus, _ in bonuses]
+            section(
+                "繁荣效果合计",
+                [
+                    f"- {display('modifiers', bonus)} ({count}个公司)\n"
+                    for bonus, count in bonuses
+                ],
+                "modifiers",
+                [None if m is None else m.target for m in modifiers],
+            )
+
+        if counters["名贵"]:
+            lines = [f"- {display('goods', value)}\n" for value in self.names("名贵")]
+            section("名贵商品", lines)
+
+        # 显示特殊名贵数量
+        if self.special_luxuries > 0:
+            segments.append(("".join(body), ()))
+            body.clear()
+            segments.append((f"## 特殊名贵商品数量: {self.special_luxuries}\n", "h2"))
+            body.append("\n")
+
+        blocked = self.blocked()
+        if blocked:
+            section(
+                f"无法建立的公司 ({len(blocked)}个)",
+                [
+                    f"- {display('companies', company)}："
+                    f"缺少 {'、'.join(self.eligibility.reasons(company))}\n"
+                    for company in blocked
+                ],
+            )
+
+        lines = [f"- {display('companies', name)}\n" for name in sorted(self.selected)]
+        section("选中的公司", lines)
+        body.pop()
+        segments.append(("".join(body), ()))
+        return segments
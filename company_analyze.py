@@ -1,13 +1,123 @@
+import argparse
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk, scrolledtext, font
-import configparser
-import json
-import os
+from tkinter import ttk, scrolledtext, font, filedialog
+
+from company_aggregate import SummaryCache
+from company_core import CompanyRepository
+from company_data import DEFAULT_INI_PATH
+from company_export import FORMATS
+from company_eligibility import ANY_CONDITIONS, Conditions, load_tech_graph
+from company_icons import DEFAULT_ATLAS_PATH, open_icon_cache
+from company_layers import LayerStack
+from company_layout import LayoutManager
+from company_locale import DEFAULT_LOCALE_PATH, Locale, open_locale_store
+from company_model import FIELD_SLOTS, FIELD_TABLES, LIST_FIELDS, SINGLE_FIELDS
+from company_optimizer import parse_weights
+from company_presets import DEFAULT_PRESETS_PATH, PresetStore, compare_selections
+from company_profile import HandlerProfiler, StartupTimeline, timeline_phase
+from company_save import load_localization, match_save, read_save
+from company_search import SearchScheduler
+from company_watch import FileWatcher
+
+# 列表行之间的间距（像素）
+ROW_PADDING = 5
+
+# 搜索防抖延迟（毫秒），输入停顿这么久之后才开始搜索
+SEARCH_DEBOUNCE_MS = 150
+
+# 启动时分片填充列表，每一帧最多占用的时间（毫秒）
+FRAME_BUDGET_MS = 8
+
+# 等待后台读取数据时轮询的间隔（毫秒）
+LOAD_POLL_MS = 10
+
+# 汇总中图标的可选高度（像素），Ctrl+= / Ctrl+- 切换
+SUMMARY_ICON_SIZES = (16, 24, 32)
+
+# 检查数据文件是否被修改的间隔（毫秒）
+WATCH_INTERVAL_MS = 1000
+
+# 启用插桩时记录的热点处理函数
+PROFILED_HANDLERS = (
+    "on_search_change",
+    "on_company_select",
+    "on_frame_configure",
+    "_update_scrollregion",
+    "on_canvas_configure",
+    "_on_mousewheel_global",
+    "_on_canvas_yscroll",
+    "render_visible_rows",
+)
+
+# 性能叠加层的刷新间隔（毫秒）
+PROFILE_OVERLAY_MS = 500
 
 class CompanyAnalyzer:
-    def __init__(self, root):
+    def __init__(
+        self,
+        root,
+        timeline=None,
+        frame_budget_ms=FRAME_BUDGET_MS,
+        profiler=None,
+        overlays=(),
+        save_path=None,
+        save_country=None,
+        game_dir=None,
+        localization=(),
+        icons_path=None,
+        locales_path=None,
+        language=None,
+        presets_path=None,
+    ):
         # 设置中文字体支持
         self.root = root
+        # 图标图集：文件不存在时不显示图标
+        self.icons = open_icon_cache(icons_path or DEFAULT_ATLAS_PATH, master=root)
+        self.row_icon_size = font.Font(root, font=("SimHei", 10, "bold")).metrics(
+            "linespace"
+        )
+        self.summary_icon_size = SUMMARY_ICON_SIZES[0]
+        # 汇总中需要图标的行 [(行号, 种类, 名称)]，以及已经插入图标的行
+        self._summary_icons = []
+        self._summary_placed = set()
+        # 插入到汇总中的图片，Text 组件本身不持有引用
+        self._summary_images = []
+        # 显示语言：文字表文件不存在时只有 company.ini 的文字
+        self.locales = open_locale_store(locales_path or DEFAULT_LOCALE_PATH)
+        self.locale = Locale()
+        if language and self.locales is not None:
+            self.locale = self.locales.load(language)
+        # 保存的公司组合方案，以及按 (选择的位集, 数据版本) 缓存的汇总文本
+        self.presets = PresetStore(presets_path or DEFAULT_PRESETS_PATH)
+        self._render_cache = SummaryCache()
+        # 叠加在 company.ini 之上的覆盖层文件或目录
+        self.overlays = list(overlays)
+        # 存档：启动时读取的存档，以及把脚本键转为名称的本地化来源
+        self.save_path = save_path
+        self.save_country = save_country
+        self.game_dir = game_dir
+        self.localization_paths = list(localization)
+        self._localization = None
+        self.save_match = None
+        # 当前的建立条件（EligibilityMask），None 表示不限制
+        self.eligibility = None
+        self.timeline = timeline
+        self.frame_budget_ms = frame_budget_ms
+        # 插桩必须在绑定事件之前完成，绑定才会指向包装后的方法
+        self.profiler = profiler
+        self.profile_overlay = None
+        if profiler is not None:
+            profiler.instrument(self, PROFILED_HANDLERS)
+        self.repository = CompanyRepository()
+        # 正在运行的后台任务数，热重载要等它们结束后才修改数据
+        self._background_jobs = 0
+        self.company_data = self.repository.company_data
+        self._slice_id = None
+        # 滚动区域几何缓存、滚轮合并和延迟布局
+        self.layout = LayoutManager(root)
+        self.layout.watch_toplevel(root)
         self.root.title("哈气治国-公司分析器")
         self.root.geometry("1000x700")
 
@@ -34,17 +144,20 @@ class CompanyAnalyzer:
         )
         self.paned_window.add(self.right_frame, weight=2)
 
-        # 创建滚动条和公司列表
-        self.create_company_list()
+        with timeline_phase(timeline, "shell"):
+            # 创建滚动条和公司列表
+            self.create_company_list()
 
-        # 创建信息显示区域
-        self.create_info_display()
+            # 创建信息显示区域
+            self.create_info_display()
 
-        # 读取公司数据
-        self.read_company_data()
+        if profiler is not None:
+            # F12 切换性能叠加层
+            self.root.bind("<F12>", lambda e: self.toggle_profile_overlay())
 
-        # 添加公司到列表
-        self.populate_company_list()
+        # 窗口先显示出来，公司数据在后台线程读取，完成后分片填充列表
+        self.show_message("正在读取公司数据...")
+        self.load_data_async()
 
     def create_company_list(self):
         """创建公司列表、滚动条和搜索框"""
@@ -52,6 +165,22 @@ class CompanyAnalyzer:
         self.search_frame = ttk.Frame(self.left_frame)
         self.search_frame.pack(fill=tk.X, padx=5, pady=5)
 
+        # 显示语言，只在有文字表文件时出现
+        self.language_var = tk.StringVar(value=self.locale.language)
+        if self.locales is not None:
+            language_box = ttk.Combobox(
+                self.search_frame,
+                textvariable=self.language_var,
+                values=self.locales.languages(),
+                state="readonly",
+                width=5,
+            )
+            language_box.pack(side=tk.RIGHT, padx=(5, 0))
+            language_box.bind(
+                "<<ComboboxSelected>>",
+                lambda e: self.set_locale(self.language_var.get()),
+            )
+
         # 搜索框容器
         self.search_container = ttk.Frame(self.search_frame)
         self.search_container.pack(side=tk.LEFT, fill=tk.X, expand=True)
@@ -85,37 +214,81 @@ class CompanyAnalyzer:
         self.search_entry.bind("<FocusIn>", lambda e: self.search_hint.place_forget())
         self.search_entry.bind("<FocusOut>", lambda e: self._show_search_hint())
 
+        # 批量选择按钮
+        self.selection_frame = ttk.Frame(self.left_frame)
+        self.selection_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        for text, command in (
+            ("全选", self.select_all),
+            ("反选", self.invert_selection),
+            ("清空", self.clear_selection),
+            ("最优组合...", self.open_optimizer),
+            ("公司关系...", self.open_synergy),
+            ("方案...", self.open_presets),
+            ("导出...", self.open_export),
+        ):
+            ttk.Button(self.selection_frame, text=text, command=command).pack(
+                side=tk.LEFT, padx=(0, 5)
+            )
+
+        # 存档：已建立的公司预先选中，无法建立的显示为灰色
+        self.save_frame = ttk.Frame(self.left_frame)
+        self.save_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        for text, command in (
+            ("读取存档...", self.open_save),
+            ("建立条件...", self.open_eligibility),
+        ):
+            ttk.Button(self.save_frame, text=text, command=command).pack(
+                side=tk.LEFT, padx=(0, 5)
+            )
+        self.only_available_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.save_frame,
+            text="只显示可建立的公司",
+            variable=self.only_available_var,
+            command=lambda: self.filter_companies(self.search_var.get()),
+        ).pack(side=tk.LEFT, padx=(0, 5))
+        self.save_label = ttk.Label(self.save_frame, text="")
+        self.save_label.pack(side=tk.LEFT)
+
         # 创建滚动条
         self.scrollbar = ttk.Scrollbar(self.left_frame)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # 创建Canvas来放置公司列表，支持滚动
-        self.canvas = tk.Canvas(self.left_frame, yscrollcommand=self.scrollbar.set)
+        # 列表是虚拟化的：只有视口内的行才绑定到真实组件，滚动时回收复用
+        self.canvas = tk.Canvas(self.left_frame, yscrollcommand=self._on_canvas_yscroll)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         self.scrollbar.config(command=self.canvas.yview)
+        self.layout.add_region(self.canvas)
 
-        # 创建框架来放置复选框
-        self.checkbox_frame = ttk.Frame(self.canvas)
-        self.canvas_frame = self.canvas.create_window(
-            (0, 0), window=self.checkbox_frame, anchor="nw"
-        )
-
-        # 绑定事件，当框架大小改变时更新Canvas的滚动区域
-        self.checkbox_frame.bind("<Configure>", self.on_frame_configure)
-        self.canvas.bind("<Configure>", self.on_canvas_configure)
+        # 绑定事件，当Canvas大小改变时调整行宽并重新绑定可见行；
+        # 追加绑定，保留 add_region 中使几何缓存失效的绑定
+        self.canvas.bind("<Configure>", self.on_canvas_configure, add="+")
 
         # 这将通过鼠标位置判断来处理不同区域的滚动
         self.root.bind_all("<MouseWheel>", self._on_mousewheel_global)
 
-        # 存储复选框和标签的变量
-        self.check_vars = {}
-        self.company_frames = {}
-        self.company_info_widgets = {}
+        # 后台搜索调度器，在读取数据后创建
+        self.search_scheduler = None
+
+        # 列表的数据模型：当前显示的公司、选中的公司、行文本缓存
+        self.all_companies = []
+        self.visible_companies = []
+        self.selected_companies = set()
+        self.unavailable_companies = set()
+        self.row_texts = {}
+
+        # 复用的行组件池
+        self.row_pool = []
+        self.row_height = 0
+        self.canvas_width = 1
 
         # 创建表头
-        header_frame = ttk.Frame(self.checkbox_frame)
-        header_frame.pack(fill=tk.X, padx=5, pady=5)
+        header_frame = ttk.Frame(self.canvas)
+        self.header_item = self.canvas.create_window(
+            ROW_PADDING, ROW_PADDING, window=header_frame, anchor="nw"
+        )
 
         ttk.Label(header_frame, text="选择", font=("SimHei", 10, "bold")).grid(
             row=0, column=0, sticky="w", padx=5
@@ -123,39 +296,19 @@ class CompanyAnalyzer:
         ttk.Label(header_frame, text="公司信息", font=("SimHei", 10, "bold")).grid(
             row=0, column=1, sticky="w", padx=5
         )
+        header_frame.update_idletasks()
+        self.header_height = header_frame.winfo_reqheight() + 2 * ROW_PADDING
 
     def _on_mousewheel_global(self, event):
         """全局鼠标滚轮事件处理，根据鼠标位置决定滚动哪个区域"""
-        # 获取鼠标位置
-        x, y = self.root.winfo_pointerxy()
-        
-        # 检查鼠标是否在左侧Canvas区域
-        canvas_x = self.canvas.winfo_rootx()
-        canvas_y = self.canvas.winfo_rooty()
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        
-        # 检查鼠标是否在右侧文本区域
-        text_x = self.info_text.winfo_rootx()
-        text_y = self.info_text.winfo_rooty()
-        text_width = self.info_text.winfo_width()
-        text_height = self.info_text.winfo_height()
-        
-        # 如果鼠标在左侧Canvas区域，滚动左侧列表
-        if (canvas_x <= x < canvas_x + canvas_width and 
-            canvas_y <= y < canvas_y + canvas_height):
-            self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-            # 返回break阻止事件冒泡到其他组件
-            return "break"
-        # 如果鼠标在右侧文本区域，滚动右侧信息汇总
-        elif (text_x <= x < text_x + text_width and 
-              text_y <= y < text_y + text_height):
-            self.info_text.yview_scroll(int(-1 * (event.delta / 120)), "units")
-            # 返回break阻止事件冒泡到其他组件
-            return "break"
-        
-        # 如果鼠标不在任何滚动区域，让事件正常传播
-        return None
+        # 命中判断使用缓存的区域几何，滚动量合并后每帧执行一次
+        region = self.layout.region_at(event.x_root, event.y_root)
+        if region is None:
+            # 如果鼠标不在任何滚动区域，让事件正常传播
+            return None
+        self.layout.scroll(region, -event.delta / 120)
+        # 返回break阻止事件冒泡到其他组件
+        return "break"
 
     def create_info_display(self):
         """创建信息显示区域"""
@@ -164,325 +317,1206 @@ class CompanyAnalyzer:
             self.right_frame, wrap=tk.WORD, width=60, height=30
         )
         self.info_text.pack(fill=tk.BOTH, expand=True)
+        self.layout.add_region(self.info_text)
+        # 图标只插入到滚动进视口的汇总行中
+        self.info_text.configure(yscrollcommand=self._on_info_yscroll)
+        self.root.bind("<Control-equal>", lambda e: self.zoom_summary_icons(1))
+        self.root.bind("<Control-minus>", lambda e: self.zoom_summary_icons(-1))
+        self.info_text.tag_configure("h1", font=("SimHei", 12, "bold"))
+        self.info_text.tag_configure("h2", font=("SimHei", 10, "bold"))
         self.info_text.config(state=tk.DISABLED)
     
-    def read_company_data(self):
-        """从INI文件读取公司数据"""
-        self.company_data = {}
-        # 使用RawConfigParser来避免百分号插值问题
-        self.config = configparser.RawConfigParser()
+    def show_message(self, message):
+        """在信息区域显示一条消息"""
+        self.info_text.config(state=tk.NORMAL)
+        self.info_text.delete(1.0, tk.END)
+        self.info_text.insert(tk.END, message)
+        self.info_text.config(state=tk.DISABLED)
 
-        # 读取文件
+    def toggle_profile_overlay(self):
+        """显示或隐藏性能叠加层"""
+        if self.profile_overlay is not None:
+            self.profile_overlay.destroy()
+            self.profile_overlay = None
+            return
+        self.profile_overlay = tk.Label(
+            self.root,
+            justify=tk.LEFT,
+            anchor="nw",
+            font="TkFixedFont",
+            bg="#202020",
+            fg="#80ff80",
+        )
+        self.profile_overlay.place(relx=1.0, x=-10, y=10, anchor="ne")
+        self._refresh_profile_overlay()
+
+    def _refresh_profile_overlay(self):
+        if self.profile_overlay is None:
+            return
+        self.profile_overlay.config(text=self.profiler.format())
+        self.profile_overlay.lift()
+        self.root.after(PROFILE_OVERLAY_MS, self._refresh_profile_overlay)
+
+    def load_data_async(self):
+        """在后台线程读取公司数据，不阻塞窗口显示"""
+        # 读取前记录文件状态，读取期间的修改也能被发现
+        layers = LayerStack(DEFAULT_INI_PATH, self.overlays)
+        self.watcher = FileWatcher(*layers.watch_paths())
+        self._load_result = None
+        thread = threading.Thread(target=self._load_worker, daemon=True)
+        thread.start()
+        self.root.after(LOAD_POLL_MS, self._poll_load, thread)
+
+    def _load_worker(self):
+        """后台线程：读取数据，结果由Tk线程取走"""
         try:
-            ini_path = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)), "company.ini"
+            self._load_result = CompanyRepository.load(
+                DEFAULT_INI_PATH, timeline=self.timeline, overlays=self.overlays
             )
-            self.config.read(ini_path, encoding="utf-8")
-
-            # 解析每个公司的数据
-            for section in self.config.sections():
-                company_info = {}
-
-                for key, value in self.config[section].items():
-                    # 处理数组类型的值
-                    if value.startswith("[") and value.endswith("]"):
-                        try:
-                            # 解析JSON数组
-                            company_info[key] = json.loads(value)
-                        except json.JSONDecodeError:
-                            # 如果解析失败，保留原始值
-                            company_info[key] = value
-                    # 处理布尔值
-                    elif value.lower() == "true":
-                        company_info[key] = True
-                    elif value.lower() == "false":
-                        company_info[key] = False
-                    # 处理NULL值
-                    elif value.upper() == "NULL":
-                        company_info[key] = None
-                    # 处理字符串值
-                    elif value.startswith('"') and value.endswith('"'):
-                        company_info[key] = value[1:-1]
-                    else:
-                        company_info[key] = value
-
-                self.company_data[section] = company_info
+            # 启动时指定的语言，其搜索索引也在后台建立
+            self._load_result.localized_index(self.locale)
         except Exception as e:
+            self._load_result = e
+
+    def _poll_load(self, thread):
+        """Tk线程：等待后台读取完成后填充列表"""
+        if thread.is_alive():
+            self.root.after(LOAD_POLL_MS, self._poll_load, thread)
+            return
+        self.apply_company_data(self._load_result)
+        self.populate_company_list()
+
+        # 之后定时检查数据文件，修改后自动热重载
+        self._reloading = False
+        self.root.after(WATCH_INTERVAL_MS, self._watch_tick)
+
+        # 数据就绪前输入的搜索内容现在生效
+        if self.search_var.get():
+            self.on_search_change()
+
+        if self.save_path:
+            self.load_save(self.save_path, self.save_country)
+
+    def apply_company_data(self, result):
+        """使用读取到的 CompanyRepository，出错时显示错误信息"""
+        if isinstance(result, Exception):
+            # 保留数据文件路径，文件修正后热重载可以直接读入全部公司
+            layers = None
+            if self.overlays:
+                layers = LayerStack(DEFAULT_INI_PATH, self.overlays)
+            self.repository = CompanyRepository(
+                ini_path=DEFAULT_INI_PATH, layers=layers
+            )
             # 显示错误信息
-            self.info_text.config(state=tk.NORMAL)
-            self.info_text.delete(1.0, tk.END)
-            self.info_text.insert(tk.END, f"读取文件出错: {str(e)}")
-            self.info_text.config(state=tk.DISABLED)
+            self.show_message(f"读取文件出错: {str(result)}")
+        else:
+            self.repository = result
+            self.show_message("请从左侧选择公司查看信息")
+        self.company_data = self.repository.company_data
+        self.search_index = self.repository.localized_index(self.locale)
+
+        # 汇总计数器，保留仍然存在的已选公司
+        self.selected_companies.intersection_update(self.company_data)
+        self.aggregator = self.repository.aggregator(self.selected_companies)
+        self.aggregator.eligibility = self.eligibility
+        self.aggregator.locale = self.locale
+        # 新的仓库从版本0开始，旧的缓存不能再用
+        self._render_cache.clear()
+
+        # 之后的每次搜索只访问索引
+        if self.search_scheduler is None:
+            self.search_scheduler = SearchScheduler(
+                self.root,
+                self.search_index,
+                self.on_search_result,
+                delay=SEARCH_DEBOUNCE_MS,
+            )
+        else:
+            self.search_scheduler.set_index(self.search_index)
 
     def populate_company_list(self):
-        """将公司添加到列表中，每个公司显示五行信息"""
-        # 清空现有组件
-        for frame in self.company_frames.values():
-            frame.destroy()
-        self.check_vars.clear()
-        self.company_frames.clear()
-        self.company_info_widgets.clear()
-
-        # 添加新的公司项
-        for company in sorted(self.company_data.keys()):
-            # 创建公司框架
-            company_frame = ttk.Frame(self.checkbox_frame)
-            company_frame.pack(fill=tk.X, padx=5, pady=5)
-
-            # 获取公司信息
-            company_info = self.company_data.get(company, {})
-
-            # 创建复选框
-            var = tk.BooleanVar()
-            chk = ttk.Checkbutton(
-                company_frame,
-                text="",
-                variable=var,
-                command=lambda c=company: self.on_company_select(c),
-            )
-            chk.grid(row=0, column=0, sticky="wn", padx=5, rowspan=5)
+        """根据公司数据重建列表模型，只为可见行绑定组件"""
+        self.all_companies = sorted(self.company_data.keys())
+        self.visible_companies = self.all_companies
+        self.row_texts.clear()
+
+        # 第一次填充时测量行高，所有行使用相同高度
+        if not self.row_pool:
+            self.row_pool.append(self._create_row())
+
+        # 更新滚动区域并绑定可见行
+        with timeline_phase(self.timeline, "first_rows"):
+            self.on_frame_configure(None)
+            self.render_visible_rows(force=True)
+        if self.timeline is not None:
+            self.root.after_idle(self.timeline.mark, "first_rows_painted")
+
+        # 其余行的显示文字在空闲时分片预生成，滚动时无需再计算
+        self.run_in_slices(self._prepare_row_texts(self.all_companies))
+
+    def _prepare_row_texts(self, companies):
+        """逐个生成公司行文字的分片任务"""
+        for company in companies:
+            # 任务开始后热重载可能已删除了这个公司
+            if company in self.company_data:
+                self.get_row_texts(company)
+            yield
+
+    def run_in_slices(self, steps, on_done=None):
+        """在 after_idle 中分片执行生成器，每片不超过 frame_budget_ms
+
+        新任务会取消尚未完成的旧任务。
+        """
+        if self._slice_id is not None:
+            self.root.after_cancel(self._slice_id)
+            self._slice_id = None
+
+        def run_slice():
+            deadline = time.perf_counter() + self.frame_budget_ms / 1000
+            for _ in steps:
+                if time.perf_counter() >= deadline:
+                    self._slice_id = self.root.after_idle(run_slice)
+                    return
+            self._slice_id = None
+            if on_done is not None:
+                on_done()
+
+        self._slice_id = self.root.after_idle(run_slice)
+
+    def _create_row(self):
+        """创建一个可复用的行组件，每行显示五行信息"""
+        company_frame = ttk.Frame(self.canvas)
+        row = {"frame": company_frame, "company": None, "index": None, "grey": False}
+
+        # 行内复选框只反映数据模型中的选中状态
+        row["var"] = tk.BooleanVar()
+        chk = ttk.Checkbutton(
+            company_frame,
+            text="",
+            variable=row["var"],
+            command=lambda r=row: self._on_row_toggle(r),
+        )
+        chk.grid(row=0, column=0, sticky="wn", padx=5, rowspan=5)
+
+        # 创建信息显示框架
+        info_frame = ttk.Frame(company_frame)
+        info_frame.grid(row=0, column=1, sticky="w", padx=5, columnspan=3)
+
+        # 第一行：公司名称，其余四行：科技/地块/名贵、建筑、建筑_可选、繁荣
+        company_label = ttk.Label(
+            info_frame, text="", font=("SimHei", 10, "bold"), width=30
+        )
+        company_label.grid(row=0, column=0, sticky="w", pady=2)
+        row["labels"] = [company_label]
+        for line in range(1, 5):
+            label = ttk.Label(info_frame, text="")
+            label.grid(row=line, column=0, sticky="w", pady=1, columnspan=3)
+            row["labels"].append(label)
+
+        if not self.row_height:
+            for label in row["labels"]:
+                label.configure(text="测")
+            company_frame.update_idletasks()
+            self.row_height = company_frame.winfo_reqheight() + 2 * ROW_PADDING
+
+        row["item"] = self.canvas.create_window(
+            ROW_PADDING,
+            0,
+            window=company_frame,
+            anchor="nw",
+            width=max(self.canvas_width - 2 * ROW_PADDING, 1),
+            height=self.row_height - 2 * ROW_PADDING,
+            state="hidden",
+        )
+        return row
+
+    def get_row_texts(self, company):
+        """生成（并缓存）公司在列表中显示的五行文字"""
+        texts = self.row_texts.get(company)
+        if texts is not None:
+            return texts
+
+        model = self.company_data
+        record = model.record(company)
+        locale = self.locale
+
+        # 第二行：科技、地块和名贵信息，空值在读取时已统一为 NONE
+        parts = []
+        for key in SINGLE_FIELDS:
+            names = model.value_names(record, key)
+            value = locale.text(FIELD_TABLES[key], names[0]) if names else "NULL"
+            parts.append(f"{locale.field(key)}: {value}")
+
+        # 第三至五行：建筑、建筑_可选、繁荣
+        lines = [locale.text("companies", company), "  ".join(parts)]
+        for key in LIST_FIELDS:
+            label = locale.field(key)
+            if getattr(record, FIELD_SLOTS[key]) is not None:
+                kind = FIELD_TABLES[key]
+                names = [locale.text(kind, n) for n in model.value_names(record, key)]
+                lines.append(f"{label}: {', '.join(names)}")
+            else:
+                lines.append(f"{label}: -")
+
+        texts = tuple(lines)
+        self.row_texts[company] = texts
+        return texts
+
+    def render_visible_rows(self, force=False):
+        """把行组件池绑定到当前视口内的公司上"""
+        if not self.row_height:
+            return
+
+        top = self.canvas.canvasy(0)
+        first = max(0, int((top - self.header_height) // self.row_height))
+        count = self.canvas.winfo_height() // self.row_height + 2
+
+        # 视口变大时扩充组件池，池的大小只与视口高度有关
+        while len(self.row_pool) < count:
+            self.row_pool.append(self._create_row())
+
+        for slot, row in enumerate(self.row_pool):
+            index = first + slot
+            if slot < count and index < len(self.visible_companies):
+                company = self.visible_companies[index]
+                if row["index"] != index:
+                    y = self.header_height + index * self.row_height + ROW_PADDING
+                    self.canvas.coords(row["item"], ROW_PADDING, y)
+                    if row["index"] is None:
+                        self.canvas.itemconfigure(row["item"], state="normal")
+                    row["index"] = index
+                if force or row["company"] != company:
+                    self._bind_row(row, company)
+            elif row["index"] is not None:
+                self.canvas.itemconfigure(row["item"], state="hidden")
+                row["index"] = None
+                row["company"] = None
+
+    def _bind_row(self, row, company):
+        """将一个行组件绑定到指定公司"""
+        row["company"] = company
+        for label, text in zip(row["labels"], self.get_row_texts(company)):
+            label.configure(text=text)
+        row["var"].set(company in self.selected_companies)
+        if self.icons is not None:
+            # 行组件持有图片的引用，被缓存淘汰后仍能正常显示
+            image = self.icons.get("companies", company, self.row_icon_size)
+            row["labels"][0].configure(image=image or "", compound="left")
+            row["icon"] = image
+        grey = company in self.unavailable_companies
+        if grey != row["grey"]:
+            row["grey"] = grey
+            for label in row["labels"]:
+                label.configure(foreground="gray" if grey else "")
+
+    def _on_row_toggle(self, row):
+        """行内复选框被点击时更新数据模型"""
+        company = row["company"]
+        if company is None:
+            return
+        if row["var"].get():
+            self.selected_companies.add(company)
+        else:
+            self.selected_companies.discard(company)
+        self.on_company_select(company)
+
+    def on_company_select(self, company=None):
+        """当公司被选中或取消时，只把这个公司的增减计入汇总"""
+        if company is not None:
+            if company in self.selected_companies:
+                self.aggregator.add(company)
+            else:
+                self.aggregator.remove(company)
+        else:
+            self.aggregator.set_selection(self.selected_companies)
 
-            # 创建信息显示框架
-            info_frame = ttk.Frame(company_frame)
-            info_frame.grid(row=0, column=1, sticky="w", padx=5, columnspan=3)
+        # 更新信息显示
+        self.update_info_display()
+
+    def select_all(self):
+        """选中当前列表中显示的全部公司"""
+        self.selected_companies.update(self.visible_companies)
+        self._on_bulk_select()
+
+    def invert_selection(self):
+        """反选当前列表中显示的公司"""
+        self.selected_companies.symmetric_difference_update(self.visible_companies)
+        self._on_bulk_select()
+
+    def clear_selection(self):
+        """清空所有选择"""
+        self.selected_companies.clear()
+        self._on_bulk_select()
+
+    def _on_bulk_select(self):
+        """批量修改选择后刷新可见行和汇总"""
+        self.render_visible_rows(force=True)
+        self.on_company_select()
+
+    def update_info_display(self, selected_companies=None):
+        """更新信息显示区域，整段汇总用一次 insert 写入"""
+        if selected_companies is not None:
+            self.aggregator.set_selection(selected_companies)
+
+        # 同一选择在同一数据版本下的汇总文本直接取用缓存
+        repo = self.repository
+        key = (repo.selection_mask(self.aggregator.selected), repo.version)
+        cached = self._render_cache.get(key)
+        if cached is None:
+            icons = [] if self.icons is not None else None
+            cached = (self.aggregator.render(icons=icons), icons)
+            self._render_cache.put(key, cached)
+        segments, icons = cached
+
+        # 把片段展开为 insert(index, 文本, 标签, 文本, 标签, ...) 的参数
+        args = []
+        for text, tags in segments:
+            args.append(text)
+            args.append(tags)
 
-            # 第一行：公司名称
-            company_label = ttk.Label(
-                info_frame, text=company, font=("SimHei", 10, "bold"), width=30
+        self.info_text.config(state=tk.NORMAL)
+        self.info_text.delete(1.0, tk.END)
+        self.info_text.insert(tk.END, *args)
+        # 禁用文本框编辑
+        self.info_text.config(state=tk.DISABLED)
+
+        self._summary_icons = icons or []
+        self._summary_placed = set()
+        self._summary_images = []
+        if self._summary_icons:
+            self.layout.defer("summary_icons", self._place_summary_icons)
+
+    def _on_info_yscroll(self, first, last):
+        """汇总滚动时更新滚动条，并为新进入视口的行插入图标"""
+        self.info_text.vbar.set(first, last)
+        if len(self._summary_placed) < len(self._summary_icons):
+            self.layout.defer("summary_icons", self._place_summary_icons)
+
+    def _place_summary_icons(self):
+        """在视口内还没有图标的汇总行开头插入图标"""
+        text = self.info_text
+        first = int(text.index("@0,0").split(".")[0])
+        last = int(text.index(f"@0,{text.winfo_height()}").split(".")[0])
+        pending = [
+            (line, kind, name)
+            for line, kind, name in self._summary_icons
+            if first <= line <= last and line not in self._summary_placed
+        ]
+        if not pending:
+            return
+        text.config(state=tk.NORMAL)
+        for line, kind, name in pending:
+            self._summary_placed.add(line)
+            image = self.icons.get(kind, name, self.summary_icon_size)
+            if image is not None:
+                # 插入在行首的缩进之后，不改变行号
+                text.image_create(f"{line}.2", image=image, padx=2)
+                self._summary_images.append(image)
+        text.config(state=tk.DISABLED)
+
+    def zoom_summary_icons(self, step):
+        """切换汇总中图标的大小，缩放结果由图标缓存复用"""
+        if self.icons is None:
+            return
+        sizes = SUMMARY_ICON_SIZES
+        i = sizes.index(self.summary_icon_size) + step
+        self.summary_icon_size = sizes[max(0, min(i, len(sizes) - 1))]
+        self.update_info_display()
+
+    def open_optimizer(self):
+        """打开公司组合优化窗口"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("最优公司组合")
+        dialog.geometry("600x560")
+
+        form = ttk.Frame(dialog, padding="10")
+        form.pack(fill=tk.X)
+        form.columnconfigure(1, weight=1)
+
+        fields = {}
+        for row, (key, label, default) in enumerate(
+            (
+                ("slots", "公司上限", "7"),
+                ("weights", "繁荣权重（目标=权重，逗号分隔）", ""),
+                ("coverage", "基础建筑覆盖权重", "1"),
+                ("techs", "已研究科技（逗号分隔，留空不限）", ""),
+                ("regions", "拥有地块（逗号分隔，留空不限）", ""),
             )
-            company_label.grid(row=0, column=0, sticky="w", pady=2)
-
-            # 第二行：科技、地块和名贵信息
-            tech_info = company_info.get("科技", "NULL")
-            tech_text = (
-                f"科技: {tech_info}"
-                if tech_info and tech_info != "NULL" and tech_info != "None"
-                else "科技: NULL"
+        ):
+            ttk.Label(form, text=label).grid(row=row, column=0, sticky="w", pady=2)
+            var = tk.StringVar(value=default)
+            ttk.Entry(form, textvariable=var).grid(
+                row=row, column=1, sticky="we", padx=(5, 0), pady=2
             )
+            fields[key] = var
 
-            region_info = company_info.get("地块", "NULL")
-            region_text = (
-                f"地块: {region_info}"
-                if region_info and region_info != "NULL" and region_info != "None"
-                else "地块: NULL"
-            )
+        keep_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(form, text="保留当前选中的公司", variable=keep_var).grid(
+            row=len(fields), column=0, columnspan=2, sticky="w", pady=2
+        )
 
-            luxury_info = company_info.get("名贵", "NULL")
-            luxury_text = (
-                f"名贵: {luxury_info}"
-                if luxury_info and luxury_info != "NULL" and luxury_info != "None"
-                else "名贵: NULL"
+        result_text = scrolledtext.ScrolledText(dialog, wrap=tk.WORD, height=20)
+        result_text.tag_configure("h2", font=("SimHei", 10, "bold"))
+        state = {"result": None}
+
+        def show(segments):
+            result_text.config(state=tk.NORMAL)
+            result_text.delete(1.0, tk.END)
+            args = []
+            for text, tags in segments:
+                args.append(text)
+                args.append(tags)
+            result_text.insert(tk.END, *args)
+            result_text.config(state=tk.DISABLED)
+
+        def run():
+            try:
+                options = {
+                    "slots": int(fields["slots"].get()),
+                    "weights": parse_weights([fields["weights"].get()]),
+                    "coverage_weight": float(fields["coverage"].get() or 0),
+                    "techs": _split_names(fields["techs"].get()),
+                    "regions": _split_names(fields["regions"].get()),
+                    "required": (
+                        sorted(self.selected_companies) if keep_var.get() else ()
+                    ),
+                }
+            except ValueError as e:
+                show([(f"参数错误: {e}", ())])
+                return
+            if options["slots"] < 1:
+                show([("参数错误: 公司上限必须是正整数", ())])
+                return
+            show([("正在计算...", ())])
+            self.run_optimizer(options, on_done)
+
+        def on_done(result):
+            state["result"] = result
+            if isinstance(result, Exception):
+                show([(f"计算出错: {result}", ())])
+                return
+            segments = []
+            if not result.complete:
+                segments.append(("已达到时间限制，以下为目前找到的最优结果\n\n", ()))
+            for rank, solution in enumerate(result.solutions, 1):
+                segments.append((f"## 第{rank}名 得分 {solution.score}\n", "h2"))
+                lines = [f"- {company}\n" for company in solution.companies]
+                lines.append(f"覆盖建筑 {len(solution.buildings)} 种\n")
+                lines.extend(f"  {text}\n" for text, count in solution.modifiers)
+                segments.append(("".join(lines) + "\n", ()))
+            if not result.solutions:
+                segments.append(("没有满足条件的组合", ()))
+            show(segments)
+
+        def apply_best():
+            result = state["result"]
+            if result is None or isinstance(result, Exception):
+                return
+            if result.solutions:
+                self.selected_companies.clear()
+                self.selected_companies.update(result.solutions[0].companies)
+                self._on_bulk_select()
+
+        buttons = ttk.Frame(dialog, padding=(10, 0))
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text="计算", command=run).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(buttons, text="选中第一名", command=apply_best).pack(side=tk.LEFT)
+        result_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        result_text.config(state=tk.DISABLED)
+
+    def open_synergy(self):
+        """打开公司关系窗口：选中公司之间以及与其他公司的建筑重叠和互补"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("公司关系")
+        dialog.geometry("600x560")
+
+        form = ttk.Frame(dialog, padding="10")
+        form.pack(fill=tk.X)
+        ttk.Label(form, text="每个公司显示的关系数").pack(side=tk.LEFT)
+        top_var = tk.StringVar(value="10")
+        ttk.Entry(form, textvariable=top_var, width=6).pack(side=tk.LEFT, padx=5)
+
+        result_text = scrolledtext.ScrolledText(dialog, wrap=tk.WORD, height=20)
+        result_text.tag_configure("h2", font=("SimHei", 10, "bold"))
+
+        def show(segments):
+            result_text.config(state=tk.NORMAL)
+            result_text.delete(1.0, tk.END)
+            args = []
+            for text, tags in segments:
+                args.append(text)
+                args.append(tags)
+            result_text.insert(tk.END, *args)
+            result_text.config(state=tk.DISABLED)
+
+        def describe(pair):
+            text = f"- {pair.other}  共享 {pair.shared}  相似度 {pair.jaccard:.2f}"
+            if pair.fills:
+                text += "  可填补其可选建筑"
+            if pair.filled_by:
+                text += "  可填补本公司可选建筑"
+            if pair.buildings:
+                text += f"\n    {', '.join(pair.buildings)}"
+            return text + "\n"
+
+        def run():
+            try:
+                top = int(top_var.get())
+            except ValueError as e:
+                show([(f"参数错误: {e}", ())])
+                return
+            selected = sorted(self.selected_companies)
+            if not selected:
+                show([("请先选中公司", ())])
+                return
+            show([("正在计算...", ())])
+            synergy = self.repository.synergy
+            self.run_in_background(
+                lambda: [(name, synergy().row(name)) for name in selected],
+                lambda rows: on_done(rows, top, set(selected)),
             )
 
-            # 将所有信息合并到一个标签中显示
-            combined_text = f"{tech_text}  {region_text}  {luxury_text}"
-            combined_label = ttk.Label(info_frame, text=combined_text)
-            combined_label.grid(row=1, column=0, sticky="w", pady=1)
+        def on_done(rows, top, selected):
+            if isinstance(rows, Exception):
+                show([(f"计算出错: {rows}", ())])
+                return
+            segments = []
+            if len(selected) > 1:
+                segments.append(("## 选中公司之间\n", "h2"))
+                lines = [
+                    f"{name} ↔ " + describe(pair)[2:]
+                    for name, pairs in rows
+                    for pair in pairs
+                    if pair.other in selected and name < pair.other
+                ]
+                segments.append(("".join(lines or ["没有共享建筑\n"]) + "\n", ()))
+            for name, pairs in rows:
+                segments.append((f"## {name}\n", "h2"))
+                others = [p for p in pairs if p.other not in selected][:top]
+                lines = [describe(pair) for pair in others] or ["没有相关公司\n"]
+                segments.append(("".join(lines) + "\n", ()))
+            show(segments)
+
+        def export_all():
+            path = filedialog.asksaveasfilename(
+                parent=dialog,
+                defaultextension=".csv",
+                filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")],
+            )
+            if not path:
+                return
+            fmt = "jsonl" if path.endswith(".jsonl") else "csv"
+            show([("正在导出...", ())])
+
+            def work():
+                from company_synergy import export
+
+                with open(path, "w", encoding="utf-8", newline="") as f:
+                    return export(self.repository.synergy().iter_pairs(), f, fmt)
+
+            def done(count):
+                if isinstance(count, Exception):
+                    show([(f"导出出错: {count}", ())])
+                else:
+                    show([(f"已导出 {count} 对公司关系到 {path}", ())])
+
+            self.run_in_background(work, done)
+
+        buttons = ttk.Frame(dialog, padding=(10, 0))
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text="计算", command=run).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(buttons, text="导出全部...", command=export_all).pack(side=tk.LEFT)
+        result_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        result_text.config(state=tk.DISABLED)
+        run()
+
+    def open_presets(self):
+        """打开方案窗口：保存、载入、删除方案，以及并排对比几个方案"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("公司组合方案")
+        dialog.geometry("600x560")
+
+        form = ttk.Frame(dialog, padding="10")
+        form.pack(fill=tk.X)
+        ttk.Label(form, text="方案名").pack(side=tk.LEFT)
+        name_var = tk.StringVar()
+        ttk.Entry(form, textvariable=name_var, width=24).pack(side=tk.LEFT, padx=5)
+
+        listbox = tk.Listbox(dialog, selectmode=tk.EXTENDED, height=20)
+        status = ttk.Label(dialog, text="", padding=(10, 0))
+
+        def refresh(selected=()):
+            listbox.delete(0, tk.END)
+            for i, name in enumerate(self.presets.names()):
+                listbox.insert(tk.END, f"{name} ({len(self.presets.get(name))}个公司)")
+                if name in selected:
+                    listbox.selection_set(i)
+
+        def chosen():
+            names = self.presets.names()
+            return [names[i] for i in listbox.curselection()]
+
+        def save():
+            name = name_var.get().strip()
+            try:
+                self.presets.save(name, self.selected_companies)
+            except (OSError, ValueError) as e:
+                status.configure(text=f"保存出错: {e}")
+                return
+            status.configure(text=f"已保存 {name}")
+            refresh([name])
+
+        def load():
+            names = chosen()
+            if len(names) != 1:
+                status.configure(text="请选择一个方案")
+                return
+            companies = self.presets.get(names[0])
+            existing = [c for c in companies if c in self.company_data]
+            self.selected_companies.clear()
+            self.selected_companies.update(existing)
+            self._on_bulk_select()
+            name_var.set(names[0])
+            missing = len(companies) - len(existing)
+            text = f"已载入 {names[0]}"
+            status.configure(text=text + (f"，{missing} 个公司已不存在" if missing else ""))
+
+        def delete():
+            for name in chosen():
+                try:
+                    self.presets.delete(name)
+                except OSError as e:
+                    status.configure(text=f"删除出错: {e}")
+                    return
+            refresh()
+
+        def compare():
+            names = chosen()
+            if len(names) < 2:
+                status.configure(text="请选择至少两个方案")
+                return
+            self.open_comparison({name: self.presets.get(name) for name in names})
+
+        listbox.bind("<Double-Button-1>", lambda e: load())
+        buttons = ttk.Frame(dialog, padding=(10, 0))
+        buttons.pack(fill=tk.X)
+        for text, command in (
+            ("保存当前选择", save),
+            ("载入", load),
+            ("删除", delete),
+            ("对比所选", compare),
+        ):
+            ttk.Button(buttons, text=text, command=command).pack(
+                side=tk.LEFT, padx=(0, 5)
+            )
+        status.pack(fill=tk.X)
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        refresh()
+
+    def open_comparison(self, selections):
+        """并排对比几个方案 {方案名: [公司名]} 的汇总，取值不同的条目高亮"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("方案对比")
+        dialog.geometry("800x560")
+
+        names = list(selections)
+        locale = self.locale
+        rows = compare_selections(self.repository, selections)
+        only_diff_var = tk.BooleanVar(value=False)
+
+        tree = ttk.Treeview(dialog, columns=names, selectmode="none")
+        tree.heading("#0", text="条目")
+        tree.column("#0", width=240)
+        for name in names:
+            tree.heading(name, text=name)
+            tree.column(name, width=100, anchor="center")
+        tree.tag_configure("diff", background="#fff2b3")
+
+        def show():
+            tree.delete(*tree.get_children())
+            sections = {}
+            for row in rows:
+                if only_diff_var.get() and not row.differs:
+                    continue
+                parent = sections.get(row.section)
+                if parent is None:
+                    parent = tree.insert("", tk.END, text=row.section, open=True)
+                    sections[row.section] = parent
+                item = row.item if row.kind is None else locale.text(row.kind, row.item)
+                tree.insert(
+                    parent,
+                    tk.END,
+                    text=item,
+                    values=row.values,
+                    tags=("diff",) if row.differs else (),
+                )
 
-            # 确保公司的嵌套字典已创建
-            if company not in self.company_info_widgets:
-                self.company_info_widgets[company] = {}
+        form = ttk.Frame(dialog, padding="10")
+        form.pack(fill=tk.X)
+        ttk.Checkbutton(
+            form, text="只显示不同的条目", variable=only_diff_var, command=show
+        ).pack(side=tk.LEFT)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        show()
+
+    def open_export(self):
+        """打开导出窗口：把当前选择、全部公司、全部方案或分组汇总导出为文件"""
+        import company_export
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("导出报告")
+        dialog.geometry("600x560")
+
+        reports = (
+            ("当前选择的汇总", "selection"),
+            ("全部公司目录", "catalogue"),
+            ("全部方案的汇总", "presets"),
+            ("按地块分组（每组一个文件）", "region"),
+            ("按科技分组（每组一个文件）", "tech"),
+        )
+        report_var = tk.StringVar(value="selection")
+        format_var = tk.StringVar(value=FORMATS[0])
+        form = ttk.Frame(dialog, padding="10")
+        form.pack(fill=tk.X)
+        for text, value in reports:
+            ttk.Radiobutton(form, text=text, variable=report_var, value=value).pack(
+                anchor="w"
+            )
+        format_frame = ttk.Frame(form)
+        format_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(format_frame, text="格式").pack(side=tk.LEFT)
+        ttk.Combobox(
+            format_frame,
+            textvariable=format_var,
+            values=FORMATS,
+            state="readonly",
+            width=8,
+        ).pack(side=tk.LEFT, padx=5)
+
+        result_text = scrolledtext.ScrolledText(dialog, wrap=tk.WORD, height=20)
+
+        def show(text):
+            result_text.config(state=tk.NORMAL)
+            result_text.delete(1.0, tk.END)
+            result_text.insert(tk.END, text)
+            result_text.config(state=tk.DISABLED)
+
+        def run():
+            report, fmt = report_var.get(), format_var.get()
+            repo, locale = self.repository, self.locale
+            if report in company_export.BATCH_FIELDS:
+                directory = filedialog.askdirectory(parent=dialog)
+                if not directory:
+                    return
+                # 工作进程自行读取数据，按当前语言渲染
+                language = None if locale.source else locale.language
+                locales_path = self.locales.path if self.locales is not None else None
+                jobs = company_export.batch_jobs(
+                    company_export.group_reports(repo, report), directory, fmt
+                )
 
-            # 存储引用到字典中
-            self.company_info_widgets[company]["tech_label"] = combined_label
-            self.company_info_widgets[company]["region_label"] = combined_label
-            self.company_info_widgets[company]["luxury_label"] = combined_label
+                def work():
+                    paths = company_export.run_batch(
+                        jobs,
+                        fmt,
+                        repo,
+                        overlays=self.overlays,
+                        locales_path=locales_path,
+                        language=language,
+                    )
+                    return f"已导出 {len(list(paths))} 个文件到 {directory}"
 
-            # 第三行：建筑信息（显示全部建筑）
-            if isinstance(company_info.get("建筑"), list):
-                buildings_text = f"建筑: {', '.join(company_info['建筑'])}"
             else:
-                buildings_text = "建筑: -"
+                if report == "selection" and not self.selected_companies:
+                    show("请先选中公司")
+                    return
+                path = filedialog.asksaveasfilename(
+                    parent=dialog,
+                    defaultextension=f".{fmt}",
+                    filetypes=[(name.upper(), f"*.{name}") for name in FORMATS],
+                )
+                if not path:
+                    return
+                selected = sorted(self.selected_companies)
+                presets = [
+                    company_export.Report(name, self.presets.get(name))
+                    for name in self.presets.names()
+                ]
+
+                def work():
+                    with open(path, "w", encoding="utf-8", newline="") as f:
+                        if report == "catalogue":
+                            company_export.export_catalogue(repo, f, fmt, locale=locale)
+                        elif report == "presets":
+                            company_export.export_reports(
+                                repo, presets, f, fmt, "方案汇总", locale
+                            )
+                        else:
+                            company_export.export_summary(
+                                repo, selected, f, fmt, locale=locale
+                            )
+                    return f"已导出到 {path}"
+
+            show("正在导出...")
+            self.run_in_background(
+                work,
+                lambda result: show(
+                    f"导出出错: {result}" if isinstance(result, Exception) else result
+                ),
+            )
 
-            buildings_label = ttk.Label(info_frame, text=buildings_text, wraplength=600)
-            buildings_label.grid(row=2, column=0, sticky="w", pady=1, columnspan=3)
+        buttons = ttk.Frame(dialog, padding=(10, 0))
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text="导出...", command=run).pack(side=tk.LEFT)
+        result_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        result_text.config(state=tk.DISABLED)
+
+    def open_save(self):
+        """选择一个存档文件并读取"""
+        path = filedialog.askopenfilename(
+            parent=self.root,
+            filetypes=[("存档", "*.v3"), ("所有文件", "*.*")],
+        )
+        if path:
+            self.load_save(path)
 
-            # 第四行：建筑_可选信息
-            if isinstance(company_info.get("建筑_可选"), list):
-                optional_buildings_text = (
-                    f"建筑_可选: {', '.join(company_info['建筑_可选'])}"
-                )
-            else:
-                optional_buildings_text = "建筑_可选: -"
+    def _load_game_tables(self, on_ready):
+        """确保本地化表和科技前置关系已读取，然后在Tk线程调用 on_ready(异常或None)
 
-            optional_buildings_label = ttk.Label(
-                info_frame, text=optional_buildings_text, wraplength=600
-            )
-            optional_buildings_label.grid(
-                row=3, column=0, sticky="w", pady=1, columnspan=3
+        读取在后台线程进行，结果回到Tk线程再写入 repository，避免与
+        repository.eligibility() 同时读写 tech_graph。
+        """
+        if self._localization is not None:
+            on_ready(None)
+            return
+
+        def work():
+            localization = load_localization(self.game_dir, self.localization_paths)
+            tech_graph = None
+            if self.game_dir:
+                tech_graph = load_tech_graph(self.game_dir, localization=localization)
+            return localization, tech_graph
+
+        def done(result):
+            if isinstance(result, Exception):
+                on_ready(result)
+                return
+            self._localization, tech_graph = result
+            if tech_graph is not None:
+                self.repository.tech_graph = tech_graph
+            on_ready(None)
+
+        self.run_in_background(work, done)
+
+    def load_save(self, path, country=None):
+        """在后台线程读取存档并与公司数据对照"""
+        self.save_label.configure(text="正在读取存档...")
+
+        def work():
+            state = read_save(path, country)
+            return match_save(
+                self.company_data,
+                state,
+                self._localization,
+                self.repository.eligibility(),
             )
 
-            # 第五行：繁荣信息
-            if isinstance(company_info.get("繁荣"), list):
-                prosperity_text = f"繁荣: {', '.join(company_info['繁荣'])}"
+        def start(error):
+            if error is not None:
+                self.apply_save(error)
             else:
-                prosperity_text = "繁荣: -"
+                self.run_in_background(work, self.apply_save)
 
-            prosperity_label = ttk.Label(
-                info_frame, text=prosperity_text, wraplength=600
-            )
-            prosperity_label.grid(row=4, column=0, sticky="w", pady=1, columnspan=3)
-
-            # 保存引用
-            self.check_vars[company] = var
-            self.company_frames[company] = company_frame
-            self.company_info_widgets[company] = {
-                "company_label": company_label,
-                "tech_label": combined_label,
-                "region_label": combined_label,
-                "luxury_label": combined_label,
-                "buildings_label": buildings_label,
-                "optional_buildings_label": optional_buildings_label,
-                "prosperity_label": prosperity_label,
-            }
-
-        # 更新滚动区域
-        self.on_frame_configure(None)
+        self._load_game_tables(start)
 
-    def on_company_select(self, company=None):
-        """当公司被选中时更新信息显示"""
-        # 获取所有被选中的公司
-        selected_companies = [c for c, var in self.check_vars.items() if var.get()]
-
-        # 更新信息显示
-        self.update_info_display(selected_companies)
+    def apply_save(self, result):
+        """预先选中已建立的公司，按存档中的科技和地块设置建立条件"""
+        if isinstance(result, Exception):
+            self.save_label.configure(text=f"读取存档出错: {result}")
+            return
+        self.save_match = result
+        self.selected_companies.update(result.owned)
+        self.apply_eligibility(result.eligibility)
+
+    def apply_eligibility(self, eligibility):
+        """使用一组建立条件，None 表示不限制
+
+        无法建立的公司显示为灰色，汇总中列出选中公司缺少的条件。
+        """
+        self._set_eligibility(eligibility)
+        self.filter_companies(self.search_var.get())
+        self._on_bulk_select()
+
+    def _set_eligibility(self, eligibility):
+        self.eligibility = eligibility
+        self.aggregator.eligibility = eligibility
+        # 汇总中列出无法建立的公司，条件变化后缓存的汇总文本失效
+        self._render_cache.clear()
+        if eligibility is None:
+            self.unavailable_companies = set()
+        else:
+            # 存档中已经建立的公司不算无法建立
+            owned = self.save_match.owned if self.save_match is not None else ()
+            self.unavailable_companies = set(eligibility.blocked()).difference(owned)
+
+        parts = []
+        if self.save_match is not None:
+            state, owned = self.save_match.state, self.save_match.owned
+            parts.append(f"{state.tag or state.country}：已建立 {len(owned)}")
+        if eligibility is not None:
+            parts.append(f"可建立 {len(eligibility)}")
+            parts.append(f"无法建立 {len(self.unavailable_companies)}")
+        self.save_label.configure(text="，".join(parts))
+
+    def open_eligibility(self):
+        """打开建立条件窗口：已研究的科技、拥有的地块和已满足的特殊前置"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("建立条件")
+        dialog.geometry("600x560")
+
+        form = ttk.Frame(dialog, padding="10")
+        form.pack(fill=tk.X)
+        form.columnconfigure(1, weight=1)
+
+        current = ANY_CONDITIONS
+        if self.eligibility is not None:
+            current = self.eligibility.conditions
+        fields = {}
+        for row, (key, label) in enumerate(
+            (
+                ("techs", "已研究科技（逗号分隔，留空不限）"),
+                ("regions", "拥有地块（逗号分隔，留空不限）"),
+                ("prereqs", "已满足的特殊前置（逗号分隔，留空不限）"),
+            )
+        ):
+            ttk.Label(form, text=label).grid(row=row, column=0, sticky="w", pady=2)
+            var = tk.StringVar(value=", ".join(sorted(getattr(current, key) or ())))
+            ttk.Entry(form, textvariable=var).grid(
+                row=row, column=1, sticky="we", padx=(5, 0), pady=2
+            )
+            fields[key] = var
+
+        result_text = scrolledtext.ScrolledText(dialog, wrap=tk.WORD, height=20)
+        result_text.tag_configure("h2", font=("SimHei", 10, "bold"))
+
+        def show(segments):
+            result_text.config(state=tk.NORMAL)
+            result_text.delete(1.0, tk.END)
+            args = []
+            for text, tags in segments:
+                args.append(text)
+                args.append(tags)
+            result_text.insert(tk.END, *args)
+            result_text.config(state=tk.DISABLED)
+
+        def import_save():
+            if self.save_match is None:
+                show([("请先读取存档", ())])
+                return
+            conditions = self.save_match.eligibility.conditions
+            fields["techs"].set(", ".join(sorted(conditions.techs)))
+            fields["regions"].set(", ".join(sorted(conditions.regions)))
+
+        def run():
+            conditions = Conditions(
+                *(_split_names(fields[key].get()) for key in Conditions._fields)
+            )
+            show([("正在计算...", ())])
+
+            def work():
+                engine = self.repository.eligibility()
+                return engine.mask(conditions), engine.unlocks(conditions)
+
+            def start(error):
+                if error is not None:
+                    on_done(error)
+                else:
+                    self.run_in_background(work, on_done)
+
+            self._load_game_tables(start)
+
+        def on_done(result):
+            if isinstance(result, Exception):
+                show([(f"计算出错: {result}", ())])
+                return
+            mask, unlocks = result
+            self.apply_eligibility(mask)
+            segments = [(f"## 可以建立 {len(mask)} / {len(self.company_data)}\n", "h2")]
+            lines = [f"- {company}\n" for company in mask.names()]
+            segments.append(("".join(lines) + "\n", ()))
+            if unlocks:
+                segments.append(("## 再研究一个科技解锁最多的公司\n", "h2"))
+                lines = []
+                for unlock in unlocks:
+                    text = f"- {unlock.tech}：解锁 {len(unlock.companies)} 个"
+                    if unlock.missing:
+                        text += f"（需先研究 {', '.join(unlock.missing)}）"
+                    lines.append(f"{text}\n  {', '.join(unlock.companies)}\n")
+                segments.append(("".join(lines), ()))
+            show(segments)
+
+        def clear():
+            self.apply_eligibility(None)
+            show([("已清除建立条件", ())])
+
+        buttons = ttk.Frame(dialog, padding=(10, 0))
+        buttons.pack(fill=tk.X)
+        for text, command in (
+            ("应用", run),
+            ("从存档导入", import_save),
+            ("清除", clear),
+        ):
+            ttk.Button(buttons, text=text, command=command).pack(
+                side=tk.LEFT, padx=(0, 5)
+            )
+        result_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        result_text.config(state=tk.DISABLED)
 
-    def update_info_display(self, selected_companies):
-        """更新信息显示区域"""
-        # 清空文本框
-        self.info_text.config(state=tk.NORMAL)
-        self.info_text.delete(1.0, tk.END)
+    def run_optimizer(self, options, on_done):
+        """在后台线程运行组合优化，完成后在Tk线程调用 on_done(结果)"""
+        optimizer = self.repository.optimizer()
+        self.run_in_background(lambda: optimizer.optimize(**options), on_done)
 
-        # 如果没有选中的公司
-        if not selected_companies:
-            self.info_text.insert(tk.END, "请从左侧选择公司查看信息")
-            self.info_text.config(state=tk.DISABLED)
+    def set_locale(self, language):
+        """切换显示语言：只重新绑定可见行和汇总，不重新读取数据"""
+        if language == self.locale.language:
+            return
+        try:
+            locale = self.locales.load(language)
+        except (OSError, ValueError) as e:
+            self.language_var.set(self.locale.language)
+            self.show_message(f"读取文字表出错: {str(e)}")
+            return
+        self.locale = locale
+        self.aggregator.locale = locale
+        self._render_cache.clear()
+        # 行文字按需重新生成，只有视口内的行立即重新绑定
+        self.row_texts.clear()
+        self.render_visible_rows(force=True)
+        self.update_info_display()
+        if self.search_scheduler is None:
             return
 
-        # 汇总选中公司的信息
-        # 统计数据
-        total_companies = len(selected_companies)
-
-        # 计算各类信息的汇总
-        techs = set()
-        regions = set()
-        buildings = {}
-        optional_buildings = {}
-        bonuses = {}
-        luxuries = set()
-        special_luxuries = 0
-
-        for company in selected_companies:
-            info = self.company_data[company]
-
-            # 科技
-            if info.get("科技") and info["科技"] != "NULL":
-                techs.add(info["科技"])
-
-            # 地块
-            if info.get("地块") and info["地块"] != "NULL":
-                regions.add(info["地块"])
-
-            # 建筑
-            if isinstance(info.get("建筑"), list):
-                for building in info["建筑"]:
-                    buildings[building] = buildings.get(building, 0) + 1
-
-            # 可选建筑
-            if isinstance(info.get("建筑_可选"), list):
-                for building in info["建筑_可选"]:
-                    optional_buildings[building] = (
-                        optional_buildings.get(building, 0) + 1
-                    )
+        # 该语言的搜索索引在后台建立，已缓存时直接取用
+        def build():
+            with self.search_scheduler.lock:
+                return self.repository.localized_index(locale)
 
-            # 繁荣效果
-            if isinstance(info.get("繁荣"), list):
-                for bonus in info["繁荣"]:
-                    bonuses[bonus] = bonuses.get(bonus, 0) + 1
+        self.run_in_background(build, lambda index: self._apply_locale(locale, index))
 
-            # 名贵产品
-            if info.get("名贵") and info["名贵"] != "NULL":
-                luxuries.add(info["名贵"])
+    def _apply_locale(self, locale, index):
+        """Tk线程：换用新语言的搜索索引，并按新语言重新搜索"""
+        if isinstance(index, Exception):
+            self.show_message(f"建立搜索索引出错: {str(index)}")
+            return
+        if locale is not self.locale:
+            # 建立期间又切换了语言
+            return
+        self.search_index = index
+        self.search_scheduler.set_index(index)
+        if self.search_var.get().strip():
+            self.on_search_change()
+
+    def run_in_background(self, func, on_done):
+        """在后台线程执行 func，完成后在Tk线程调用 on_done(返回值或异常)"""
+        box = {}
+
+        def worker():
+            try:
+                box["result"] = func()
+            except Exception as e:
+                box["result"] = e
+
+        thread = threading.Thread(target=worker, daemon=True)
+        self._background_jobs += 1
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                self.root.after(LOAD_POLL_MS, poll)
+            else:
+                self._background_jobs -= 1
+                on_done(box["result"])
 
-            # 特殊名贵
-            if info.get("特殊名贵", False):
-                special_luxuries += 1
+        self.root.after(LOAD_POLL_MS, poll)
 
-        # 显示汇总信息
-        self.info_text.insert(
-            tk.END, f"# 公司信息汇总 ({total_companies} 个公司) \n\n"
-        )
+    def _watch_tick(self):
+        """定时检查数据文件是否被修改"""
+        self.root.after(WATCH_INTERVAL_MS, self._watch_tick)
+        if self._reloading or not self.watcher.changed():
+            return
+        self._reloading = True
+        self.run_in_background(self.repository.check_changes, self.apply_reload)
+
+    def apply_reload(self, patch):
+        """只更新有变化的公司：索引、汇总计数器和可见行，保留选择和搜索条件"""
+        if isinstance(patch, Exception):
+            self._reloading = False
+            self.show_message(f"重新读取文件出错: {str(patch)}")
+            return
+        if self._background_jobs:
+            # 后台任务（优化、导出、读取存档等）可能正在读取数据，结束后再修改
+            self.root.after(LOAD_POLL_MS, self.apply_reload, patch)
+            return
+        self._reloading = False
 
-        # 显示科技
-        if techs:
-            self.info_text.insert(tk.END, "## 所需科技\n")
-            for tech in sorted(techs):
-                self.info_text.insert(tk.END, f"- {tech}\n")
-            self.info_text.insert(tk.END, "\n")
-
-        # 显示地块
-        if regions:
-            self.info_text.insert(tk.END, "## 所需地块\n")
-            for region in sorted(regions):
-                self.info_text.insert(tk.END, f"- {region}\n")
-            self.info_text.insert(tk.END, "\n")
-
-        # 显示必需建筑
-        if buildings:
-            self.info_text.insert(tk.END, "## 基础建筑\n")
-            for building, count in sorted(
-                buildings.items(), key=lambda x: x[1], reverse=True
-            ):
-                self.info_text.insert(tk.END, f"- {building} ({count}个公司)\n")
-            self.info_text.insert(tk.END, "\n")
-
-        # 显示可选建筑
-        if optional_buildings:
-            self.info_text.insert(tk.END, "## 可选建筑\n")
-            for building, count in sorted(
-                optional_buildings.items(), key=lambda x: x[1], reverse=True
-            ):
-                self.info_text.insert(tk.END, f"- {building} ({count}个公司)\n")
-            self.info_text.insert(tk.END, "\n")
-
-        # 显示繁荣效果
-        if bonuses:
-            self.info_text.insert(tk.END, "## 繁荣效果\n")
-            for bonus, count in sorted(
-                bonuses.items(), key=lambda x: x[1], reverse=True
-            ):
-                self.info_text.insert(tk.END, f"- {bonus} ({count}个公司)\n")
-            self.info_text.insert(tk.END, "\n")
-
-        # 显示名贵产品
-        if luxuries:
-            self.info_text.insert(tk.END, "## 名贵商品\n")
-            for luxury in sorted(luxuries):
-                self.info_text.insert(tk.END, f"- {luxury}\n")
-            self.info_text.insert(tk.END, "\n")
-
-        # 显示特殊名贵数量
-        if special_luxuries > 0:
-            self.info_text.insert(tk.END, f"## 特殊名贵商品数量: {special_luxuries}\n\n")
-
-        # 显示选中的公司列表
-        self.info_text.insert(tk.END, "## 选中的公司\n")
-        for company in sorted(selected_companies):
-            self.info_text.insert(tk.END, f"- {company}\n")
+        # 覆盖层目录中可能新增或删除了文件
+        paths = self.repository.watch_paths()
+        if list(self.watcher.paths) != paths:
+            self.watcher = FileWatcher(*paths)
+        if patch is None:
+            return
 
-        # 禁用文本框编辑
-        self.info_text.config(state=tk.DISABLED)
+        # 后台搜索线程可能正在读索引，修改期间持有搜索锁
+        with self.search_scheduler.lock:
+            diff = self.repository.apply_patch(patch, [self.aggregator])
+            self.search_index = self.repository.localized_index(self.locale)
+        self.search_scheduler.set_index(self.search_index)
+
+        for company in diff.removed + diff.modified:
+            self.row_texts.pop(company, None)
+        self.selected_companies.difference_update(diff.removed)
+        self.all_companies = self.repository.companies
+        if self.eligibility is not None:
+            # 新增或修改的公司按当前条件重新判断
+            conditions = self.eligibility.conditions
+            self._set_eligibility(self.repository.eligibility().mask(conditions))
+
+        # 按当前搜索条件重新筛选，不改变滚动位置
+        search_text = self.search_var.get()
+        if search_text.strip():
+            companies = self.repository.search(search_text, self.locale)
+        else:
+            companies = self.all_companies
+        self.show_companies(companies, keep_position=True)
+        self.render_visible_rows(force=True)
+        self.update_info_display()
+        # 重新预生成行文字：旧任务遍历的是重载前的公司列表
+        self.run_in_slices(self._prepare_row_texts(self.all_companies))
 
     def on_frame_configure(self, event):
-        """当框架大小改变时更新Canvas的滚动区域"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        """当列表行数改变时更新Canvas的滚动区域，同一批次内只计算一次"""
+        self.layout.defer("scrollregion", self._update_scrollregion)
+
+    def _update_scrollregion(self):
+        height = self.header_height + len(self.visible_companies) * self.row_height
+        self.canvas.configure(scrollregion=(0, 0, self.canvas_width, height))
 
     def on_canvas_configure(self, event):
-        """当Canvas大小改变时调整内部框架宽度"""
+        """当Canvas大小改变时调整行宽度并重新绑定可见行"""
         # 获取Canvas宽度
-        canvas_width = event.width
-        # 设置内部框架宽度
-        self.canvas.itemconfig(self.canvas_frame, width=canvas_width)
+        self.canvas_width = event.width
+        # 设置表头和每个复用行的宽度
+        width = max(self.canvas_width - 2 * ROW_PADDING, 1)
+        for row in self.row_pool:
+            self.canvas.itemconfig(row["item"], width=width)
+        self.on_frame_configure(None)
+        self.render_visible_rows()
+
+    def _on_canvas_yscroll(self, first, last):
+        """Canvas视口移动时同步滚动条并更新可见行"""
+        self.scrollbar.set(first, last)
+        self.render_visible_rows()
 
     def _show_search_hint(self):
         """显示搜索提示"""
@@ -490,122 +1524,146 @@ class CompanyAnalyzer:
             self.search_hint.place(relx=0.05, rely=0.5, anchor="w")
 
     def on_search_change(self, *args):
-        """当搜索框内容改变时过滤公司列表"""
-        search_text = self.search_var.get().lower()
-        self.filter_companies(search_text)
+        """当搜索框内容改变时，交给后台搜索调度器"""
+        # 数据尚未读取完成，等读取完成后再搜索
+        if self.search_scheduler is None:
+            return
+        self.search_scheduler.submit(self.search_var.get())
+
+    def on_search_result(self, search_text, matched_companies):
+        """后台搜索完成后应用最新的结果"""
+        self.show_companies(matched_companies)
 
     def clear_search(self):
         """清除搜索框内容"""
         self.search_var.set("")
         self._show_search_hint()
+        if self.search_scheduler is not None:
+            self.search_scheduler.cancel()
         self.filter_companies("")
 
     def filter_companies(self, search_text):
-        """根据搜索文本过滤公司列表"""
+        """根据搜索文本同步过滤公司列表，支持 字段:关键词 以及 AND/OR/NOT"""
         # 如果搜索文本为空，显示所有公司
-        if not search_text:
-            for company, frame in self.company_frames.items():
-                frame.pack(fill=tk.X, padx=5, pady=5)
-            return
-
-        # 隐藏所有公司
-        for company, frame in self.company_frames.items():
-            frame.pack_forget()
-
-        # 找出匹配的公司
-        matched_companies = []
-        for company in sorted(self.company_data.keys()):
-            # 检查公司名称是否匹配
-            if search_text in company.lower():
-                matched_companies.append(company)
-                continue
-
-            # 检查公司信息是否匹配
-            company_info = self.company_data[company]
-            # 检查科技
-            if (
-                "科技" in company_info
-                and company_info["科技"]
-                and company_info["科技"] != "NULL"
-                and search_text in str(company_info["科技"]).lower()
-            ):
-                if company not in matched_companies:
-                    matched_companies.append(company)
-                continue
-
-            # 检查地块
-            if (
-                "地块" in company_info
-                and company_info["地块"]
-                and company_info["地块"] != "NULL"
-                and search_text in str(company_info["地块"]).lower()
-            ):
-                if company not in matched_companies:
-                    matched_companies.append(company)
-                continue
-
-            # 检查名贵
-            if (
-                "名贵" in company_info
-                and company_info["名贵"]
-                and company_info["名贵"] != "NULL"
-                and search_text in str(company_info["名贵"]).lower()
-            ):
-                if company not in matched_companies:
-                    matched_companies.append(company)
-                continue
-
-            # 检查建筑
-            if isinstance(company_info.get("建筑"), list):
-                for building in company_info["建筑"]:
-                    if search_text in building.lower():
-                        if company not in matched_companies:
-                            matched_companies.append(company)
-                        break
-
-            # 检查可选建筑
-            if isinstance(company_info.get("建筑_可选"), list):
-                for building in company_info["建筑_可选"]:
-                    if search_text in building.lower():
-                        if company not in matched_companies:
-                            matched_companies.append(company)
-                        break
-
-            # 检查繁荣效果
-            if isinstance(company_info.get("繁荣"), list):
-                for bonus in company_info["繁荣"]:
-                    if search_text in bonus.lower():
-                        if company not in matched_companies:
-                            matched_companies.append(company)
-                        break
-
-        # 按顺序显示匹配的公司
-        for company in sorted(matched_companies):
-            self.company_frames[company].pack(fill=tk.X, padx=5, pady=5)
-
-        # 更新滚动区域
+        if not search_text.strip():
+            self.show_companies(self.all_companies)
+        else:
+            # 通过索引找出匹配的公司
+            self.show_companies(self.repository.search(search_text, self.locale))
+
+    def show_companies(self, companies, keep_position=False):
+        """只显示给定的公司（已排序）"""
+        if self.only_available_var.get() and self.unavailable_companies:
+            companies = [c for c in companies if c not in self.unavailable_companies]
+        self.visible_companies = companies
+
+        # 回到顶部，更新滚动区域并重新绑定可见行
+        if not keep_position:
+            self.canvas.yview_moveto(0)
         self.on_frame_configure(None)
+        self.render_visible_rows()
+
 
-    def _show_company(self, company, show_separator=True):
-        """显示公司"""
-        if company in self.company_frames:
-            self.company_frames[company].pack(fill=tk.X, padx=5, pady=5)
+def _split_names(text):
+    """把逗号分隔的名称拆成列表，留空时返回None（表示不限制）"""
+    names = [name.strip() for name in text.replace("，", ",").split(",")]
+    names = [name for name in names if name]
+    return names or None
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="哈气治国-公司分析器")
+    parser.add_argument(
+        "--timeline", action="store_true", help="首次绘制后打印启动时间线"
+    )
+    parser.add_argument(
+        "--overlay",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="叠加在 company.ini 之上的覆盖层文件或目录，可重复，后者优先",
+    )
+    parser.add_argument(
+        "--save", metavar="PATH", help="启动后读取的存档（文本格式，可以是 zip）"
+    )
+    parser.add_argument("--country", help="存档中的国家标签，省略时使用玩家国家")
+    parser.add_argument("--game-dir", help="游戏的 game 目录，用于读取本地化")
+    parser.add_argument(
+        "--localization",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="本地化文件或目录，可重复",
+    )
+    parser.add_argument(
+        "--icons", metavar="PATH", help="图标图集文件，默认为 icons.atlas"
+    )
+    parser.add_argument(
+        "--locales", metavar="PATH", help="文字表文件，默认为 locales.pack"
+    )
+    parser.add_argument("--language", help="显示语言，如 en（需要文字表文件）")
+    parser.add_argument(
+        "--presets", metavar="PATH", help="公司组合方案文件，默认为 presets.json"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="记录事件处理函数的耗时和Tk调用次数，F12 显示叠加层",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="退出时把插桩数据导出为 trace event JSON（隐含 --profile）",
+    )
+    args = parser.parse_args()
+
+    # 启动时间线
+    timeline = StartupTimeline()
+    profiler = HandlerProfiler() if args.profile or args.trace else None
+
     # 创建主窗口
-    root = tk.Tk()
+    with timeline.phase("tk_init"):
+        root = tk.Tk()
+    if profiler is not None:
+        profiler.install(root)
 
     # 设置中文字体支持
-    default_font = font.nametofont("TkDefaultFont")
-    default_font.configure(family="SimHei", size=10)
-    text_font = font.nametofont("TkTextFont")
-    text_font.configure(family="SimHei", size=10)
-    fixed_font = font.nametofont("TkFixedFont")
-    fixed_font.configure(family="SimHei", size=10)
+    with timeline.phase("font_setup"):
+        default_font = font.nametofont("TkDefaultFont")
+        default_font.configure(family="SimHei", size=10)
+        text_font = font.nametofont("TkTextFont")
+        text_font.configure(family="SimHei", size=10)
+        fixed_font = font.nametofont("TkFixedFont")
+        fixed_font.configure(family="SimHei", size=10)
 
     # 创建应用
-    app = CompanyAnalyzer(root)
+    app = CompanyAnalyzer(
+        root,
+        timeline=timeline,
+        profiler=profiler,
+        overlays=args.overlay,
+        save_path=args.save,
+        save_country=args.country,
+        game_dir=args.game_dir,
+        localization=args.localization,
+        icons_path=args.icons,
+        locales_path=args.locales,
+        language=args.language,
+        presets_path=args.presets,
+    )
+
+    if args.timeline:
+
+        def print_timeline():
+            if timeline.get("first_rows_painted") is None:
+                root.after(100, print_timeline)
+            else:
+                print(timeline.format())
+
+        root.after(100, print_timeline)
 
     # 运行主循环
     root.mainloop()
+
+    if args.trace:
+        profiler.export(args.trace, timeline)
@@ -0,0 +1,368 @@
+"""性能基准
+
+生成 company.ini 格式的合成数据集（中文名称、列表、NULL），测量：
+
+- parse：解析INI文本
+- model_build：建立紧凑的公司模型（名称表 + 记录）
+- index_build：建立搜索索引
+- cache_load：从编译缓存加载
+- populate：列表填充（Tk部分用桩对象代替，不需要显示器）
+- keystroke：逐字输入查询时每次按键的搜索耗时
+- toggle：逐个勾选公司时的增量汇总与渲染
+- select_all：全选后一次性汇总与渲染
+- preset_switch：在两个方案之间来回切换10次（汇总按选择缓存）
+
+结果以JSON输出，可以与保存的基线比较，发现性能回退：
+
+    python company_bench.py --sizes 100 10000 --output bench.json
+    python company_bench.py --baseline bench.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import company_cache
+from company_core import CompanyRepository
+from company_data import parse_company_text, split_sections
+from company_model import CompanyModel
+from company_search import SearchIndex
+
+DEFAULT_SIZES = (100, 10000, 100000)
+
+# 回退判定阈值：比基线慢 20% 以上视为回退
+DEFAULT_THRESHOLD = 0.2
+
+_NAME_PREFIXES = (
+    "通用 王家 联合 帝国 北方 南方 东方 西方 大西洋 太平洋 "
+    "莱茵 多瑙 伏尔加 密西西比 恒河 长江 尼罗 亚马逊 阿尔卑斯"
+).split()
+_NAME_CORES = (
+    "钢铁 机械 化工 纺织 造船 铁路 电气 矿业 石油 橡胶 "
+    "玻璃 瓷器 家具 食品 谷物 渔业 林业 军火 汽车 航运"
+).split()
+_NAME_SUFFIXES = "公司 集团 工厂 船厂 商会 联合体 制造厂".split()
+_BUILDINGS = (
+    "肥料厂 食品厂 化学合成厂 硫矿 染料作物种植园 工艺装备工坊 动力机械厂 "
+    "汽车工业 炼钢厂 弹药厂 铁矿 玻璃厂 铅矿 家具制造厂 伐木营地 造船厂 "
+    "军用造船厂 纺织厂 棉花种植园 畜牧场 煤矿 油井 橡胶种植园 港口 造纸厂 "
+    "武器厂 火炮铸造厂 金矿 发电厂"
+).split()
+_TECHS = "苯胺 铁路 平炉炼钢法 化学漂白 内燃机 橡胶塑炼 电力 炸药".split()
+_REGIONS = (
+    "西兰 巴登 中匈牙利 波西米亚 萨克森 奥地利 西普鲁士 皮埃蒙特 西奈 "
+    "尼日尔战略区 兰开夏 鲁尔 阿尔萨斯 伦巴第 加泰罗尼亚"
+).split()
+_BONUS_TARGETS = (
+    "创新力 威望 影响力 陆军进攻 海军进攻 编队速度 行政力 来自政治运动的激进派 "
+    "机构行政力花费乘数 殖民地发展速度 出生率"
+).split()
+_LUXURIES = "精炼钢 精密工具 德意志苯胺 波西米亚水晶 曲木家具 特选咖啡".split()
+
+
+def _json_list(values):
+    return "[" + ",".join(f'"{v}"' for v in values) + "]"
+
+
+def generate_dataset(size, seed=0):
+    """生成 size 个公司的 company.ini 文本"""
+    rng = random.Random(seed)
+    lines = [";合成基准数据\n"]
+    for i in range(size):
+        name = (
+            rng.choice(_NAME_PREFIXES)
+            + rng.choice(_NAME_CORES)
+            + rng.choice(_NAME_SUFFIXES)
+            + str(i)
+        )
+        bonuses = []
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.6:
+                building = rng.choice(_BUILDINGS)
+                bonuses.append(f"+{rng.choice((5, 10, 15))}%{building}吞吐量")
+            else:
+                sign = rng.choice("+-")
+                target = rng.choice(_BONUS_TARGETS)
+                bonuses.append(f"{sign}{rng.choice((5, 10))}%{target}")
+        tech = f'"{rng.choice(_TECHS)}"' if rng.random() < 0.4 else "NULL"
+        region = f'"{rng.choice(_REGIONS)}"' if rng.random() < 0.5 else "NULL"
+        luxury = f'"{rng.choice(_LUXURIES)}"' if rng.random() < 0.7 else "NULL"
+        lines.append(
+            f"\n[{name}]\n"
+            "特殊前置 = NULL\n"
+            f"科技 = {tech}\n"
+            f"地块 = {region}\n"
+            f"建筑 = {_json_list(rng.sample(_BUILDINGS, rng.randint(1, 3)))}\n"
+            f"建筑_可选 = {_json_list(rng.sample(_BUILDINGS, rng.randint(0, 2)))}\n"
+            f"繁荣 = {_json_list(bonuses)}\n"
+            f"名贵 = {luxury}\n"
+            f"特殊名贵 = {rng.choice(('True', 'False'))}\n"
+        )
+    return "".join(lines)
+
+
+def _best_of(repeat, func):
+    """执行 repeat 次，返回最短耗时（秒）和最后一次的返回值"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class _StubRoot:
+    """代替Tk根窗口：after_idle 的回调在 drain 时依次执行"""
+
+    def __init__(self):
+        self.idle = []
+
+    def after(self, ms, func, *args):
+        return None
+
+    def after_idle(self, func, *args):
+        self.idle.append((func, args))
+        return len(self.idle)
+
+    def after_cancel(self, after_id):
+        pass
+
+    def drain(self):
+        while self.idle:
+            func, args = self.idle.pop(0)
+            func(*args)
+
+
+class _StubWidget:
+    """代替Tk组件，接受并忽略所有调用"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def canvasy(self, y):
+        return 0.0
+
+    def winfo_height(self):
+        return 700
+
+
+class _StubVar:
+    def __init__(self):
+        self.value = False
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def _stub_analyzer(frame_budget_ms):
+    """构造一个不创建任何Tk组件的 CompanyAnalyzer"""
+    from company_aggregate import SummaryCache
+    from company_analyze import CompanyAnalyzer
+    from company_layout import LayoutManager
+    from company_locale import Locale
+
+    app = object.__new__(CompanyAnalyzer)
+    app.root = _StubRoot()
+    app.layout = LayoutManager(app.root)
+    app.canvas = _StubWidget()
+    app.info_text = _StubWidget()
+    app.search_var = _StubVar()
+    app.timeline = None
+    app.frame_budget_ms = frame_budget_ms
+    app._slice_id = None
+    app._background_jobs = 0
+    app.search_scheduler = None
+    app.all_companies = []
+    app.visible_companies = []
+    app.selected_companies = set()
+    app.unavailable_companies = set()
+    app.eligibility = None
+    app.save_match = None
+    app.only_available_var = _StubVar()
+    app.icons = None
+    app.locales = None
+    app.locale = Locale()
+    app._render_cache = SummaryCache()
+    app._summary_icons = []
+    app._summary_placed = set()
+    app._summary_images = []
+    app.row_texts = {}
+    app.row_pool = []
+    app.row_height = 110
+    app.header_height = 30
+    app.canvas_width = 800
+    app._create_row = lambda: {
+        "frame": None,
+        "company": None,
+        "index": None,
+        "grey": False,
+        "item": None,
+        "var": _StubVar(),
+        "labels": [_StubWidget() for _ in range(5)],
+    }
+    app.row_pool.append(app._create_row())
+    return app
+
+
+def bench_size(size, repeat=3, seed=0, query="科技:苯胺 建筑:炼钢厂 -地块:西奈"):
+    """对一个规模的数据集执行全部测量，返回 {指标: 秒}"""
+    text = generate_dataset(size, seed)
+    results = {"sections": size, "bytes": len(text.encode("utf-8"))}
+    big = size >= 100000
+    runs = 1 if big else repeat
+
+    results["parse"], company_data = _best_of(runs, lambda: parse_company_text(text))
+    results["split_sections"], _ = _best_of(runs, lambda: split_sections(text))
+    results["model_build"], model = _best_of(runs, lambda: CompanyModel(company_data))
+    results["index_build"], index = _best_of(runs, lambda: SearchIndex(model))
+
+    # 缓存：写入临时目录后测量加载
+    workdir = tempfile.mkdtemp(prefix="company_bench_")
+    try:
+        ini_path = os.path.join(workdir, "company.ini")
+        with open(ini_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        CompanyRepository.load(ini_path)
+        results["cache_load"], _ = _best_of(runs, lambda: company_cache.load(ini_path))
+        repo = CompanyRepository.load(ini_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # 逐字输入：每个前缀的搜索耗时
+    samples = []
+    for end in range(1, len(query) + 1):
+        start = time.perf_counter()
+        index.search(query[:end])
+        samples.append(time.perf_counter() - start)
+    results["keystroke_mean"] = statistics.mean(samples)
+    results["keystroke_p95"] = _percentile(samples, 0.95)
+
+    # 列表填充（桩化的Tk）
+    try:
+        app = _stub_analyzer(frame_budget_ms=8)
+    except ImportError:
+        app = None
+    if app is not None:
+        start = time.perf_counter()
+        app.apply_company_data(repo)
+        app.populate_company_list()
+        results["populate_first_rows"] = time.perf_counter() - start
+        app.root.drain()
+        results["populate_all"] = time.perf_counter() - start
+
+    # 逐个勾选的增量汇总
+    rng = random.Random(seed)
+    toggles = rng.sample(repo.companies, min(200, len(repo.companies)))
+    aggregator = repo.aggregator()
+    samples = []
+    for company in toggles:
+        start = time.perf_counter()
+        aggregator.add(company)
+        aggregator.render()
+        samples.append(time.perf_counter() - start)
+    results["toggle_mean"] = statistics.mean(samples)
+    results["toggle_p95"] = _percentile(samples, 0.95)
+
+    def select_all():
+        aggregator.clear()
+        aggregator.set_selection(repo.companies)
+        return aggregator.render()
+
+    results["select_all"], _ = _best_of(runs, select_all)
+
+    half = len(toggles) // 2
+    presets = [toggles[:half], toggles[half:]]
+
+    def preset_switch():
+        for companies in presets * 5:
+            repo.summarize(companies)
+
+    results["preset_switch"], _ = _best_of(runs, preset_switch)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """与基线比较，返回回退列表 [(规模, 指标, 基线, 当前)]"""
+    regressions = []
+    for size, metrics in results["results"].items():
+        base_metrics = baseline.get("results", {}).get(size)
+        if not base_metrics:
+            continue
+        for metric, value in metrics.items():
+            if metric in ("sections", "bytes"):
+                continue
+            base = base_metrics.get(metric)
+            if base and value > base * (1 + threshold):
+                regressions.append((size, metric, base, value))
+    return regressions
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="公司分析器性能基准")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="数据集规模"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", help="结果JSON文件，省略时输出到标准输出")
+    parser.add_argument("--baseline", help="用于比较的基线JSON文件")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="回退判定阈值"
+    )
+    parser.add_argument("--generate", type=int, help="只生成该规模的数据集并输出")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        sys.stdout.write(generate_dataset(args.generate, args.seed))
+        return 0
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {},
+    }
+    for size in args.sizes:
+        results["results"][str(size)] = bench_size(size, args.repeat, args.seed)
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for size, metric, base, value in regressions:
+            print(
+                f"回退: {size} {metric} {base * 1000:.3f}ms -> {value * 1000:.3f}ms",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""company.ini 的编译缓存
+
+把解析后的公司数据和搜索索引用 marshal 写入与ini同目录的缓存文件，
+下次启动时只需映射文件并反序列化，跳过 configparser 和 json 解析。
+
+文件布局：
+
+    魔数(4字节) | 版本、头部长度(<II) | 头部(marshal) | 数据(marshal)
+
+头部记录ini的绝对路径、mtime、大小和内容哈希。路径、mtime、大小都一致时
+直接使用缓存；否则计算内容哈希，内容未变（例如只是被touch过）也可复用，
+并写回新的头部。
+
+同一个ini可以有多种缓存（由 suffix 区分），例如完整的模型和索引，
+以及多层加载时单个文件的解析结果。
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+
+MAGIC = b"HQCC"
+
+# 解析结果或索引结构变化时递增，旧缓存会自动失效
+CACHE_VERSION = 4
+
+# 完整缓存（模型 + 索引）的文件后缀
+CACHE_SUFFIX = ".cache"
+
+_PREFIX = struct.Struct("<II")
+_HEADER_OFFSET = len(MAGIC) + _PREFIX.size
+
+
+def cache_path(ini_path, suffix=CACHE_SUFFIX):
+    """返回ini对应的缓存文件路径"""
+    return ini_path + suffix
+
+
+def file_hash(path):
+    """计算文件内容哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_key(ini_path, with_hash=True):
+    """生成ini文件的缓存键"""
+    st = os.stat(ini_path)
+    key = {
+        "path": os.path.abspath(ini_path),
+        "mtime": st.st_mtime_ns,
+        "size": st.st_size,
+    }
+    if with_hash:
+        key["hash"] = file_hash(ini_path)
+    return key
+
+
+def load(ini_path, suffix=CACHE_SUFFIX):
+    """读取有效的缓存，返回保存时的数据字典，无效时返回None"""
+    path = cache_path(ini_path, suffix)
+    try:
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            view = memoryview(mm)
+            try:
+                result = _load_view(ini_path, view)
+            finally:
+                view.release()
+    except (OSError, ValueError, EOFError, TypeError, struct.error):
+        # 缓存不存在、为空或已损坏，都按无缓存处理
+        return None
+    if result is None:
+        return None
+    data, refresh = result
+    if refresh is not None:
+        # 内容未变但 mtime 或大小变了：写回新的头部，下次启动不必再算哈希
+        key, payload = refresh
+        _write(path, key, payload)
+    return data
+
+
+def _load_view(ini_path, view):
+    """从映射的缓存内容中校验并取出数据
+
+    返回 (数据, 需要刷新的头部)，后者为None或 (新的缓存键, 数据原文)。
+    """
+    if view[: len(MAGIC)] != MAGIC:
+        return None
+    version, header_len = _PREFIX.unpack_from(view, len(MAGIC))
+    if version != CACHE_VERSION:
+        return None
+
+    header_end = _HEADER_OFFSET + header_len
+    header = marshal.loads(view[_HEADER_OFFSET:header_end])
+    current = source_key(ini_path, with_hash=False)
+    if current["path"] != header["path"]:
+        return None
+
+    # mtime或大小变化时再比较内容哈希
+    refresh = None
+    if current["mtime"] != header["mtime"] or current["size"] != header["size"]:
+        current["hash"] = file_hash(ini_path)
+        if current["hash"] != header["hash"]:
+            return None
+        refresh = (current, bytes(view[header_end:]))
+
+    return marshal.loads(view[header_end:]), refresh
+
+
+def save(ini_path, key, payload, suffix=CACHE_SUFFIX):
+    """写入缓存，payload 必须可被 marshal 序列化；写入失败（如目录只读）时静默跳过
+
+    key 是读取ini之前取得的 source_key(ini_path)：解析期间文件被修改时，
+    缓存记录的仍是解析前的状态，下次加载会发现不一致并重新解析。
+    """
+    try:
+        payload = marshal.dumps(payload)
+    except ValueError:
+        return
+    _write(cache_path(ini_path, suffix), key, payload)
+
+
+def _write(path, key, payload):
+    """把缓存键和已序列化的数据写入缓存文件"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        header = marshal.dumps(key)
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_PREFIX.pack(CACHE_VERSION, len(header)))
+            f.write(header)
+            f.write(payload)
+        # 原子替换，避免其他进程读到写了一半的缓存
+        os.replace(tmp_path, path)
+    except (OSError, ValueError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,222 @@
+"""批量查询命令行
+
+从标准输入或文件逐行读取请求，每个请求输出一行JSON（JSON Lines）。
+不导入tkinter，可在无显示环境中使用。
+
+请求可以是一行JSON：
+
+    {"op": "search", "query": "科技:苯胺"}
+    {"op": "company", "name": "巴斯夫"}
+    {"op": "aggregate", "companies": ["巴斯夫", "科汉森"]}
+    {"op": "optimize", "slots": 5, "weights": {"畜牧场吞吐量": 1}}
+    {"op": "synergy", "name": "巴斯夫", "top": 10}
+    {"op": "eligible", "techs": ["苯胺"], "regions": ["巴登"], "best": 5}
+    {"op": "compare", "selections": {"化工": ["巴斯夫"], "食品": ["科汉森"]}}
+
+也可以是一行普通文本，视为搜索查询。请求中的 "id" 会原样写回结果。
+
+    python company_cli.py requests.jsonl
+    echo "建筑:炼钢厂" | python company_cli.py
+"""
+
+import argparse
+import json
+import sys
+
+from company_core import CompanyRepository
+from company_data import DEFAULT_INI_PATH
+
+
+def _text(request, key):
+    """请求中的文本字段，省略时为空串"""
+    value = request.get(key, "")
+    if not isinstance(value, str):
+        raise ValueError(f"{key} 必须是字符串")
+    return value
+
+
+def _is_names(value):
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _names(request, key):
+    """请求中的名称列表，省略时为None"""
+    value = request.get(key)
+    if value is None:
+        return None
+    if not _is_names(value):
+        raise ValueError(f"{key} 必须是名称列表")
+    return value
+
+
+def _slots(request):
+    """optimize 请求中的公司数量，必须是正整数"""
+    if "slots" not in request:
+        raise ValueError("缺少字段: slots")
+    slots = request["slots"]
+    if isinstance(slots, bool) or not isinstance(slots, int) or slots < 1:
+        raise ValueError("slots 必须是正整数")
+    return slots
+
+
+def _weights(request):
+    """optimize 请求中的效果权重 {效果名: 数值}，省略时为None"""
+    weights = request.get("weights")
+    if weights is None:
+        return None
+    if not isinstance(weights, dict) or not all(
+        isinstance(target, str)
+        and isinstance(weight, (int, float))
+        and not isinstance(weight, bool)
+        for target, weight in weights.items()
+    ):
+        raise ValueError("weights 必须是 {效果名: 数值}")
+    return {target: float(weight) for target, weight in weights.items()}
+
+
+def handle_request(repo, request):
+    """处理一个请求，返回结果字典"""
+    if not isinstance(request, dict):
+        request = {"op": "search", "query": str(request)}
+    op = request.get("op", "search")
+
+    if op == "search":
+        companies = repo.search(_text(request, "query"))
+        result = {"count": len(companies), "companies": companies}
+    elif op == "company":
+        name = _text(request, "name")
+        if name not in repo:
+            raise ValueError(f"公司不存在: {name}")
+        result = {
+            "name": name,
+            "info": repo.get(name),
+            "layer": repo.company_data.layer_of(name),
+        }
+    elif op == "aggregate":
+        companies = _names(request, "companies")
+        if companies is None:
+            companies = repo.search(_text(request, "query"))
+        result = repo.summarize(companies)
+    elif op == "optimize":
+        from company_optimizer import solution_to_dict
+
+        optimized = repo.optimizer().optimize(
+            _slots(request),
+            weights=_weights(request),
+            coverage_weight=float(request.get("coverage", 0.0)),
+            optional_weight=float(request.get("optional_coverage", 0.0)),
+            techs=_names(request, "techs"),
+            regions=_names(request, "regions"),
+            required=_names(request, "required") or (),
+            excluded=_names(request, "excluded") or (),
+            top_k=int(request.get("top", 5)),
+            time_limit=float(request.get("time_limit", 2.0)),
+        )
+        result = {
+            "complete": optimized.complete,
+            "solutions": [solution_to_dict(s) for s in optimized.solutions],
+        }
+    elif op == "synergy":
+        from company_synergy import pair_to_dict
+
+        name = _text(request, "name")
+        if name not in repo:
+            raise ValueError(f"公司不存在: {name}")
+        pairs = repo.synergy().row(name)[: int(request.get("top", 20))]
+        result = {"name": name, "pairs": [pair_to_dict(name, p) for p in pairs]}
+    elif op == "eligible":
+        from company_eligibility import Conditions, unlock_to_dict
+
+        conditions = Conditions(
+            _names(request, "techs"),
+            _names(request, "regions"),
+            _names(request, "prereqs"),
+        )
+        engine = repo.eligibility()
+        mask = engine.mask(conditions)
+        result = {
+            "count": len(mask),
+            "companies": mask.names(),
+            "best_techs": [
+                unlock_to_dict(unlock)
+                for unlock in engine.unlocks(conditions, int(request.get("best", 5)))
+            ],
+        }
+    elif op == "compare":
+        from company_presets import compare_selections, row_to_dict
+
+        selections = request.get("selections")
+        if (
+            not isinstance(selections, dict)
+            or not selections
+            or not all(map(_is_names, selections.values()))
+        ):
+            raise ValueError("selections 必须是 {方案名: [公司名]}")
+        names = list(selections)
+        rows = compare_selections(repo, selections)
+        if request.get("only_diff"):
+            rows = [row for row in rows if row.differs]
+        result = {"names": names, "rows": [row_to_dict(row, names) for row in rows]}
+    else:
+        raise ValueError(f"未知的操作: {op}")
+
+    result = {"op": op, **result}
+    if "id" in request:
+        result["id"] = request["id"]
+    return result
+
+
+def parse_line(line):
+    """把一行输入解析为请求，非JSON的内容作为搜索查询"""
+    text = line.strip()
+    if text.startswith("{"):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+    return {"op": "search", "query": text}
+
+
+def run(repo, lines, output):
+    """逐行处理请求并流式写出结果"""
+    for line in lines:
+        if not line.strip():
+            continue
+        request = parse_line(line)
+        try:
+            result = handle_request(repo, request)
+        except Exception as e:
+            result = {"error": str(e)}
+            if "id" in request:
+                result["id"] = request["id"]
+        output.write(json.dumps(result, ensure_ascii=False))
+        output.write("\n")
+        output.flush()
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="公司数据批量查询（JSON Lines）")
+    parser.add_argument("input", nargs="?", help="请求文件，省略时读取标准输入")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay",
+        action="append",
+        default=[],
+        help="叠加在数据文件之上的覆盖层文件或目录，可重复，后者优先",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不使用编译缓存")
+    args = parser.parse_args(argv)
+
+    repo = CompanyRepository.load(
+        args.ini, use_cache=not args.no_cache, overlays=args.overlay
+    )
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            run(repo, f, sys.stdout)
+    else:
+        run(repo, sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
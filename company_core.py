@@ -0,0 +1,266 @@
+"""不依赖界面的公司分析核心
+
+CompanyRepository 负责读取数据并提供查询、汇总和组合优化接口，
+图形界面、命令行和脚本都通过它访问数据。本模块不导入tkinter。
+
+    from company_core import CompanyRepository
+
+    repo = CompanyRepository.load()
+    names = repo.search("科技:苯胺 建筑:肥料厂")
+    summary = repo.summarize(names)
+"""
+
+from collections import namedtuple
+
+from company_aggregate import SelectionAggregator, SummaryCache
+from company_data import (
+    DEFAULT_INI_PATH,
+    diff_sections,
+    load_company_data,
+    parse_company_text,
+    split_sections,
+)
+from company_layers import LayerStack
+from company_model import CompanyModel
+from company_modifiers import ModifierMatrix
+from company_profile import timeline_phase
+from company_search import SearchIndex
+
+
+# 热重载补丁：差异、变化公司的新数据、新的各公司原文，
+# 以及（多层加载时）变化公司所在的层文件
+ReloadPatch = namedtuple(
+    "ReloadPatch", ["diff", "changed", "sections", "origins"], defaults=(None,)
+)
+
+
+class CompanyRepository:
+    """公司数据仓库：公司模型、搜索索引和繁荣效果矩阵
+
+    company_data 是 CompanyModel，传入普通字典时会转换。
+
+    version 在每次数据变化后递增，可用于判断缓存的结果是否过期。
+    使用覆盖层时 layers 是 LayerStack，否则为None。
+    """
+
+    def __init__(
+        self,
+        company_data=None,
+        search_index=None,
+        modifiers=None,
+        ini_path=None,
+        section_texts=None,
+        layers=None,
+    ):
+        if not isinstance(company_data, CompanyModel):
+            company_data = CompanyModel(company_data)
+        self.company_data = company_data
+        self.search_index = search_index or SearchIndex(self.company_data)
+        self.modifiers = modifiers or ModifierMatrix(self.company_data)
+        self.companies = sorted(self.company_data)
+        self.ini_path = ini_path
+        self.section_texts = section_texts if section_texts is not None else {}
+        self.layers = layers
+        self.version = 0
+        self._optimizer = None
+        self._synergy = None
+        # 科技前置关系（company_eligibility.TechGraph），None 表示没有前置
+        self.tech_graph = None
+        self._eligibility = None
+        # 各语言的搜索索引 {语言: 索引}，第一次用该语言搜索时建立
+        self._localized = {}
+        # summarize 的结果，键含数据版本，数据变化后旧结果自然不再命中
+        self.summaries = SummaryCache()
+        self._company_index = None
+
+    @classmethod
+    def load(
+        cls, ini_path=DEFAULT_INI_PATH, use_cache=True, timeline=None, overlays=()
+    ):
+        """从INI文件（或其编译缓存）读取数据，overlays 是按顺序叠加的覆盖层"""
+        if overlays:
+            layers = LayerStack(ini_path, overlays)
+            company_data, search_index, section_texts = layers.load(
+                use_cache=use_cache, timeline=timeline
+            )
+        else:
+            layers = None
+            company_data, search_index, section_texts = load_company_data(
+                ini_path, use_cache=use_cache, timeline=timeline
+            )
+        with timeline_phase(timeline, "modifiers"):
+            modifiers = ModifierMatrix(company_data)
+        return cls(
+            company_data, search_index, modifiers, ini_path, section_texts, layers
+        )
+
+    def watch_paths(self):
+        """热重载需要监视的文件和目录"""
+        if self.layers is not None:
+            return self.layers.watch_paths()
+        return [self.ini_path]
+
+    def check_changes(self):
+        """重新读取数据文件，只解析有变化的公司，返回 ReloadPatch
+
+        不修改仓库，可以在后台线程调用；没有变化时返回None。
+        """
+        if self.layers is not None:
+            return self._check_layers()
+        with open(self.ini_path, encoding="utf-8") as f:
+            sections = split_sections(f.read())
+        diff = diff_sections(self.section_texts, sections)
+        if not (diff.added or diff.removed or diff.modified):
+            return None
+        changed_text = "".join(sections[name] for name in diff.added + diff.modified)
+        changed = parse_company_text(changed_text, self.ini_path)
+        return ReloadPatch(diff, changed, sections)
+
+    def _check_layers(self):
+        """多层加载时的 check_changes：只重新解析缓存失效的层文件"""
+        merged = self.layers.read()
+        diff = diff_sections(self.section_texts, merged.sections)
+        # 原文相同但改由另一层提供的公司也需要更新其来源
+        moved = [
+            name
+            for name, origin in merged.origins.items()
+            if name in self.section_texts
+            and name not in diff.modified
+            and self.company_data.layer_of(name) != origin
+        ]
+        if moved:
+            diff = diff._replace(modified=sorted(diff.modified + moved))
+        if not (diff.added or diff.removed or diff.modified):
+            return None
+        changed_names = diff.added + diff.modified
+        changed = {name: merged.company_data[name] for name in changed_names}
+        origins = {name: merged.origins[name] for name in changed_names}
+        return ReloadPatch(diff, changed, merged.sections, origins)
+
+    def apply_patch(self, patch, aggregators=()):
+        """把 ReloadPatch 应用到数据、索引、效果矩阵和给定的汇总器上"""
+        diff = patch.diff
+        touched = diff.removed + diff.modified
+
+        # 先按旧数据把受影响的已选公司从汇总中扣除
+        reselect = []
+        for aggregator in aggregators:
+            for name in touched:
+                if name in aggregator.selected:
+                    aggregator.remove(name)
+                    if name in patch.changed:
+                        reselect.append((aggregator, name))
+                aggregator.forget(name)
+
+        for name in diff.removed:
+            del self.company_data[name]
+            self.search_index.remove(name)
+            self.modifiers.remove(name)
+        for name, info in patch.changed.items():
+            layer = patch.origins[name] if patch.origins else self.ini_path
+            self.company_data.set(name, info, layer)
+            record = self.company_data.record(name)
+            self.search_index.update(name, record)
+            self.modifiers.update(name, record)
+
+        for aggregator, name in reselect:
+            aggregator.add(name)
+
+        self.section_texts = patch.sections
+        if diff.added or diff.removed:
+            self.companies = sorted(self.company_data)
+            self._company_index = None
+        self.version += 1
+        self._optimizer = None
+        self._synergy = None
+        self._eligibility = None
+        for index in self._localized.values():
+            index.sync_locale()
+        return diff
+
+    def __len__(self):
+        return len(self.company_data)
+
+    def __contains__(self, name):
+        return name in self.company_data
+
+    def get(self, name):
+        """返回公司信息，不存在时返回None"""
+        return self.company_data.get(name)
+
+    def search(self, query, locale=None):
+        """执行查询，返回按名称排序的公司名列表
+
+        传入 locale（company_locale.Locale）时按该语言的显示文字匹配。
+        """
+        return self.localized_index(locale).search_names(query)
+
+    def localized_index(self, locale=None):
+        """返回（并缓存）按某个语言的显示文字匹配的搜索索引"""
+        if locale is None or locale.source:
+            return self.search_index
+        index = self._localized.get(locale.language)
+        if index is None:
+            index = self.search_index.localized(locale)
+            self._localized[locale.language] = index
+        return index
+
+    def aggregator(self, companies=()):
+        """创建一个汇总器，可选地预先选中一组公司"""
+        aggregator = SelectionAggregator(self.company_data, self.modifiers)
+        aggregator.set_selection(name for name in companies if name in self)
+        return aggregator
+
+    def selection_mask(self, companies):
+        """把一组公司编码为位集（第 i 位对应 companies[i]），用作缓存键"""
+        index = self._company_index
+        if index is None:
+            index = self._company_index = {
+                name: i for i, name in enumerate(self.companies)
+            }
+        bitmap = bytearray((len(index) + 7) // 8)
+        for name in companies:
+            i = index.get(name)
+            if i is not None:
+                bitmap[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(bitmap, "little")
+
+    def summarize(self, companies):
+        """汇总一组公司，返回可写入JSON的字典（调用方不应修改）
+
+        结果按 (选择的位集, 数据版本) 缓存。
+        """
+        key = (self.selection_mask(companies), self.version)
+        summary = self.summaries.get(key)
+        if summary is None:
+            summary = self.aggregator(companies).to_dict()
+            self.summaries.put(key, summary)
+        return summary
+
+    def optimizer(self):
+        """返回（并缓存）组合优化器"""
+        if self._optimizer is None:
+            from company_optimizer import PortfolioOptimizer
+
+            self._optimizer = PortfolioOptimizer(self.company_data, self.modifiers)
+        return self._optimizer
+
+    def synergy(self):
+        """返回（并缓存）公司建筑重叠矩阵"""
+        if self._synergy is None:
+            from company_synergy import SynergyMatrix
+
+            self._synergy = SynergyMatrix(self.company_data)
+        return self._synergy
+
+    def eligibility(self):
+        """返回（并缓存）公司建立条件的判断引擎"""
+        engine = self._eligibility
+        if engine is None or engine.tech_graph is not self.tech_graph:
+            from company_eligibility import EligibilityEngine
+
+            engine = EligibilityEngine(self.company_data, self.tech_graph)
+            if self.tech_graph is None:
+                self.tech_graph = engine.tech_graph
+            self._eligibility = engine
+        return engine
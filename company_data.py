@@ -0,0 +1,174 @@
+"""公司数据的读取与解析
+
+只依赖标准库，不导入tkinter。
+"""
+
+import configparser
+import json
+import os
+import re
+from collections import namedtuple
+
+import company_cache
+from company_model import CompanyModel
+from company_profile import timeline_phase
+from company_search import SearchIndex
+
+# 两个版本之间新增、删除和修改的公司
+SectionDiff = namedtuple("SectionDiff", ["added", "removed", "modified"])
+
+# 与 configparser 相同的段落标题格式
+_SECTION_RE = re.compile(r"^\[(.+)\]$")
+
+# 默认的数据文件，与程序放在同一目录
+DEFAULT_INI_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "company.ini"
+)
+
+
+def parse_value(value):
+    """把ini中的原始字符串转换为对应的Python值"""
+    # 处理数组类型的值
+    if value.startswith("[") and value.endswith("]"):
+        try:
+            # 解析JSON数组
+            return json.loads(value)
+        except json.JSONDecodeError:
+            # 如果解析失败，保留原始值
+            return value
+    # 处理布尔值
+    lowered = value.lower()
+    if lowered == "true":
+        return True
+    if lowered == "false":
+        return False
+    # 处理NULL值
+    if lowered == "null":
+        return None
+    # 处理字符串值
+    if value.startswith('"') and value.endswith('"'):
+        return value[1:-1]
+    return value
+
+
+def format_value(value):
+    """把Python值转换为ini中的原始字符串，与 parse_value 相反"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    if isinstance(value, list):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return f'"{value}"'
+
+
+def format_section(name, info):
+    """生成一个公司在INI中的段落文本（末尾带一个空行）"""
+    lines = [f"[{name}]\n"]
+    for key, value in info.items():
+        lines.append(f"{key} = {format_value(value)}\n")
+    lines.append("\n")
+    return "".join(lines)
+
+
+def parse_company_text(text, source="<string>"):
+    """解析INI文本，返回 {公司名: {字段: 值}}"""
+    # 使用RawConfigParser来避免百分号插值问题
+    config = configparser.RawConfigParser()
+    config.read_string(text, source)
+
+    company_data = {}
+    for section in config.sections():
+        company_data[section] = {
+            key: parse_value(value) for key, value in config[section].items()
+        }
+    return company_data
+
+
+def parse_company_ini(ini_path):
+    """解析INI文件，返回 {公司名: {字段: 值}}"""
+    with open(ini_path, encoding="utf-8") as f:
+        return parse_company_text(f.read(), ini_path)
+
+
+def split_sections(text):
+    """把INI文本按公司切分，返回 {公司名: 该段原文}
+
+    只做文本切分、不解析值，用于比较两个版本之间哪些公司发生了变化。
+    第一个公司之前的注释不属于任何公司。
+    """
+    sections = {}
+    name = None
+    lines = []
+    for line in text.splitlines(keepends=True):
+        match = _SECTION_RE.match(line.strip())
+        if match is not None:
+            if name is not None:
+                sections[name] = "".join(lines)
+            name = match.group(1)
+            if name in sections:
+                raise ValueError(f"重复的公司: {name}")
+            lines = []
+        lines.append(line)
+    if name is not None:
+        sections[name] = "".join(lines)
+    return sections
+
+
+def read_source(ini_path):
+    """读取INI文件，返回 (公司数据, 各公司原文)"""
+    with open(ini_path, encoding="utf-8") as f:
+        text = f.read()
+    return parse_company_text(text, ini_path), split_sections(text)
+
+
+def load_company_data(ini_path=DEFAULT_INI_PATH, use_cache=True, timeline=None):
+    """读取公司数据和搜索索引，返回 (model, search_index, section_texts)
+
+    数据文件未变化时直接从编译缓存加载，否则重新解析并刷新缓存。
+    section_texts 是每个公司在INI中的原文，用于热重载时比较差异。
+    传入 timeline 时记录 cache_load / parse / index_build 各阶段耗时。
+    """
+    if use_cache:
+        with timeline_phase(timeline, "cache_load"):
+            cached = company_cache.load(ini_path)
+            if cached is not None:
+                model = CompanyModel.from_state(cached["model"])
+                return (
+                    model,
+                    SearchIndex.from_state(cached["index"], model),
+                    cached["sections"],
+                )
+
+    # 缓存键在读取文件之前取得，解析期间文件被修改时缓存会在下次加载时失效
+    key = company_cache.source_key(ini_path) if use_cache else None
+    with timeline_phase(timeline, "parse"):
+        company_data, section_texts = read_source(ini_path)
+    with timeline_phase(timeline, "model_build"):
+        model = CompanyModel(company_data, layer=ini_path)
+    with timeline_phase(timeline, "index_build"):
+        search_index = SearchIndex(model)
+    if use_cache:
+        with timeline_phase(timeline, "cache_save"):
+            company_cache.save(
+                ini_path,
+                key,
+                {
+                    "model": model.to_state(),
+                    "index": search_index.to_state(),
+                    "sections": section_texts,
+                },
+            )
+    return model, search_index, section_texts
+
+
+def diff_sections(old_sections, new_sections):
+    """比较两个版本的公司原文，返回 SectionDiff"""
+    added = sorted(name for name in new_sections if name not in old_sections)
+    removed = sorted(name for name in old_sections if name not in new_sections)
+    modified = sorted(
+        name
+        for name, text in new_sections.items()
+        if name in old_sections and old_sections[name] != text
+    )
+    return SectionDiff(added, removed, modified)
@@ -0,0 +1,336 @@
+"""公司建立条件
+
+给出已研究的科技、拥有的地块和已满足的特殊前置，计算哪些公司现在可以建立。
+
+- 每个科技、地块、特殊前置对应一个“需要它的公司”位集，没有该条件的公司
+  另有一个位集；结果是三个条件位集的按位与，与公司数量无关的只有几次大整数运算
+- 科技前置关系（TechGraph）来自游戏的 common/technology/technologies，
+  每个科技的全部前置科技（传递闭包）以位集形式缓存；声明研究了某个科技时，
+  它的前置科技也视为已研究
+- unlocks 回答“再研究哪一个科技能解锁最多的公司”，其前置科技一并计入
+
+结果（EligibilityMask）可以判断某个公司是否可以建立，以及缺少哪些条件，
+列表筛选和汇总都使用它：
+
+    python company_eligibility.py --tech 苯胺 --tech 铁路 --region 巴登 --best 5
+    python company_eligibility.py --save autosave.v3 --game-dir ".../Victoria 3/game"
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+
+from company_import import (
+    DEFAULT_LANGUAGE,
+    block_values,
+    expand_paths,
+    iter_script_file,
+    localize,
+    sub_block,
+)
+from company_model import NONE
+from company_optimizer import BitTable
+
+# 建立条件，None 表示不限制
+Conditions = namedtuple("Conditions", ["techs", "regions", "prereqs"])
+
+# 不限制任何条件
+ANY_CONDITIONS = Conditions(None, None, None)
+
+# 一个科技能解锁的公司：科技、新解锁的公司、需要一并研究的前置科技
+TechUnlock = namedtuple("TechUnlock", ["tech", "companies", "missing"])
+
+# 游戏目录中的科技定义
+TECHNOLOGY_DIR = os.path.join("common", "technology", "technologies")
+
+
+class TechGraph:
+    """科技前置关系，prereqs 是 {科技: [直接前置科技]}"""
+
+    def __init__(self, prereqs=None):
+        self.table = BitTable()
+        self.parents = {}
+        self._ancestors = {}
+        for tech, parents in (prereqs or {}).items():
+            self.add(tech, parents)
+
+    def add(self, tech, parents):
+        """登记一个科技的直接前置科技"""
+        bit = self.table.bit(tech)
+        mask = 0
+        for parent in parents:
+            mask |= self.table.bit(parent)
+        self.parents[bit] = self.parents.get(bit, 0) | mask
+        self._ancestors.clear()
+
+    def ancestors(self, tech):
+        """返回科技全部前置科技的位集（不含自身），结果被缓存"""
+        bit = self.table.bits.get(tech)
+        if bit is None:
+            return 0
+        return self._ancestors_of(bit)
+
+    def _ancestors_of(self, bit):
+        cached = self._ancestors.get(bit)
+        if cached is not None:
+            return cached
+        # 先占位，前置关系中的环不会导致无限递归
+        self._ancestors[bit] = 0
+        mask = 0
+        parents = self.parents.get(bit, 0)
+        while parents:
+            parent = parents & -parents
+            parents ^= parent
+            mask |= parent | self._ancestors_of(parent)
+        self._ancestors[bit] = mask
+        return mask
+
+    def closure(self, techs):
+        """已研究的科技加上它们的全部前置科技"""
+        mask = 0
+        names = set(techs)
+        for tech in names:
+            mask |= self.ancestors(tech)
+        names.update(self.table.decode(mask))
+        return names
+
+    def missing(self, tech, researched):
+        """研究某个科技还需要先研究的前置科技，按名称排序"""
+        mask = self.ancestors(tech) & ~self.table.mask(researched)
+        return sorted(self.table.decode(mask))
+
+
+def read_tech_graph(paths, localization=None):
+    """读取游戏的科技脚本，返回 TechGraph，科技名通过本地化表转换"""
+    table = localization or {}
+    graph = TechGraph()
+    for path in paths:
+        for key, _, block in iter_script_file(path):
+            if key is None or key.startswith("@") or not isinstance(block, list):
+                continue
+            parents = block_values(sub_block(block, "unlocking_technologies"))
+            graph.add(
+                localize(table, key), [localize(table, parent) for parent in parents]
+            )
+    return graph
+
+
+def load_tech_graph(game_dir=None, paths=(), localization=None):
+    """读取游戏目录和额外给出的科技脚本，都没有时返回空的 TechGraph"""
+    paths = list(paths)
+    if game_dir:
+        paths.append(os.path.join(game_dir, TECHNOLOGY_DIR))
+    return read_tech_graph(expand_paths(paths, "*.txt"), localization)
+
+
+class EligibilityMask:
+    """一组条件下可以建立的公司"""
+
+    def __init__(self, engine, conditions, bits):
+        self.engine = engine
+        self.conditions = conditions
+        self.bits = bits
+
+    def __contains__(self, company):
+        i = self.engine.index.get(company)
+        return i is not None and self.bits >> i & 1 == 1
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def names(self):
+        """可以建立的公司，按名称排序"""
+        return self.engine.decode(self.bits)
+
+    def blocked(self):
+        """无法建立的公司，按名称排序"""
+        return self.engine.decode(self.engine.all_bits & ~self.bits)
+
+    def reasons(self, company):
+        """公司缺少的条件，如 ["科技: 苯胺"]，可以建立时为空"""
+        return self.engine.reasons(company, self.conditions)
+
+
+class EligibilityEngine:
+    """按科技、地块、特殊前置预先分组的公司位集，company_data 是 CompanyModel"""
+
+    def __init__(self, company_data, tech_graph=None):
+        self.company_data = company_data
+        self.tech_graph = tech_graph or TechGraph()
+        self.companies = sorted(company_data)
+        self.index = {name: i for i, name in enumerate(self.companies)}
+        self.all_bits = (1 << len(self.companies)) - 1
+
+        self.tech_names = company_data.tables["techs"].names
+        self.region_names = company_data.tables["regions"].names
+        # 条件值 → 需要它的公司位集；以及没有该条件的公司位集
+        self.by_tech, self.by_region, self.by_prereq = {}, {}, {}
+        self.no_tech = self.no_region = self.no_prereq = 0
+        for i, name in enumerate(self.companies):
+            record = company_data.record(name)
+            bit = 1 << i
+            if record.tech == NONE:
+                self.no_tech |= bit
+            else:
+                tech = self.tech_names[record.tech]
+                self.by_tech[tech] = self.by_tech.get(tech, 0) | bit
+            if record.region == NONE:
+                self.no_region |= bit
+            else:
+                region = self.region_names[record.region]
+                self.by_region[region] = self.by_region.get(region, 0) | bit
+            if record.special_prereq is None:
+                self.no_prereq |= bit
+            else:
+                prereq = str(record.special_prereq)
+                self.by_prereq[prereq] = self.by_prereq.get(prereq, 0) | bit
+
+    def decode(self, bits):
+        """把公司位集还原为名称列表"""
+        text = bin(bits)[:1:-1]
+        return [self.companies[i] for i, flag in enumerate(text) if flag == "1"]
+
+    @staticmethod
+    def _allowed(groups, free, values):
+        if values is None:
+            return -1
+        mask = free
+        for value in values:
+            mask |= groups.get(value, 0)
+        return mask
+
+    def tech_bits(self, techs):
+        """满足科技条件的公司位集，techs 会先按前置关系补全"""
+        if techs is None:
+            return -1
+        return self._allowed(self.by_tech, self.no_tech, self.tech_graph.closure(techs))
+
+    def mask(self, conditions=ANY_CONDITIONS):
+        """计算一组条件下可以建立的公司，返回 EligibilityMask"""
+        bits = (
+            self.all_bits
+            & self.tech_bits(conditions.techs)
+            & self._allowed(self.by_region, self.no_region, conditions.regions)
+            & self._allowed(self.by_prereq, self.no_prereq, conditions.prereqs)
+        )
+        return EligibilityMask(self, conditions, bits)
+
+    def reasons(self, company, conditions):
+        """公司在一组条件下缺少的条件"""
+        record = self.company_data.record(company)
+        reasons = []
+        if conditions.techs is not None and record.tech != NONE:
+            tech = self.tech_names[record.tech]
+            if tech not in self.tech_graph.closure(conditions.techs):
+                reasons.append(f"科技: {tech}")
+        if conditions.regions is not None and record.region != NONE:
+            region = self.region_names[record.region]
+            if region not in conditions.regions:
+                reasons.append(f"地块: {region}")
+        if conditions.prereqs is not None and record.special_prereq is not None:
+            if str(record.special_prereq) not in conditions.prereqs:
+                reasons.append(f"特殊前置: {record.special_prereq}")
+        return reasons
+
+    def unlocks(self, conditions, top=5):
+        """再研究哪一个科技（连同其前置科技）新解锁的公司最多，返回 [TechUnlock]
+
+        只考虑地块和特殊前置已经满足、只差科技的公司。
+        """
+        if conditions.techs is None:
+            return []
+        researched = self.tech_graph.closure(conditions.techs)
+        current = self.mask(conditions).bits
+        # 除科技外其余条件都满足、但科技不满足的公司
+        waiting = (
+            self.all_bits
+            & self._allowed(self.by_region, self.no_region, conditions.regions)
+            & self._allowed(self.by_prereq, self.no_prereq, conditions.prereqs)
+            & ~current
+        )
+        if not waiting:
+            return []
+
+        graph = self.tech_graph
+        candidates = set(self.by_tech) | set(graph.table.names)
+        results = []
+        for tech in candidates - researched:
+            needed = {tech, *graph.table.decode(graph.ancestors(tech))} - researched
+            unlocked = 0
+            for name in needed:
+                unlocked |= self.by_tech.get(name, 0)
+            unlocked &= waiting
+            if unlocked:
+                results.append(
+                    TechUnlock(tech, self.decode(unlocked), sorted(needed - {tech}))
+                )
+        results.sort(key=lambda u: (-len(u.companies), len(u.missing), u.tech))
+        return results[:top]
+
+
+def unlock_to_dict(unlock):
+    """把 TechUnlock 转为可写入JSON的字典"""
+    return {
+        "tech": unlock.tech,
+        "companies": unlock.companies,
+        "missing": unlock.missing,
+    }
+
+
+def main(argv=None):
+    """命令行入口"""
+    from company_core import CompanyRepository
+    from company_data import DEFAULT_INI_PATH
+    from company_save import load_localization, read_save, save_conditions
+
+    parser = argparse.ArgumentParser(description="计算现在可以建立的公司")
+    parser.add_argument("--tech", action="append", help="已研究的科技，可重复")
+    parser.add_argument("--region", action="append", help="拥有的地块，可重复")
+    parser.add_argument("--prereq", action="append", help="已满足的特殊前置，可重复")
+    parser.add_argument("--save", help="从存档导入科技和地块")
+    parser.add_argument("--country", help="存档中的国家标签，省略时使用玩家国家")
+    parser.add_argument("--game-dir", help="游戏的 game 目录，用于读取科技和本地化")
+    parser.add_argument(
+        "--localization", action="append", default=[], help="本地化文件或目录"
+    )
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="本地化语言")
+    parser.add_argument("--best", type=int, default=5, help="列出解锁最多的科技数")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    args = parser.parse_args(argv)
+
+    table = load_localization(args.game_dir, args.localization, args.language)
+    repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+    repo.tech_graph = load_tech_graph(args.game_dir, localization=table)
+    conditions = Conditions(args.tech, args.region, args.prereq)
+    if args.save:
+        saved = save_conditions(read_save(args.save, args.country), table)
+        conditions = conditions._replace(
+            techs=sorted(saved.techs | set(args.tech or ())),
+            regions=sorted(saved.regions | set(args.region or ())),
+        )
+
+    engine = repo.eligibility()
+    mask = engine.mask(conditions)
+    json.dump(
+        {
+            "eligible": mask.names(),
+            "blocked": {name: mask.reasons(name) for name in mask.blocked()},
+            "best_techs": [
+                unlock_to_dict(u) for u in engine.unlocks(conditions, args.best)
+            ],
+        },
+        sys.stdout,
+        ensure_ascii=False,
+        indent=2,
+    )
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,488 @@
+"""导出报告
+
+把全部公司的目录、任意一组公司的汇总，或者多个方案的汇总导出为 Markdown、CSV
+或自带样式的单个 HTML 文件。渲染函数都是生成器，逐行产生文本片段并直接写入
+文件，不在内存中拼出整个文档；汇总通过 CompanyRepository.summarize 取得。
+
+批量导出（每个地块或每个科技一份汇总）时，各份报告分给进程池并行渲染，每个
+工作进程自己读取一次数据（通常直接命中编译缓存），各自写入自己的文件：
+
+    python company_export.py catalogue --output companies.html
+    python company_export.py summary 巴斯夫 科汉森 --output summary.md
+    python company_export.py summary --query "建筑:炼钢厂" --output steel.csv
+    python company_export.py presets --output presets.html
+    python company_export.py batch --by region --format md --output-dir reports/
+"""
+
+import argparse
+import csv
+import html
+import io
+import os
+import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from company_data import DEFAULT_INI_PATH
+from company_model import FIELD_SLOTS, FIELD_TABLES, INFO_FIELDS, NONE
+
+# 支持的格式，也是文件扩展名
+FORMATS = ("md", "csv", "html")
+
+# 扩展名 → 格式
+FORMAT_SUFFIXES = {".md": "md", ".markdown": "md", ".csv": "csv", ".html": "html"}
+
+# 目录的列
+CATALOGUE_FIELDS = ("名称",) + INFO_FIELDS
+
+# 汇总的分区：(标题, summarize 结果中的键, 条目的种类)
+# 条目是 {"name", "count"} 的分区显示公司数
+SUMMARY_SECTIONS = (
+    ("所需科技", "techs", "techs"),
+    ("所需地块", "regions", "regions"),
+    ("基础建筑", "buildings", "buildings"),
+    ("可选建筑", "optional_buildings", "buildings"),
+    ("繁荣效果合计", "modifiers", "modifiers"),
+    ("无法解析的繁荣效果", "unparsed_bonuses", "modifiers"),
+    ("名贵商品", "luxuries", "goods"),
+    ("无法建立的公司", "blocked", "companies"),
+    ("选中的公司", "companies", "companies"),
+)
+
+# 汇总开头的概况分区
+OVERVIEW = "概况"
+
+# 批量导出的分组字段
+BATCH_FIELDS = {"region": "地块", "tech": "科技"}
+
+# 分组字段为空的公司所在的组
+NO_GROUP = "无"
+
+# 一份汇总报告：标题和公司
+Report = namedtuple("Report", ["title", "companies"])
+
+# 一个批量任务：报告和输出文件
+BatchJob = namedtuple("BatchJob", ["report", "path"])
+
+HTML_STYLE = """
+body { font-family: "SimHei", "Microsoft YaHei", sans-serif; margin: 2em; }
+table { border-collapse: collapse; margin-bottom: 1.5em; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: left; }
+th { background: #f0f0f0; }
+td.count { text-align: right; }
+"""
+
+_UNSAFE_FILENAME_RE = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def format_for_path(path, default="md"):
+    """按文件扩展名确定格式"""
+    if not path:
+        return default
+    suffix = os.path.splitext(path)[1].lower()
+    fmt = FORMAT_SUFFIXES.get(suffix)
+    if fmt is None:
+        raise ValueError(f"不支持的文件类型: {suffix or path}")
+    return fmt
+
+
+def safe_filename(title):
+    """把报告标题转为可用作文件名的文本"""
+    return _UNSAFE_FILENAME_RE.sub("_", title).strip("._") or "report"
+
+
+def _display(locale, kind, name):
+    return name if locale is None else locale.text(kind, name)
+
+
+# ---------------------------------------------------------------------------
+# 行数据
+# ---------------------------------------------------------------------------
+
+
+def catalogue_rows(repo, companies=None, locale=None):
+    """逐个生成公司目录的行（与 CATALOGUE_FIELDS 对应的文本列表）"""
+    model = repo.company_data
+    for name in repo.companies if companies is None else companies:
+        record = model.record(name)
+        if record is None:
+            continue
+        row = [_display(locale, "companies", name)]
+        for field in INFO_FIELDS:
+            if field == "特殊前置":
+                prereq = record.special_prereq
+                row.append("" if prereq is None else str(prereq))
+            elif field == "特殊名贵":
+                row.append("是" if record.special_luxury else "")
+            else:
+                value = getattr(record, FIELD_SLOTS[field])
+                if value is None or value == NONE:
+                    # 无法解析的原文保存在 extra 中
+                    row.append(str((record.extra or {}).get(field, "")))
+                else:
+                    kind = FIELD_TABLES[field]
+                    names = model.value_names(record, field)
+                    row.append(", ".join(_display(locale, kind, n) for n in names))
+        yield row
+
+
+def summary_sections(summary, locale=None):
+    """把 summarize 的结果转为 [(分区标题, [(条目, 数值)])]，空的分区省略"""
+    sections = [
+        (
+            OVERVIEW,
+            [
+                ("公司数", str(summary["count"])),
+                ("特殊名贵商品", str(summary["special_luxuries"])),
+            ],
+        )
+    ]
+    for title, key, kind in SUMMARY_SECTIONS:
+        items = summary.get(key)
+        if not items:
+            continue
+        if isinstance(items, dict):
+            # 无法建立的公司：{公司: [缺少的条件]}
+            rows = [
+                (_display(locale, kind, name), "、".join(reasons))
+                for name, reasons in items.items()
+            ]
+        else:
+            rows = []
+            for item in items:
+                if isinstance(item, dict):
+                    name = item.get("name", item.get("effect"))
+                    rows.append((_display(locale, kind, name), f"{item['count']}个公司"))
+                else:
+                    rows.append((_display(locale, kind, item), ""))
+        sections.append((title, rows))
+    return sections
+
+
+# ---------------------------------------------------------------------------
+# 渲染：逐段产生文本
+# ---------------------------------------------------------------------------
+
+
+def _heading(section, rows):
+    """Markdown 和 HTML 的分区标题带条目数"""
+    return section if section == OVERVIEW else f"{section} ({len(rows)})"
+
+
+def _md_cell(text):
+    return str(text).replace("|", "\\|").replace("\n", " ")
+
+
+def _csv_lines(rows):
+    """逐行产生CSV文本，只复用一个小缓冲区"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _html_head(title):
+    return (
+        '<!DOCTYPE html>\n<html lang="zh">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{html.escape(title)}</title>\n<style>{HTML_STYLE}</style>\n"
+        f"</head>\n<body>\n<h1>{html.escape(title)}</h1>\n"
+    )
+
+
+def _html_row(cells, tag="td"):
+    return (
+        "<tr>"
+        + "".join(f"<{tag}>{html.escape(str(cell))}</{tag}>" for cell in cells)
+        + "</tr>\n"
+    )
+
+
+def render_catalogue(rows, fmt, title="公司目录"):
+    """把目录的行渲染为文本片段"""
+    if fmt == "csv":
+        yield from _csv_lines([CATALOGUE_FIELDS])
+        yield from _csv_lines(rows)
+    elif fmt == "html":
+        yield _html_head(title)
+        yield "<table>\n" + _html_row(CATALOGUE_FIELDS, "th")
+        for row in rows:
+            yield _html_row(row)
+        yield "</table>\n</body>\n</html>\n"
+    else:
+        yield f"# {title}\n\n"
+        yield "| " + " | ".join(CATALOGUE_FIELDS) + " |\n"
+        yield "|" + "---|" * len(CATALOGUE_FIELDS) + "\n"
+        for row in rows:
+            yield "| " + " | ".join(_md_cell(cell) for cell in row) + " |\n"
+
+
+def render_reports(reports, fmt, title="公司汇总"):
+    """把 [(报告标题, summary_sections 的结果)] 渲染为一个文档的文本片段
+
+    reports 可以是生成器，每份报告在渲染时才计算。
+    """
+    if fmt == "csv":
+        yield from _csv_lines([("报告", "分区", "条目", "数值")])
+        for report_title, sections in reports:
+            yield from _csv_lines(
+                (report_title, section, item, value)
+                for section, rows in sections
+                for item, value in rows
+            )
+    elif fmt == "html":
+        yield _html_head(title)
+        for report_title, sections in reports:
+            yield f"<h2>{html.escape(report_title)}</h2>\n"
+            for section, rows in sections:
+                yield f"<h3>{html.escape(_heading(section, rows))}</h3>\n<table>\n"
+                for item, value in rows:
+                    yield (
+                        f"<tr><td>{html.escape(item)}</td>"
+                        f'<td class="count">{html.escape(value)}</td></tr>\n'
+                    )
+                yield "</table>\n"
+        yield "</body>\n</html>\n"
+    else:
+        yield f"# {title}\n\n"
+        for report_title, sections in reports:
+            yield f"## {report_title}\n\n"
+            for section, rows in sections:
+                yield f"### {_heading(section, rows)}\n\n"
+                for item, value in rows:
+                    yield f"- {item} ({value})\n" if value else f"- {item}\n"
+                yield "\n"
+
+
+def write_chunks(chunks, output):
+    """把文本片段依次写入文件，返回写出的字符数"""
+    total = 0
+    for chunk in chunks:
+        output.write(chunk)
+        total += len(chunk)
+    return total
+
+
+# ---------------------------------------------------------------------------
+# 导出
+# ---------------------------------------------------------------------------
+
+
+def export_catalogue(repo, output, fmt="md", companies=None, locale=None):
+    """导出公司目录，companies 省略时导出全部公司"""
+    rows = catalogue_rows(repo, companies, locale)
+    return write_chunks(render_catalogue(rows, fmt), output)
+
+
+def _iter_reports(repo, reports, locale):
+    for report in reports:
+        summary = repo.summarize(report.companies)
+        yield report.title, summary_sections(summary, locale)
+
+
+def export_reports(repo, reports, output, fmt="md", title="公司汇总", locale=None):
+    """把若干份 Report 的汇总导出到一个文档"""
+    sections = _iter_reports(repo, reports, locale)
+    return write_chunks(render_reports(sections, fmt, title), output)
+
+
+def export_summary(repo, companies, output, fmt="md", title="公司汇总", locale=None):
+    """导出一组公司的汇总"""
+    report = Report(f"{len(companies)} 个公司", companies)
+    return export_reports(repo, [report], output, fmt, title, locale)
+
+
+def group_reports(repo, by):
+    """按地块或科技把全部公司分组，返回 [Report]，按组名排序"""
+    field = BATCH_FIELDS[by]
+    model = repo.company_data
+    groups = {}
+    for name in repo.companies:
+        values = model.value_names(model.record(name), field) or [NO_GROUP]
+        groups.setdefault(values[0], []).append(name)
+    return [Report(f"{field}：{value}", groups[value]) for value in sorted(groups)]
+
+
+def batch_jobs(reports, directory, fmt):
+    """为每份报告分配输出文件，重名时追加序号"""
+    jobs, used = [], set()
+    for report in reports:
+        stem = safe_filename(report.title)
+        name, n = stem, 1
+        while name in used:
+            n += 1
+            name = f"{stem}_{n}"
+        used.add(name)
+        jobs.append(BatchJob(report, os.path.join(directory, f"{name}.{fmt}")))
+    return jobs
+
+
+# 工作进程中的数据仓库和显示语言，由 _init_worker 设置
+_worker_repo = None
+_worker_locale = None
+
+
+def _init_worker(ini_path, overlays, locales_path, language):
+    global _worker_repo, _worker_locale
+    from company_core import CompanyRepository
+
+    _worker_repo = CompanyRepository.load(ini_path, overlays=overlays)
+    _worker_locale = _load_locale(locales_path, language)
+
+
+def _run_job(job, fmt, repo=None, locale=None):
+    repo = repo or _worker_repo
+    locale = locale or _worker_locale
+    with open(job.path, "w", encoding="utf-8", newline="") as f:
+        export_reports(repo, [job.report], f, fmt, job.report.title, locale)
+    return job.path
+
+
+def run_batch(
+    jobs,
+    fmt,
+    repo=None,
+    workers=None,
+    ini_path=DEFAULT_INI_PATH,
+    overlays=(),
+    locales_path=None,
+    language=None,
+):
+    """执行批量任务，逐个返回写出的文件
+
+    workers 为1（或只有一个任务）时在当前进程中使用 repo 渲染；否则交给进程池，
+    每个工作进程从 ini_path 和 overlays 自行读取数据。
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        locale = _load_locale(locales_path, language)
+        if repo is None:
+            from company_core import CompanyRepository
+
+            repo = CompanyRepository.load(ini_path, overlays=overlays)
+        for job in jobs:
+            yield _run_job(job, fmt, repo, locale)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(jobs)),
+        initializer=_init_worker,
+        initargs=(ini_path, list(overlays), locales_path, language),
+    ) as pool:
+        # 每个进程一次领取若干任务，减少进程间往返
+        chunksize = max(1, len(jobs) // (workers * 4))
+        yield from pool.map(
+            _run_job, jobs, [fmt] * len(jobs), chunksize=chunksize
+        )
+
+
+def _load_locale(locales_path, language):
+    if not language:
+        return None
+    from company_locale import DEFAULT_LOCALE_PATH, LocaleStore
+
+    return LocaleStore(locales_path or DEFAULT_LOCALE_PATH).load(language)
+
+
+def main(argv=None):
+    """命令行入口"""
+    from company_core import CompanyRepository
+    from company_presets import DEFAULT_PRESETS_PATH, PresetStore
+
+    parser = argparse.ArgumentParser(description="导出公司目录和汇总报告")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    parser.add_argument("--language", help="显示语言，如 en（需要文字表文件）")
+    parser.add_argument("--locales", help="文字表文件")
+    parser.add_argument(
+        "--format", choices=FORMATS, help="输出格式，省略时按输出文件的扩展名确定"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    catalogue = commands.add_parser("catalogue", help="全部公司的目录")
+    catalogue.add_argument("--query", help="只导出搜索结果中的公司")
+    catalogue.add_argument("--output", help="输出文件，省略时输出到标准输出")
+
+    summary = commands.add_parser("summary", help="一组公司的汇总")
+    summary.add_argument("companies", nargs="*", help="公司名")
+    summary.add_argument("--query", help="汇总搜索结果中的公司")
+    summary.add_argument("--output", help="输出文件，省略时输出到标准输出")
+
+    presets = commands.add_parser("presets", help="多个方案的汇总")
+    presets.add_argument("names", nargs="*", help="方案名，省略时导出全部方案")
+    presets.add_argument("--presets", default=DEFAULT_PRESETS_PATH, help="方案文件")
+    presets.add_argument("--output", help="输出文件，省略时输出到标准输出")
+
+    batch = commands.add_parser("batch", help="按地块或科技分组，每组一个文件")
+    batch.add_argument("--by", choices=sorted(BATCH_FIELDS), required=True)
+    batch.add_argument("--output-dir", required=True, help="输出目录")
+    batch.add_argument("--jobs", type=int, help="工作进程数，默认为CPU核数")
+    args = parser.parse_args(argv)
+
+    try:
+        fmt = args.format or format_for_path(getattr(args, "output", None))
+    except ValueError as e:
+        parser.error(str(e))
+    repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+
+    if args.command == "batch":
+        os.makedirs(args.output_dir, exist_ok=True)
+        jobs = batch_jobs(group_reports(repo, args.by), args.output_dir, fmt)
+        paths = run_batch(
+            jobs,
+            fmt,
+            repo,
+            args.jobs,
+            args.ini,
+            args.overlay,
+            args.locales,
+            args.language,
+        )
+        for path in paths:
+            print(path)
+        return 0
+
+    locale = _load_locale(args.locales, args.language)
+    if args.command == "catalogue":
+        companies = repo.search(args.query, locale) if args.query else None
+
+        def export(f):
+            export_catalogue(repo, f, fmt, companies, locale)
+
+    elif args.command == "summary":
+        companies = list(args.companies)
+        if args.query:
+            companies += repo.search(args.query, locale)
+        missing = [name for name in companies if name not in repo]
+        if missing:
+            parser.error(f"公司不存在: {'、'.join(missing)}")
+
+        def export(f):
+            export_summary(repo, sorted(set(companies)), f, fmt, locale=locale)
+
+    else:
+        store = PresetStore(args.presets)
+        names = args.names or store.names()
+        try:
+            reports = [Report(name, store.get(name)) for name in names]
+        except ValueError as e:
+            parser.error(str(e))
+
+        def export(f):
+            export_reports(repo, reports, f, fmt, "方案汇总", locale)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            export(f)
+    else:
+        export(sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
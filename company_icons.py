@@ -0,0 +1,240 @@
+"""公司、建筑和繁荣效果的图标
+
+所有图标打包在一个图集文件中：
+
+    b"HQIA1" | 索引长度 (4字节，小端) | 索引JSON | 图片数据...
+
+索引是 {"kind/名称": [偏移, 长度]}，偏移从图片数据的开头算起。打开图集时只读取
+索引，图片数据通过 mmap 按需读取。IconCache 只在某一行或某条汇总第一次显示时
+才解码对应的图标，解码后的 tk.PhotoImage 保存在按像素总数限制大小的 LRU 中；
+不同尺寸的缩放结果也分别缓存，调整大小后再次显示时不需要重新缩放。
+
+图标目录按种类分为 companies、buildings、modifiers 三个子目录，文件名（不含
+扩展名）是公司名、建筑名或繁荣效果的目标（如 畜牧场吞吐量）：
+
+    python company_icons.py build icons/
+    python company_icons.py list
+"""
+
+import argparse
+import base64
+import json
+import mmap
+import os
+import struct
+import sys
+from collections import OrderedDict
+from fractions import Fraction
+
+# 图集文件头
+ATLAS_MAGIC = b"HQIA1"
+
+# 默认的图集文件，与 company.ini 放在一起
+DEFAULT_ATLAS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "icons.atlas"
+)
+
+# 图标种类，也是图标目录下的子目录名
+ICON_KINDS = ("companies", "buildings", "modifiers")
+
+# Tk 可以直接解码的图片格式
+ICON_SUFFIXES = (".png", ".gif")
+
+# 缓存中所有图片的像素总数上限（约 8MB 的 RGBA 数据）
+DEFAULT_MAX_PIXELS = 2_000_000
+
+# 缩放比例的分母上限，zoom / subsample 的整数因子不会过大
+MAX_SCALE_DENOMINATOR = 8
+
+_LENGTH = struct.Struct("<I")
+
+
+def icon_key(kind, name):
+    """图集索引中的键"""
+    return f"{kind}/{name}"
+
+
+def build_atlas(icon_dir, atlas_path=DEFAULT_ATLAS_PATH):
+    """把图标目录打包为图集文件（原子替换），返回图标数"""
+    entries = []
+    for kind in ICON_KINDS:
+        directory = os.path.join(icon_dir, kind)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            stem, suffix = os.path.splitext(filename)
+            if suffix.lower() in ICON_SUFFIXES:
+                path = os.path.join(directory, filename)
+                entries.append((icon_key(kind, stem), path))
+
+    index, offset = {}, 0
+    for key, path in entries:
+        size = os.path.getsize(path)
+        index[key] = [offset, size]
+        offset += size
+    header = json.dumps(index, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = f"{atlas_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(ATLAS_MAGIC + _LENGTH.pack(len(header)) + header)
+        for _, path in entries:
+            with open(path, "rb") as f:
+                out.write(f.read())
+    os.replace(tmp_path, atlas_path)
+    return len(entries)
+
+
+class IconAtlas:
+    """只读的图集，打开时只读取索引"""
+
+    def __init__(self, path=DEFAULT_ATLAS_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            magic = self._file.read(len(ATLAS_MAGIC))
+            if magic != ATLAS_MAGIC:
+                raise ValueError(f"不是图标图集文件: {path}")
+            (length,) = _LENGTH.unpack(self._file.read(_LENGTH.size))
+            self.index = json.loads(self._file.read(length).decode("utf-8"))
+            self.data_start = len(ATLAS_MAGIC) + _LENGTH.size + length
+            self._mmap = None
+            if os.fstat(self._file.fileno()).st_size > self.data_start:
+                self._mmap = mmap.mmap(
+                    self._file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        except Exception:
+            self._file.close()
+            raise
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def read(self, key):
+        """返回图标的原始图片数据，不存在时返回None"""
+        entry = self.index.get(key)
+        if entry is None or self._mmap is None:
+            return None
+        offset, size = entry
+        start = self.data_start + offset
+        return self._mmap[start : start + size]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+
+def scale_image(image, height):
+    """把 PhotoImage 缩放到接近指定高度，返回新的 PhotoImage"""
+    if image.height() == height or not image.height():
+        return image
+    ratio = Fraction(height, image.height()).limit_denominator(MAX_SCALE_DENOMINATOR)
+    if ratio.numerator > 1:
+        image = image.zoom(ratio.numerator)
+    if ratio.denominator > 1:
+        image = image.subsample(ratio.denominator)
+    return image
+
+
+class IconCache:
+    """解码后的图标的 LRU 缓存
+
+    键是 (图集键, 高度)，高度为None表示原始尺寸。被淘汰的图片如果仍显示在
+    某个组件上，由组件持有的引用保证它不会被提前释放。
+    """
+
+    def __init__(self, atlas, max_pixels=DEFAULT_MAX_PIXELS, master=None):
+        self.atlas = atlas
+        self.max_pixels = max_pixels
+        self.master = master
+        self.images = OrderedDict()
+        self.pixels = 0
+        self.decoded = 0
+        self.hits = self.misses = 0
+
+    def get(self, kind, name, height=None):
+        """返回图标的 PhotoImage，图集中没有时返回None"""
+        key = icon_key(kind, name)
+        if key not in self.atlas:
+            return None
+        image = self.images.get((key, height))
+        if image is not None:
+            self.hits += 1
+            self.images.move_to_end((key, height))
+            return image
+
+        self.misses += 1
+        if height is None:
+            image = self._decode(key)
+        else:
+            base = self.get(kind, name)
+            image = None if base is None else scale_image(base, height)
+        if image is not None:
+            self._put((key, height), image)
+        return image
+
+    def _decode(self, key):
+        import tkinter as tk
+
+        data = self.atlas.read(key)
+        if data is None:
+            return None
+        try:
+            image = tk.PhotoImage(master=self.master, data=base64.b64encode(data))
+        except tk.TclError:
+            # 无法解码的图片按没有图标处理
+            return None
+        self.decoded += 1
+        return image
+
+    def _put(self, cache_key, image):
+        self.images[cache_key] = image
+        self.pixels += image.width() * image.height()
+        while self.pixels > self.max_pixels and len(self.images) > 1:
+            _, evicted = self.images.popitem(last=False)
+            self.pixels -= evicted.width() * evicted.height()
+
+    def clear(self):
+        self.images.clear()
+        self.pixels = 0
+
+
+def open_icon_cache(
+    path=DEFAULT_ATLAS_PATH, master=None, max_pixels=DEFAULT_MAX_PIXELS
+):
+    """打开图集并创建缓存，图集文件不存在时返回None"""
+    if not path or not os.path.exists(path):
+        return None
+    return IconCache(IconAtlas(path), max_pixels, master)
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="图标图集")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="把图标目录打包为图集")
+    build.add_argument("icon_dir", help="包含 companies/buildings/modifiers 的目录")
+    build.add_argument("--output", default=DEFAULT_ATLAS_PATH, help="图集文件")
+    listing = commands.add_parser("list", help="列出图集中的图标")
+    listing.add_argument("atlas", nargs="?", default=DEFAULT_ATLAS_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_atlas(args.icon_dir, args.output)
+        print(f"已打包 {count} 个图标到 {args.output}", file=sys.stderr)
+    else:
+        atlas = IconAtlas(args.atlas)
+        for key, (offset, size) in atlas.index.items():
+            print(f"{key}\t{size}")
+        atlas.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""从游戏文件导入公司数据
+
+读取游戏自带的公司定义（common/company_types 下的 Paradox 脚本，
+`key = { ... }` 块）和本地化YAML，转换为与 company.ini 相同的字段，
+然后新增或刷新 company.ini 中的公司，并重建编译缓存：
+
+    python company_import.py --game-dir ".../Victoria 3/game"
+    python company_import.py --companies common/company_types --localization loc/
+
+脚本文件通过 mmap 逐个词法单元读取，每次只在内存中保留一个顶层块，
+大文件也只占用有限的内存。
+
+字段对应关系：
+
+- 名称：公司键的本地化名称
+- 建筑 / 建筑_可选：building_types / extension_building_types
+- 科技：触发条件中的 has_technology_researched
+- 地块：触发条件中的 state_region，没有时取 preferred_headquarters
+- 繁荣：prosperity_modifier，_mult 和吞吐量修正按百分比显示
+- 名贵：prestige_goods
+
+特殊前置、特殊名贵无法从脚本中得到，刷新已有公司时保留 company.ini 中的值。
+"""
+
+import argparse
+import glob
+import mmap
+import os
+import re
+import sys
+
+from company_data import (
+    DEFAULT_INI_PATH,
+    format_section,
+    load_company_data,
+    parse_company_text,
+    split_sections,
+)
+from company_modifiers import UNIT_FLAT, UNIT_PERCENT, format_modifier
+
+# 默认的本地化语言
+DEFAULT_LANGUAGE = "simp_chinese"
+
+# 脚本的词法单元：字符串、花括号、运算符、单词；注释匹配后丢弃，空白直接跳过
+_TOKEN_RE = re.compile(
+    rb'"((?:[^"\\\n]|\\.)*)"|([{}])|([<>!?]=|[<>=])|([^\s{}=<>!?"#]+)|#[^\n]*'
+)
+
+# 词法单元类型
+STRING, BRACE, OPERATOR, WORD = "string", "brace", "operator", "word"
+
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+# 本地化条目：  key:0 "文本"
+_LOC_RE = re.compile(r'^\s*([\w.\-]+):\d*\s*"(.*)"')
+
+# 本地化文本中的 $key$ 引用
+_LOC_REF_RE = re.compile(r"\$([\w.\-]+)\$")
+
+
+# ---------------------------------------------------------------------------
+# Paradox 脚本
+# ---------------------------------------------------------------------------
+
+
+def tokenize(data, pos=0):
+    """逐个生成 (类型, 文本)，data 可以是 bytes 或 mmap"""
+    for match in _TOKEN_RE.finditer(data, pos):
+        string, brace, operator, word = match.groups()
+        if string is not None:
+            yield STRING, string.decode("utf-8")
+        elif brace is not None:
+            yield BRACE, brace.decode()
+        elif operator is not None:
+            yield OPERATOR, operator.decode()
+        elif word is not None:
+            yield WORD, word.decode("utf-8")
+
+
+class _ScriptParser:
+    """把词法单元组装为块
+
+    块是条目列表：`key = value` 为 (key, 运算符, value)，
+    列表中的单独值为 (None, None, value)；value 是字符串或块。
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pending = None
+
+    def next(self):
+        if self.pending is not None:
+            token, self.pending = self.pending, None
+            return token
+        return next(self.tokens, None)
+
+    def peek(self):
+        if self.pending is None:
+            self.pending = next(self.tokens, None)
+        return self.pending
+
+    def items(self):
+        """逐个生成当前块中的条目，遇到 } 或文件结束时停止"""
+        while True:
+            token = self.next()
+            if token is None or token == (BRACE, "}"):
+                return
+            if token[0] == OPERATOR:
+                # 残缺的语句，跳过多余的运算符
+                continue
+            following = self.peek()
+            if following is not None and following[0] == OPERATOR:
+                self.next()
+                value = self.value(self.next())
+                yield token[1], following[1], value
+            else:
+                yield None, None, self.value(token)
+
+    def value(self, token):
+        if token is None:
+            return ""
+        if token == (BRACE, "{"):
+            return list(self.items())
+        return token[1]
+
+
+def parse_script(text):
+    """解析一段脚本文本，返回顶层块"""
+    return list(_ScriptParser(tokenize(text.encode("utf-8"))).items())
+
+
+def iter_script_file(path):
+    """逐个生成脚本文件的顶层条目 (key, 运算符, value)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = len(_UTF8_BOM) if mm[: len(_UTF8_BOM)] == _UTF8_BOM else 0
+            yield from _ScriptParser(tokenize(mm, start)).items()
+
+
+def block_get(block, key, default=None):
+    """返回块中第一个 key 的值"""
+    for item_key, _, value in block:
+        if item_key == key:
+            return value
+    return default
+
+
+def sub_block(block, key):
+    """返回块中第一个 key 的子块，不存在或不是块时返回空块"""
+    value = block_get(block, key)
+    return value if isinstance(value, list) else []
+
+
+def block_values(block):
+    """返回块中的单独值（如 building_types = { a b } 中的 a、b）"""
+    if not isinstance(block, list):
+        return []
+    return [value for key, _, value in block if key is None]
+
+
+def find_values(block, key):
+    """递归查找块中所有 key 的值"""
+    for item_key, _, value in block:
+        if item_key == key:
+            yield value
+        if isinstance(value, list):
+            yield from find_values(value, key)
+
+
+# ---------------------------------------------------------------------------
+# 本地化
+# ---------------------------------------------------------------------------
+
+
+def read_localization(paths, language=DEFAULT_LANGUAGE):
+    """逐行读取本地化YAML，返回 {键: 文本}，只读取指定语言的文件"""
+    header = f"l_{language}:"
+    table = {}
+    for path in paths:
+        with open(path, encoding="utf-8-sig") as f:
+            first = f.readline().strip()
+            if first != header:
+                continue
+            for line in f:
+                match = _LOC_RE.match(line)
+                if match is not None:
+                    key, text = match.groups()
+                    table[key] = text
+    return table
+
+
+def localize(table, key, depth=3):
+    """取得键的本地化文本，展开 $key$ 引用；没有条目时返回键本身"""
+    text = table.get(key)
+    if text is None:
+        return key
+    if depth and "$" in text:
+        text = _LOC_REF_RE.sub(lambda m: localize(table, m.group(1), depth - 1), text)
+    return text.replace('\\"', '"')
+
+
+# ---------------------------------------------------------------------------
+# 转换为 company.ini 字段
+# ---------------------------------------------------------------------------
+
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def modifier_text(key, value, localization):
+    """把一条 prosperity_modifier 转为 "+10%创新力" 形式"""
+    number = _number(value)
+    if number is None:
+        return None
+    if key.endswith("_mult") or "throughput" in key:
+        unit, number = UNIT_PERCENT, number * 100
+    else:
+        unit = UNIT_FLAT
+    target = localize(localization, key)
+    if target == key:
+        target = localize(localization, f"modifier_{key}")
+    return format_modifier(number, unit, target)
+
+
+def company_from_block(key, block, localization):
+    """把一个公司块转为 (公司名, 字段字典)"""
+
+    def names(values):
+        return [localize(localization, value) for value in values]
+
+    techs = [
+        v for v in find_values(block, "has_technology_researched") if isinstance(v, str)
+    ]
+    regions = [
+        v[len("s:") :] if v.startswith("s:") else v
+        for v in find_values(block, "state_region")
+        if isinstance(v, str)
+    ]
+    if not regions:
+        regions = block_values(sub_block(block, "preferred_headquarters"))
+
+    bonuses = []
+    for modifier_key, _, value in sub_block(block, "prosperity_modifier"):
+        if modifier_key is not None:
+            text = modifier_text(modifier_key, value, localization)
+            if text is not None:
+                bonuses.append(text)
+
+    luxuries = names(block_values(sub_block(block, "prestige_goods")))
+    # 与 company.ini 一致，没有值的字段（包括空列表）写作 NULL
+    info = {
+        "特殊前置": None,
+        "科技": localize(localization, techs[0]) if techs else None,
+        "地块": localize(localization, regions[0]) if regions else None,
+        "建筑": names(block_values(sub_block(block, "building_types"))) or None,
+        "建筑_可选": names(
+            block_values(sub_block(block, "extension_building_types"))
+        )
+        or None,
+        "繁荣": bonuses or None,
+        "名贵": luxuries[0] if luxuries else None,
+        "特殊名贵": False,
+    }
+    return localize(localization, key), info
+
+
+def import_companies(company_files, localization):
+    """读取公司脚本文件，返回 {公司名: 字段字典}"""
+    companies = {}
+    for path in company_files:
+        for key, _, value in iter_script_file(path):
+            # 顶层的 @变量 和非块的值不是公司定义
+            if key is None or key.startswith("@") or not isinstance(value, list):
+                continue
+            name, info = company_from_block(key, value, localization)
+            companies[name] = info
+    return companies
+
+
+# ---------------------------------------------------------------------------
+# 写入 company.ini
+# ---------------------------------------------------------------------------
+
+# 刷新已有公司时保留的手工维护字段
+KEEP_FIELDS = ("特殊前置", "特殊名贵")
+
+
+def refresh_ini_text(text, companies):
+    """把导入的公司合并进INI文本，返回 (新文本, 新增数, 更新数)
+
+    内容没有变化的公司保留原文（包括其后的注释），已有但未导入的公司保持不变，
+    新公司追加在末尾。
+    """
+    existing = parse_company_text(text) if text else {}
+    sections = split_sections(text) if text else {}
+    # 第一个公司之前的内容（文件头注释）原样保留
+    header_len = len(text) - sum(len(section) for section in sections.values())
+    parts = [text[:header_len]]
+    updated = 0
+    for name, section in sections.items():
+        info = companies.get(name)
+        if info is None:
+            parts.append(section)
+            continue
+        old = existing[name]
+        info = dict(info)
+        for field in KEEP_FIELDS:
+            if field in old:
+                info[field] = old[field]
+        if info == old:
+            parts.append(section)
+        else:
+            parts.append(format_section(name, info))
+            updated += 1
+
+    added = [name for name in companies if name not in sections]
+    if added and parts[-1] and not parts[-1].endswith("\n\n"):
+        parts.append("\n" if parts[-1].endswith("\n") else "\n\n")
+    for name in added:
+        parts.append(format_section(name, companies[name]))
+    return "".join(parts), len(added), updated
+
+
+def refresh_ini(ini_path, companies, rebuild_cache=True):
+    """刷新 company.ini（原子替换），返回 (新增数, 更新数)"""
+    try:
+        with open(ini_path, encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        text = ""
+    new_text, added, updated = refresh_ini_text(text, companies)
+    if new_text != text:
+        tmp_path = f"{ini_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(new_text)
+        os.replace(tmp_path, ini_path)
+    if rebuild_cache:
+        load_company_data(ini_path)
+    return added, updated
+
+
+def expand_paths(paths, pattern):
+    """把文件和目录展开为文件列表，目录按文件名顺序递归查找"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                sorted(glob.glob(os.path.join(path, "**", pattern), recursive=True))
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="从游戏文件导入公司数据")
+    parser.add_argument("--game-dir", help="游戏的 game 目录")
+    parser.add_argument(
+        "--companies", action="append", default=[], help="公司脚本文件或目录"
+    )
+    parser.add_argument(
+        "--localization", action="append", default=[], help="本地化文件或目录"
+    )
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="本地化语言")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="要刷新的数据文件")
+    parser.add_argument(
+        "--stdout", action="store_true", help="只把导入结果以INI格式输出，不写文件"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不重建编译缓存")
+    args = parser.parse_args(argv)
+
+    companies = list(args.companies)
+    localization = list(args.localization)
+    if args.game_dir:
+        companies.append(os.path.join(args.game_dir, "common", "company_types"))
+        localization.append(os.path.join(args.game_dir, "localization", args.language))
+    if not companies:
+        parser.error("需要 --game-dir 或 --companies")
+
+    table = read_localization(expand_paths(localization, "*.yml"), args.language)
+    imported = import_companies(expand_paths(companies, "*.txt"), table)
+
+    if args.stdout:
+        for name, info in imported.items():
+            sys.stdout.write(format_section(name, info))
+        return 0
+
+    added, updated = refresh_ini(args.ini, imported, rebuild_cache=not args.no_cache)
+    print(f"导入 {len(imported)} 个公司：新增 {added}，更新 {updated}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""多层数据加载
+
+基础数据文件之上可以叠加有序的覆盖层（模组、不同游戏版本的差异等）。覆盖层
+可以是ini文件，也可以是目录（按文件名顺序读取其中的 *.ini）。后面的层按公司
+整段覆盖前面的层：
+
+    [巴斯夫]      ; 新增公司，或整段替换之前各层中的同名公司
+    ...
+    [-科汉森]     ; 删除之前各层中的同名公司
+
+每个文件的解析结果单独缓存（<文件>.parse.cache），修改一个覆盖层只会重新解析
+这一个文件；需要解析的文件多于一个时在进程池中并行解析。
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import company_cache
+from company_data import parse_company_text, split_sections
+from company_model import CompanyModel
+from company_profile import timeline_phase
+from company_search import SearchIndex
+
+# 单个文件解析结果的缓存后缀
+PARSE_CACHE_SUFFIX = ".parse.cache"
+
+# 段落名以此开头时表示删除同名公司
+DELETE_PREFIX = "-"
+
+# 合并结果：公司数据、各公司原文、各公司所在的层文件
+MergedLayers = namedtuple("MergedLayers", ["company_data", "sections", "origins"])
+
+
+def parse_layer_file(path):
+    """解析一个层文件，返回 (公司数据, 各公司原文)，可在子进程中执行"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return parse_company_text(text, path), split_sections(text)
+
+
+def parse_files(paths, max_workers=None):
+    """解析多个文件，返回与 paths 顺序一致的解析结果列表"""
+    if len(paths) <= 1:
+        return [parse_layer_file(path) for path in paths]
+    workers = min(len(paths), max_workers or os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(parse_layer_file, paths))
+    except (OSError, NotImplementedError, BrokenProcessPool):
+        # 受限环境中无法创建子进程时退回串行解析
+        return [parse_layer_file(path) for path in paths]
+
+
+def merge_layers(parsed):
+    """按顺序合并 [(层文件, 公司数据, 各公司原文)]，返回 MergedLayers"""
+    company_data, sections, origins = {}, {}, {}
+    for path, layer_data, layer_sections in parsed:
+        for name, info in layer_data.items():
+            if name.startswith(DELETE_PREFIX):
+                target = name[len(DELETE_PREFIX) :]
+                company_data.pop(target, None)
+                sections.pop(target, None)
+                origins.pop(target, None)
+            else:
+                company_data[name] = info
+                sections[name] = layer_sections[name]
+                origins[name] = path
+    return MergedLayers(company_data, sections, origins)
+
+
+class LayerStack:
+    """基础数据文件和有序的覆盖层"""
+
+    def __init__(self, base, overlays=()):
+        self.base = base
+        self.overlays = list(overlays)
+
+    def files(self):
+        """按覆盖顺序返回所有层文件，目录展开为其中的 *.ini"""
+        files = [self.base]
+        for overlay in self.overlays:
+            if os.path.isdir(overlay):
+                files.extend(
+                    os.path.join(overlay, name)
+                    for name in sorted(os.listdir(overlay))
+                    if name.endswith(".ini")
+                )
+            else:
+                files.append(overlay)
+        return files
+
+    def watch_paths(self):
+        """热重载需要监视的路径：所有层文件，以及覆盖层目录本身"""
+        return self.files() + [path for path in self.overlays if os.path.isdir(path)]
+
+    def parse_all(self, use_cache=True):
+        """解析所有层文件，返回 [(层文件, 公司数据, 各公司原文)]
+
+        缓存有效的文件直接使用缓存，其余文件并行解析后写入各自的缓存。
+        """
+        files = self.files()
+        results = {}
+        stale = []
+        for path in files:
+            cached = None
+            if use_cache:
+                cached = company_cache.load(path, PARSE_CACHE_SUFFIX)
+            if cached is None:
+                stale.append(path)
+            else:
+                results[path] = (cached["companies"], cached["sections"])
+
+        # 缓存键在解析之前取得，解析期间被修改的文件下次加载时会重新解析
+        keys = [company_cache.source_key(path) if use_cache else None for path in stale]
+        for path, key, parsed in zip(stale, keys, parse_files(stale)):
+            results[path] = parsed
+            if use_cache:
+                company_cache.save(
+                    path,
+                    key,
+                    {"companies": parsed[0], "sections": parsed[1]},
+                    PARSE_CACHE_SUFFIX,
+                )
+        return [(path, *results[path]) for path in files]
+
+    def read(self, use_cache=True, timeline=None):
+        """解析并合并所有层，返回 MergedLayers"""
+        with timeline_phase(timeline, "parse"):
+            parsed = self.parse_all(use_cache)
+        return merge_layers(parsed)
+
+    def load(self, use_cache=True, timeline=None):
+        """读取所有层，返回 (model, search_index, section_texts)"""
+        merged = self.read(use_cache, timeline)
+        with timeline_phase(timeline, "model_build"):
+            model = CompanyModel()
+            for name in sorted(merged.company_data):
+                model.set(name, merged.company_data[name], merged.origins[name])
+        with timeline_phase(timeline, "index_build"):
+            search_index = SearchIndex(model)
+        return model, search_index, merged.sections
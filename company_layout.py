@@ -0,0 +1,107 @@
+"""界面布局协调
+
+LayoutManager 负责三件事：
+
+- 缓存滚动区域的屏幕几何信息（位置和大小），只在 <Configure> 时失效，
+  滚轮命中判断不必每次都向Tk查询
+- 把一连串滚轮事件合并成每帧一次滚动
+- 把滚动区域等布局计算推迟到 after_idle，同一批次内多次请求只计算一次
+"""
+
+# 合并滚轮事件的帧间隔（毫秒）
+SCROLL_FRAME_MS = 16
+
+
+class LayoutManager:
+    """滚动区域几何缓存、滚轮合并和延迟布局"""
+
+    def __init__(self, root, frame_ms=SCROLL_FRAME_MS):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.regions = []
+        self._geometry = {}
+        self._pending_scroll = {}
+        self._scroll_id = None
+        self._deferred = {}
+        self._idle_id = None
+
+    # 几何缓存
+
+    def add_region(self, widget):
+        """登记一个可以用滚轮滚动的区域，按登记顺序进行命中判断"""
+        self.regions.append(widget)
+        widget.bind("<Configure>", self.invalidate, add="+")
+
+    def watch_toplevel(self, toplevel):
+        """窗口移动或缩放时所有区域的屏幕坐标都会变化"""
+
+        def on_configure(event):
+            # 子组件的 <Configure> 也会经过顶层窗口的绑定，只处理窗口自身的
+            if event.widget is toplevel:
+                self.invalidate()
+
+        toplevel.bind("<Configure>", on_configure, add="+")
+
+    def invalidate(self, event=None):
+        """清除几何缓存，下次命中判断时重新查询"""
+        self._geometry.clear()
+
+    def geometry(self, widget):
+        """返回 (x, y, 宽, 高)，屏幕坐标"""
+        rect = self._geometry.get(widget)
+        if rect is None:
+            rect = (
+                widget.winfo_rootx(),
+                widget.winfo_rooty(),
+                widget.winfo_width(),
+                widget.winfo_height(),
+            )
+            self._geometry[widget] = rect
+        return rect
+
+    def region_at(self, x, y):
+        """返回包含屏幕坐标 (x, y) 的区域，没有时返回None"""
+        for widget in self.regions:
+            left, top, width, height = self.geometry(widget)
+            if left <= x < left + width and top <= y < top + height:
+                return widget
+        return None
+
+    # 滚轮合并
+
+    def scroll(self, widget, units):
+        """累积滚动量（可以是小数），每帧最多执行一次 yview_scroll"""
+        self._pending_scroll[widget] = self._pending_scroll.get(widget, 0) + units
+        if self._scroll_id is None:
+            self._scroll_id = self.root.after(self.frame_ms, self._flush_scroll)
+
+    def _flush_scroll(self):
+        self._scroll_id = None
+        pending, self._pending_scroll = self._pending_scroll, {}
+        for widget, units in pending.items():
+            # 不足一格的部分留到下一次
+            whole = int(units)
+            if whole:
+                widget.yview_scroll(whole, "units")
+            if units != whole:
+                self._pending_scroll[widget] = units - whole
+
+    # 延迟布局
+
+    def defer(self, key, func):
+        """在下一次空闲时执行 func，同一 key 在一批内只执行一次"""
+        self._deferred[key] = func
+        if self._idle_id is None:
+            self._idle_id = self.root.after_idle(self._run_deferred)
+
+    def flush(self):
+        """立即执行所有推迟的布局计算"""
+        if self._idle_id is not None:
+            self.root.after_cancel(self._idle_id)
+        self._run_deferred()
+
+    def _run_deferred(self):
+        self._idle_id = None
+        deferred, self._deferred = self._deferred, {}
+        for func in deferred.values():
+            func()
@@ -0,0 +1,336 @@
+"""多语言显示文字
+
+company.ini 中的公司名、字段名和取值是数据的内部ID（即 SOURCE_LANGUAGE 的文字），
+数据模型、缓存、存档匹配和图标都只使用内部ID；界面显示时再通过当前语言的
+文字表（Locale）转换，没有翻译的ID原样显示。
+
+所有语言的文字表打包在一个文件中：
+
+    b"HQLC1" | 索引长度 (4字节，小端) | 索引JSON | 各语言的文字表...
+
+索引是 {语言: [偏移, 长度, 条目数]}；每个语言的文字表是 UTF-8 文本，每行
+"种类<TAB>内部ID<TAB>显示文字"，种类是 companies、fields 或 company_model 的
+名称表（techs、buildings 等）。打开文件时只读取索引，切换语言时只读取并解析
+该语言的一段，此前的语言随即释放。
+
+文字表可以从游戏的本地化文件生成（按简体中文文本反查脚本键，再取目标语言的
+文本），也可以从手工维护的 TSV 文件（同样是每行 种类、内部ID、显示文字）读取：
+
+    python company_locale.py build --game-dir ".../Victoria 3/game" --language en
+    python company_locale.py build --table en.tsv
+    python company_locale.py list
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+
+from company_data import DEFAULT_INI_PATH
+from company_import import localize
+from company_model import TABLES
+from company_modifiers import format_modifier, normalize_target, parse_modifier
+
+# 文字表文件头
+LOCALE_MAGIC = b"HQLC1"
+
+# 默认的文字表文件，与 company.ini 放在一起
+DEFAULT_LOCALE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "locales.pack"
+)
+
+# company.ini 使用的语言，内部ID就是这个语言的文字
+SOURCE_LANGUAGE = "zh"
+
+# 语言代码 → 游戏本地化目录名
+LANGUAGES = {
+    "zh": "simp_chinese",
+    "en": "english",
+    "de": "german",
+    "fr": "french",
+    "es": "spanish",
+    "ru": "russian",
+    "ja": "japanese",
+    "ko": "korean",
+    "pl": "polish",
+    "pt": "braz_por",
+    "tr": "turkish",
+}
+
+# 数值与效果名之间不加空格的语言
+NO_SPACE_LANGUAGES = ("zh", "ja")
+
+# 文字表的种类：公司名、字段名，以及公司模型的各个名称表
+KINDS = ("companies", "fields") + TABLES
+
+# 内置的字段名翻译，文字表中的 fields 条目优先
+DEFAULT_FIELD_LABELS = {
+    "en": {
+        "名称": "Name",
+        "特殊前置": "Special prerequisite",
+        "科技": "Tech",
+        "地块": "Region",
+        "建筑": "Buildings",
+        "建筑_可选": "Optional buildings",
+        "繁荣": "Prosperity",
+        "名贵": "Prestige good",
+        "特殊名贵": "Special prestige good",
+    },
+}
+
+_LENGTH = struct.Struct("<I")
+
+
+class Locale:
+    """一个语言的文字表，tables 是 {种类: {内部ID: 显示文字}}"""
+
+    def __init__(self, language=SOURCE_LANGUAGE, tables=None):
+        self.language = language
+        self.tables = tables or {}
+        self.fields = {
+            **DEFAULT_FIELD_LABELS.get(language, {}),
+            **self.tables.get("fields", {}),
+        }
+        self._aliases = None
+
+    @property
+    def source(self):
+        """是否就是 company.ini 使用的语言（不需要转换）"""
+        return self.language == SOURCE_LANGUAGE and not self.tables
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def text(self, kind, name):
+        """内部ID的显示文字，没有翻译时返回ID本身"""
+        if kind == "modifiers":
+            return self.modifier(name)
+        table = self.tables.get(kind)
+        if not table:
+            return name
+        return table.get(name, name)
+
+    def modifier(self, text):
+        """翻译一条繁荣效果：只替换效果名，数值和单位保持不变"""
+        table = self.tables.get("modifiers")
+        if not table:
+            return text
+        modifier = parse_modifier(text)
+        if modifier is None:
+            return table.get(text, text)
+        target = table.get(modifier.target)
+        if target is None:
+            return text
+        if self.language in NO_SPACE_LANGUAGES:
+            return format_modifier(modifier.value, modifier.unit, target)
+        return f"{format_modifier(modifier.value, modifier.unit, '')} {target}"
+
+    def field(self, key):
+        """字段名的显示文字"""
+        return self.fields.get(key, key)
+
+    def field_aliases(self):
+        """搜索时可用的字段名 {小写的显示文字: 字段}，空格写作下划线"""
+        if self._aliases is None:
+            from company_search import SEARCH_FIELDS
+
+            self._aliases = {
+                label.lower().replace(" ", "_"): key
+                for key, label in self.fields.items()
+                if key in SEARCH_FIELDS and label != key
+            }
+        return self._aliases
+
+
+class LocaleStore:
+    """只读的文字表文件，打开时只读取索引，每次只加载一个语言"""
+
+    def __init__(self, path=DEFAULT_LOCALE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            magic = f.read(len(LOCALE_MAGIC))
+            if magic != LOCALE_MAGIC:
+                raise ValueError(f"不是文字表文件: {path}")
+            (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+            self.index = json.loads(f.read(length).decode("utf-8"))
+        self.data_start = len(LOCALE_MAGIC) + _LENGTH.size + length
+        self.active = Locale()
+
+    def languages(self):
+        """可以切换到的语言，源语言在最前"""
+        others = sorted(lang for lang in self.index if lang != SOURCE_LANGUAGE)
+        return [SOURCE_LANGUAGE] + others
+
+    def load(self, language):
+        """切换到一个语言并返回其 Locale，上一个语言的文字表随即释放"""
+        if language == self.active.language:
+            return self.active
+        if language == SOURCE_LANGUAGE and language not in self.index:
+            self.active = Locale()
+            return self.active
+        entry = self.index.get(language)
+        if entry is None:
+            raise ValueError(f"文字表中没有语言: {language}")
+        offset, size, _ = entry
+        with open(self.path, "rb") as f:
+            f.seek(self.data_start + offset)
+            data = f.read(size)
+        self.active = Locale(language, parse_table(data.decode("utf-8")))
+        return self.active
+
+
+def open_locale_store(path=DEFAULT_LOCALE_PATH):
+    """打开文字表文件，文件不存在时返回None"""
+    if not path or not os.path.exists(path):
+        return None
+    return LocaleStore(path)
+
+
+def parse_table(text):
+    """解析 "种类<TAB>内部ID<TAB>显示文字" 的行，返回 {种类: {内部ID: 显示文字}}"""
+    tables = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split("\t")
+        if len(parts) != 3 or parts[0] not in KINDS:
+            continue
+        kind, name, display = parts
+        tables.setdefault(kind, {})[name] = display
+    return tables
+
+
+def format_table(tables):
+    """把文字表转为每行一个条目的文本，含制表符或换行的条目被跳过"""
+    lines = []
+    for kind in KINDS:
+        for name, display in sorted(tables.get(kind, {}).items()):
+            if any(c in "\t\r\n" for c in name + display):
+                continue
+            lines.append(f"{kind}\t{name}\t{display}\n")
+    return "".join(lines)
+
+
+def write_locales(languages, path=DEFAULT_LOCALE_PATH):
+    """把 {语言: 文字表} 写入文字表文件（原子替换）"""
+    index, blocks, offset = {}, [], 0
+    for language in sorted(languages):
+        tables = languages[language]
+        data = format_table(tables).encode("utf-8")
+        index[language] = [offset, len(data), data.count(b"\n")]
+        blocks.append(data)
+        offset += len(data)
+    header = json.dumps(index, ensure_ascii=False).encode("utf-8")
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(LOCALE_MAGIC + _LENGTH.pack(len(header)) + header)
+        for data in blocks:
+            out.write(data)
+    os.replace(tmp_path, path)
+    return index
+
+
+def translate_model(model, source, target):
+    """按源语言的本地化表反查脚本键，返回模型中各内部ID在目标语言中的文字"""
+    reverse = {}
+    for key in source:
+        text = localize(source, key)
+        reverse.setdefault(text, key)
+        reverse.setdefault(normalize_target(text), key)
+
+    tables = {}
+
+    def add(kind, name):
+        key = reverse.get(name)
+        if key is None:
+            return
+        display = localize(target, key)
+        if display != key and display != name:
+            tables.setdefault(kind, {})[name] = display
+
+    for name in model:
+        add("companies", name)
+    for table in TABLES:
+        for name in model.tables[table].names:
+            if table == "modifiers":
+                # 繁荣效果按效果名翻译，数值在显示时保留
+                modifier = parse_modifier(name)
+                add(table, name if modifier is None else modifier.target)
+            else:
+                add(table, name)
+    return tables
+
+
+def _merge(tables, extra):
+    for kind, entries in extra.items():
+        tables.setdefault(kind, {}).update(entries)
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="多语言文字表")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="生成文字表文件")
+    build.add_argument("--game-dir", help="游戏的 game 目录，从其本地化生成文字表")
+    build.add_argument(
+        "--localization", action="append", default=[], help="额外的本地化文件或目录"
+    )
+    build.add_argument(
+        "--language",
+        action="append",
+        default=[],
+        choices=sorted(set(LANGUAGES) - {SOURCE_LANGUAGE}),
+        help="从本地化生成的语言，可重复",
+    )
+    build.add_argument(
+        "--table",
+        action="append",
+        default=[],
+        help="手工维护的文字表 TSV，文件名（不含扩展名）是语言代码，可重复",
+    )
+    build.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    build.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    build.add_argument("--output", default=DEFAULT_LOCALE_PATH, help="文字表文件")
+    listing = commands.add_parser("list", help="列出文字表中的语言")
+    listing.add_argument("path", nargs="?", default=DEFAULT_LOCALE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        store = LocaleStore(args.path)
+        for language, (_, size, count) in sorted(store.index.items()):
+            print(f"{language}\t{count}\t{size}")
+        return 0
+
+    languages = {}
+    if args.language:
+        from company_core import CompanyRepository
+        from company_save import load_localization
+
+        repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+        source = load_localization(
+            args.game_dir, args.localization, LANGUAGES[SOURCE_LANGUAGE]
+        )
+        for language in args.language:
+            target = load_localization(
+                args.game_dir, args.localization, LANGUAGES[language]
+            )
+            languages[language] = translate_model(repo.company_data, source, target)
+    for path in args.table:
+        language = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8-sig") as f:
+            _merge(languages.setdefault(language, {}), parse_table(f.read()))
+    if not languages:
+        parser.error("需要 --language 或 --table")
+
+    index = write_locales(languages, args.output)
+    for language, (_, _, count) in sorted(index.items()):
+        print(f"{language}: {count} 条", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
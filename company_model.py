@@ -0,0 +1,280 @@
+"""紧凑的公司数据模型
+
+科技、地块、建筑、名贵商品和繁荣效果在读取时登记到名称表（InternTable），
+公司记录（CompanyRecord）只保存名称ID：单值字段是一个整数（缺失为 NONE），
+列表字段是 array("i")。NULL、"None" 等空值在建立记录时统一处理一次，
+搜索、汇总和列表显示都直接使用ID。
+
+每个记录还保存它来自哪个数据层（基础文件或覆盖文件，见 company_layers）。
+
+CompanyModel 同时是 {公司名: 信息字典} 的映射，按需把记录还原成与
+parse_company_text 相同形式的字典，供命令行输出等不在热点路径上的地方使用。
+"""
+
+from array import array
+from collections.abc import MutableMapping
+
+# 名称表
+TABLES = ("techs", "regions", "buildings", "goods", "modifiers")
+
+# 只取单个值的字段
+SINGLE_FIELDS = ("科技", "地块", "名贵")
+
+# 列表字段
+LIST_FIELDS = ("建筑", "建筑_可选", "繁荣")
+
+# company.ini 中的字段顺序
+INFO_FIELDS = ("特殊前置", "科技", "地块", "建筑", "建筑_可选", "繁荣", "名贵", "特殊名贵")
+
+# 字段使用的名称表
+FIELD_TABLES = {
+    "科技": "techs",
+    "地块": "regions",
+    "名贵": "goods",
+    "建筑": "buildings",
+    "建筑_可选": "buildings",
+    "繁荣": "modifiers",
+}
+
+# 字段对应的记录属性
+FIELD_SLOTS = {
+    "科技": "tech",
+    "地块": "region",
+    "名贵": "luxury",
+    "建筑": "buildings",
+    "建筑_可选": "optional_buildings",
+    "繁荣": "bonuses",
+}
+
+# 单值字段缺失时的ID
+NONE = -1
+
+# 视为缺失的原始值
+_NULL_VALUES = (None, "", "NULL", "None")
+
+
+def _is_null(value):
+    return isinstance(value, (str, type(None))) and value in _NULL_VALUES
+
+
+class InternTable:
+    """名称 ↔ ID 的双向表，ID 只追加不复用"""
+
+    __slots__ = ("names", "ids")
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.ids = {name: vid for vid, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        """返回名称的ID，不存在时登记"""
+        vid = self.ids.get(name)
+        if vid is None:
+            vid = len(self.names)
+            self.ids[name] = vid
+            self.names.append(name)
+        return vid
+
+
+class CompanyRecord:
+    """一个公司的紧凑记录
+
+    列表字段不是列表（如无法解析的原文）时为None，原值保存在 extra 中。
+    layer 是数据层文件在 CompanyModel.layers 中的ID，未知时为 NONE。
+    """
+
+    __slots__ = (
+        "name",
+        "tech",
+        "region",
+        "luxury",
+        "buildings",
+        "optional_buildings",
+        "bonuses",
+        "special_luxury",
+        "special_prereq",
+        "extra",
+        "layer",
+    )
+
+    def value_ids(self, field):
+        """返回字段的ID序列，缺失时为空"""
+        value = getattr(self, FIELD_SLOTS[field])
+        if value is None:
+            return ()
+        if isinstance(value, int):
+            return () if value == NONE else (value,)
+        return value
+
+    def to_tuple(self):
+        """转为可被 marshal 序列化的元组"""
+        return (
+            self.name,
+            self.tech,
+            self.region,
+            self.luxury,
+            *(
+                None if ids is None else ids.tobytes()
+                for ids in (self.buildings, self.optional_buildings, self.bonuses)
+            ),
+            self.special_luxury,
+            self.special_prereq,
+            self.extra,
+            self.layer,
+        )
+
+    @classmethod
+    def from_tuple(cls, values):
+        record = cls()
+        (
+            record.name,
+            record.tech,
+            record.region,
+            record.luxury,
+            buildings,
+            optional_buildings,
+            bonuses,
+            record.special_luxury,
+            record.special_prereq,
+            record.extra,
+            record.layer,
+        ) = values
+        record.buildings = _ids_from_bytes(buildings)
+        record.optional_buildings = _ids_from_bytes(optional_buildings)
+        record.bonuses = _ids_from_bytes(bonuses)
+        return record
+
+
+def _ids_from_bytes(data):
+    if data is None:
+        return None
+    ids = array("i")
+    ids.frombytes(data)
+    return ids
+
+
+class CompanyModel(MutableMapping):
+    """公司记录和名称表，同时可以当作 {公司名: 信息字典} 使用"""
+
+    def __init__(self, company_data=None, layer=None):
+        self.tables = {table: InternTable() for table in TABLES}
+        self.layers = InternTable()
+        self.records = {}
+        if company_data:
+            for name in sorted(company_data):
+                self.set(name, company_data[name], layer)
+
+    def table(self, field):
+        """返回字段使用的名称表"""
+        return self.tables[FIELD_TABLES[field]]
+
+    def record(self, name):
+        """返回公司记录，不存在时返回None"""
+        return self.records.get(name)
+
+    def value_names(self, record, field):
+        """返回记录中某个字段的名称列表"""
+        names = self.table(field).names
+        return [names[vid] for vid in record.value_ids(field)]
+
+    def layer_of(self, name):
+        """返回公司所在的数据层文件，未知时返回None"""
+        layer = self.records[name].layer
+        return None if layer == NONE else self.layers.names[layer]
+
+    def set(self, name, info, layer=None):
+        """新增或替换一个公司，layer 是它所在的数据层文件"""
+        self.records[name] = self.build_record(name, info, layer)
+
+    def build_record(self, name, info, layer=None):
+        """把解析后的信息字典转为记录，登记其中的名称"""
+        record = CompanyRecord()
+        record.name = name
+        record.layer = NONE if layer is None else self.layers.intern(layer)
+        extra = {}
+        for field in SINGLE_FIELDS:
+            value = info.get(field)
+            if _is_null(value):
+                vid = NONE
+            else:
+                vid = self.table(field).intern(str(value))
+            setattr(record, FIELD_SLOTS[field], vid)
+        for field in LIST_FIELDS:
+            value = info.get(field)
+            if isinstance(value, list):
+                table = self.table(field)
+                ids = array("i", [table.intern(str(v)) for v in value])
+            else:
+                ids = None
+                if value is not None:
+                    extra[field] = value
+            setattr(record, FIELD_SLOTS[field], ids)
+        record.special_luxury = bool(info.get("特殊名贵", False))
+        prereq = info.get("特殊前置")
+        record.special_prereq = None if _is_null(prereq) else prereq
+        for key, value in info.items():
+            if key not in INFO_FIELDS:
+                extra[key] = value
+        record.extra = extra or None
+        return record
+
+    def to_info(self, record):
+        """把记录还原为信息字典，字段顺序与 company.ini 相同"""
+        info = {}
+        for field in INFO_FIELDS:
+            if field == "特殊前置":
+                value = record.special_prereq
+            elif field == "特殊名贵":
+                value = record.special_luxury
+            else:
+                value = getattr(record, FIELD_SLOTS[field])
+                if isinstance(value, int):
+                    value = None if value == NONE else self.table(field).names[value]
+                elif value is not None:
+                    value = self.value_names(record, field)
+            info[field] = value
+        if record.extra:
+            info.update(record.extra)
+        return info
+
+    def __getitem__(self, name):
+        return self.to_info(self.records[name])
+
+    def __setitem__(self, name, info):
+        self.set(name, info)
+
+    def __delitem__(self, name):
+        del self.records[name]
+
+    def __contains__(self, name):
+        return name in self.records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_state(self):
+        """导出可被 marshal 序列化的内容"""
+        return {
+            "tables": {table: values.names for table, values in self.tables.items()},
+            "layers": self.layers.names,
+            "records": [record.to_tuple() for record in self.records.values()],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """从 to_state 导出的内容恢复模型"""
+        model = cls()
+        model.tables = {
+            table: InternTable(names) for table, names in state["tables"].items()
+        }
+        model.layers = InternTable(state["layers"])
+        for values in state["records"]:
+            record = CompanyRecord.from_tuple(values)
+            model.records[record.name] = record
+        return model
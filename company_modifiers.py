@@ -0,0 +1,158 @@
+"""繁荣效果（修正）的解析与汇总
+
+"+10%创新力"、"+50000赋税收入"、"+1公司上限" 这样的条目在读取时解析为
+带符号、数值、单位和目标键的 Modifier，并按 公司 × 修正 组成稀疏矩阵
+（CSR 格式，存放在 array 中），任意选择的合计是一次按行掩码的累加。
+"""
+
+import re
+from array import array
+from collections import namedtuple
+
+# 单位
+UNIT_PERCENT = "percent"
+UNIT_FLAT = "flat"
+UNIT_CAP = "cap"
+
+# 同一效果的不同写法归一到同一个目标键
+TARGET_ALIASES = {
+    "来自政治运动的效忠派": "来自政治运动的忠诚派",
+}
+
+_MODIFIER_RE = re.compile(r"^([+-])(\d+(?:\.\d+)?)(%?)(.+)$")
+
+Modifier = namedtuple("Modifier", ["value", "unit", "target", "raw"])
+
+
+def normalize_target(text):
+    """归一化修正的目标键"""
+    text = "".join(text.split())
+    # "发电厂吞吐" 与 "发电厂吞吐量" 是同一效果
+    if text.endswith("吞吐"):
+        text += "量"
+    return TARGET_ALIASES.get(text, text)
+
+
+def parse_modifier(text):
+    """解析一条繁荣效果，无法识别时返回None"""
+    match = _MODIFIER_RE.match("".join(str(text).split()))
+    if match is None:
+        return None
+    sign, magnitude, percent, target = match.groups()
+    value = float(magnitude)
+    if sign == "-":
+        value = -value
+
+    target = normalize_target(target)
+    if percent:
+        unit = UNIT_PERCENT
+    elif target.endswith("上限"):
+        unit = UNIT_CAP
+    else:
+        unit = UNIT_FLAT
+    return Modifier(value, unit, target, text)
+
+
+def format_modifier(value, unit, target):
+    """把合计后的修正格式化为 "+15%畜牧场吞吐量" 的形式"""
+    value = round(value, 6)
+    magnitude = abs(value)
+    if magnitude == int(magnitude):
+        magnitude = int(magnitude)
+    sign = "-" if value < 0 else "+"
+    suffix = "%" if unit == UNIT_PERCENT else ""
+    return f"{sign}{magnitude}{suffix}{target}"
+
+
+class ModifierMatrix:
+    """公司 × 修正 的稀疏矩阵
+
+    每一列是一个 (目标键, 单位)，第 i 行的修正存放在
+    cols/vals[row_ptr[i]:row_ptr[i + 1]] 中，ids 记录公司对应的行。
+    行和列都只追加：公司被修改时追加新行，被删除时只解除映射，
+    因此已有的列号在热重载后保持不变。
+
+    繁荣效果在公司模型中已登记为名称ID，每个不同的条目只解析一次。
+    无法解析的条目以名称ID保留在 unparsed。
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._parsed = {}
+        self.ids = {}
+        self.columns = []
+        self.column_ids = {}
+        self.row_ptr = array("l", [0])
+        self.cols = array("l")
+        self.vals = array("d")
+        self.unparsed = {}
+
+        for name in sorted(model):
+            self.update(name, model.record(name))
+
+    def update(self, name, record):
+        """为公司（新增或修改）追加一行"""
+        self.unparsed.pop(name, None)
+        for vid in record.value_ids("繁荣"):
+            self._add_entry(name, vid)
+        self.ids[name] = len(self.row_ptr) - 1
+        self.row_ptr.append(len(self.cols))
+
+    def remove(self, name):
+        """删除公司对应的行"""
+        self.ids.pop(name, None)
+        self.unparsed.pop(name, None)
+
+    def _parse(self, vid):
+        """解析（并缓存）一条繁荣效果"""
+        if vid not in self._parsed:
+            text = self.model.tables["modifiers"].names[vid]
+            self._parsed[vid] = parse_modifier(text)
+        return self._parsed[vid]
+
+    def _add_entry(self, name, vid):
+        """把一条繁荣效果加入当前行"""
+        modifier = self._parse(vid)
+        if modifier is None:
+            self.unparsed.setdefault(name, []).append(vid)
+            return
+        key = (modifier.target, modifier.unit)
+        col = self.column_ids.get(key)
+        if col is None:
+            col = len(self.columns)
+            self.column_ids[key] = col
+            self.columns.append(key)
+        self.cols.append(col)
+        self.vals.append(modifier.value)
+
+    def row(self, company):
+        """返回公司的 [(列, 数值)]"""
+        cid = self.ids[company]
+        start, end = self.row_ptr[cid], self.row_ptr[cid + 1]
+        return list(zip(self.cols[start:end], self.vals[start:end]))
+
+    def empty_totals(self):
+        """返回全零的 (合计, 公司数) 数组"""
+        size = len(self.columns)
+        return array("d", [0.0]) * size, array("l", [0]) * size
+
+    def totals(self, companies):
+        """对选中的公司求各修正的合计，返回 (合计数组, 公司数数组)"""
+        sums, counts = self.empty_totals()
+        row_ptr, cols, vals = self.row_ptr, self.cols, self.vals
+        for company in companies:
+            cid = self.ids[company]
+            for k in range(row_ptr[cid], row_ptr[cid + 1]):
+                sums[cols[k]] += vals[k]
+                counts[cols[k]] += 1
+        return sums, counts
+
+    def format_totals(self, sums, counts):
+        """把合计结果格式化为 [(文本, 公司数)]，按公司数和目标键排序"""
+        entries = []
+        for col, count in enumerate(counts):
+            if count:
+                target, unit = self.columns[col]
+                entries.append((format_modifier(sums[col], unit, target), count))
+        entries.sort(key=lambda x: (-x[1], x[0]))
+        return entries
@@ -0,0 +1,349 @@
+"""公司组合优化
+
+在公司数量上限以及科技、地块限制下，寻找使目标得分最高的公司组合。
+目标得分 = 加权的繁荣效果合计 + 覆盖的建筑种类数 × 覆盖权重。
+
+建筑、科技、地块都编码为整数位集；搜索采用分支定界：候选按乐观得分降序
+排列，用前缀和得到 O(1) 上界，再用考虑已覆盖建筑的上界剪枝，并保留前 k 个
+结果。超过时间限制时返回已找到的最优结果。
+
+也可以在命令行中使用：
+
+    python company_optimizer.py --slots 7 --weight 畜牧场吞吐量=1 --coverage 1
+"""
+
+import argparse
+import heapq
+import json
+import time
+from collections import namedtuple
+
+from company_modifiers import ModifierMatrix, normalize_target
+
+# 默认时间限制（秒）与返回的结果数
+DEFAULT_TIME_LIMIT = 2.0
+DEFAULT_TOP_K = 5
+
+Solution = namedtuple("Solution", ["score", "companies", "buildings", "modifiers"])
+
+OptimizeResult = namedtuple(
+    "OptimizeResult", ["solutions", "nodes", "elapsed", "complete"]
+)
+
+
+class _Timeout(Exception):
+    """搜索超过时间限制"""
+
+
+class BitTable:
+    """把名称映射为位的表"""
+
+    def __init__(self):
+        self.names = []
+        self.bits = {}
+
+    def bit(self, name):
+        """返回名称对应的位，必要时分配新位"""
+        bit = self.bits.get(name)
+        if bit is None:
+            bit = 1 << len(self.names)
+            self.bits[name] = bit
+            self.names.append(name)
+        return bit
+
+    def mask(self, names):
+        """返回一组名称的位集，未登记的名称被忽略"""
+        mask = 0
+        for name in names:
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    def decode(self, mask):
+        """把位集还原为名称列表"""
+        return [name for i, name in enumerate(self.names) if mask >> i & 1]
+
+
+class PortfolioOptimizer:
+    """基于位集的公司组合优化器，可在界面中或无界面使用"""
+
+    def __init__(self, company_data, modifiers=None):
+        self.company_data = company_data
+        self.modifiers = modifiers or ModifierMatrix(company_data)
+        self.companies = sorted(company_data)
+
+        self.building_bits = BitTable()
+        self.optional_bits = BitTable()
+        self.tech_bits = BitTable()
+        self.region_bits = BitTable()
+
+        # 每个公司的位集：基础建筑、可选建筑、科技、地块
+        self.buildings = []
+        self.optional = []
+        self.tech = []
+        self.region = []
+        for name in self.companies:
+            record = company_data.record(name)
+            self.buildings.append(self._mask(self.building_bits, record, "建筑"))
+            self.optional.append(self._mask(self.optional_bits, record, "建筑_可选"))
+            self.tech.append(self._mask(self.tech_bits, record, "科技"))
+            self.region.append(self._mask(self.region_bits, record, "地块"))
+
+    def _mask(self, table, record, field):
+        mask = 0
+        for value in self.company_data.value_names(record, field):
+            mask |= table.bit(value)
+        return mask
+
+    def eligible(self, techs=None, regions=None):
+        """返回满足科技、地块限制的公司ID列表，None 表示不限制"""
+        tech_mask = None if techs is None else self.tech_bits.mask(techs)
+        region_mask = None if regions is None else self.region_bits.mask(regions)
+        result = []
+        for cid in range(len(self.companies)):
+            if tech_mask is not None and self.tech[cid] & ~tech_mask:
+                continue
+            if region_mask is not None and self.region[cid] & ~region_mask:
+                continue
+            result.append(cid)
+        return result
+
+    def modifier_scores(self, weights):
+        """按权重计算每个公司繁荣效果的得分"""
+        weights = {normalize_target(k): v for k, v in (weights or {}).items()}
+        column_weights = [
+            weights.get(target, 0.0) for target, unit in self.modifiers.columns
+        ]
+        row_ptr = self.modifiers.row_ptr
+        cols, vals = self.modifiers.cols, self.modifiers.vals
+        scores = []
+        for name in self.companies:
+            row = self.modifiers.ids[name]
+            score = 0.0
+            for k in range(row_ptr[row], row_ptr[row + 1]):
+                score += column_weights[cols[k]] * vals[k]
+            scores.append(score)
+        return scores
+
+    def optimize(
+        self,
+        slots,
+        weights=None,
+        coverage_weight=0.0,
+        optional_weight=0.0,
+        techs=None,
+        regions=None,
+        required=(),
+        excluded=(),
+        top_k=DEFAULT_TOP_K,
+        time_limit=DEFAULT_TIME_LIMIT,
+    ):
+        """寻找得分最高的前 top_k 个组合
+
+        weights: {修正目标: 权重}；coverage_weight / optional_weight: 每覆盖
+        一种基础/可选建筑的得分；techs / regions: 已研究的科技和拥有的地块，
+        None 表示不限制；required / excluded: 必选和排除的公司。
+        未指定任何权重时，目标为覆盖尽可能多的基础建筑。
+        """
+        if not weights and not coverage_weight and not optional_weight:
+            coverage_weight = 1.0
+
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit
+        mod_scores = self.modifier_scores(weights)
+        ids = {name: cid for cid, name in enumerate(self.companies)}
+
+        required_ids = [ids[name] for name in required if name in ids]
+        excluded_ids = {ids[name] for name in excluded if name in ids}
+
+        def gain(cid, covered, covered_optional):
+            return (
+                mod_scores[cid]
+                + coverage_weight * (self.buildings[cid] & ~covered).bit_count()
+                + optional_weight * (self.optional[cid] & ~covered_optional).bit_count()
+            )
+
+        # 必选公司构成初始状态
+        base_score = 0.0
+        covered = covered_optional = 0
+        for cid in required_ids:
+            base_score += gain(cid, covered, covered_optional)
+            covered |= self.buildings[cid]
+            covered_optional |= self.optional[cid]
+
+        # 候选：满足限制、不在必选或排除中、乐观得分为正，按乐观得分降序
+        skip = excluded_ids | set(required_ids)
+        candidates = []
+        for cid in self.eligible(techs, regions):
+            if cid in skip:
+                continue
+            optimistic = gain(cid, covered, covered_optional)
+            if optimistic > 0:
+                candidates.append((optimistic, cid))
+        candidates.sort(key=lambda x: (-x[0], x[1]))
+        optimistic = [value for value, cid in candidates]
+        order = [cid for value, cid in candidates]
+        prefix = [0.0]
+        for value in optimistic:
+            prefix.append(prefix[-1] + value)
+
+        n = len(order)
+        best = []
+        counter = [0, 0]
+
+        def record(score, chosen):
+            counter[1] += 1
+            entry = (score, -counter[1], tuple(chosen))
+            if len(best) < top_k:
+                heapq.heappush(best, entry)
+            elif score > best[0][0]:
+                heapq.heapreplace(best, entry)
+
+        def threshold():
+            return best[0][0] if len(best) >= top_k else float("-inf")
+
+        def search(start, chosen, score, covered, covered_optional, remaining):
+            counter[0] += 1
+            if counter[0] & 1023 == 0 and time.perf_counter() > deadline:
+                raise _Timeout()
+            if remaining == 0:
+                record(score, chosen)
+                return
+
+            # 只记录无法再扩展的组合：还能加入收益为正的公司时，记录的应是
+            # 加入后的组合，否则前k个结果中会出现同一组合的各个前缀
+            gains = [gain(order[j], covered, covered_optional) for j in range(start, n)]
+            if not any(g > 0 for g in gains):
+                record(score, chosen)
+                return
+
+            # 考虑已覆盖建筑后的上界：剩余候选中真实收益最大的 remaining 个之和
+            top = heapq.nlargest(remaining, gains)
+            if score + sum(g for g in top if g > 0) <= threshold():
+                return
+
+            for j in range(start, n):
+                # 候选按乐观得分降序，前缀和上界不再超过阈值时后面的也不会
+                end = min(j + remaining, n)
+                if score + prefix[end] - prefix[j] <= threshold():
+                    break
+                g = gains[j - start]
+                if g <= 0:
+                    continue
+                cid = order[j]
+                chosen.append(cid)
+                search(
+                    j + 1,
+                    chosen,
+                    score + g,
+                    covered | self.buildings[cid],
+                    covered_optional | self.optional[cid],
+                    remaining - 1,
+                )
+                chosen.pop()
+
+        slots_left = max(slots - len(required_ids), 0)
+        complete = True
+        try:
+            search(0, [], base_score, covered, covered_optional, slots_left)
+        except _Timeout:
+            complete = False
+
+        solutions = [
+            self._solution(score, required_ids + list(chosen))
+            for score, _, chosen in sorted(best, reverse=True)
+        ]
+        return OptimizeResult(
+            solutions, counter[0], time.perf_counter() - start_time, complete
+        )
+
+    def _solution(self, score, cids):
+        """把搜索结果整理为 Solution"""
+        names = sorted(self.companies[cid] for cid in cids)
+        covered = 0
+        for cid in cids:
+            covered |= self.buildings[cid]
+        sums, counts = self.modifiers.totals(names)
+        return Solution(
+            round(score, 6),
+            names,
+            self.building_bits.decode(covered),
+            self.modifiers.format_totals(sums, counts),
+        )
+
+
+def parse_weights(items):
+    """把 ["目标=权重", ...] 解析为字典"""
+    weights = {}
+    for item in items or ():
+        for part in item.replace("，", ",").split(","):
+            if not part.strip():
+                continue
+            target, _, weight = part.partition("=")
+            weights[target.strip()] = float(weight) if weight.strip() else 1.0
+    return weights
+
+
+def solution_to_dict(solution):
+    """把 Solution 转为可写入JSON的字典"""
+    return {
+        "score": solution.score,
+        "companies": solution.companies,
+        "buildings": solution.buildings,
+        "modifiers": [
+            {"effect": text, "count": count} for text, count in solution.modifiers
+        ],
+    }
+
+
+def main(argv=None):
+    """命令行入口，结果以JSON输出"""
+    from company_core import CompanyRepository
+    from company_data import DEFAULT_INI_PATH
+
+    parser = argparse.ArgumentParser(description="公司组合优化")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    parser.add_argument("--slots", type=int, required=True, help="公司数量上限")
+    parser.add_argument(
+        "--weight", action="append", help="繁荣效果权重，如 畜牧场吞吐量=1"
+    )
+    parser.add_argument("--coverage", type=float, default=0.0, help="基础建筑覆盖权重")
+    parser.add_argument(
+        "--optional-coverage", type=float, default=0.0, help="可选建筑覆盖权重"
+    )
+    parser.add_argument("--tech", action="append", help="已研究的科技（可重复）")
+    parser.add_argument("--region", action="append", help="拥有的地块（可重复）")
+    parser.add_argument("--require", action="append", default=[], help="必选公司")
+    parser.add_argument("--exclude", action="append", default=[], help="排除的公司")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_K, help="返回结果数")
+    parser.add_argument(
+        "--time-limit", type=float, default=DEFAULT_TIME_LIMIT, help="时间限制（秒）"
+    )
+    args = parser.parse_args(argv)
+
+    repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+    result = repo.optimizer().optimize(
+        args.slots,
+        weights=parse_weights(args.weight),
+        coverage_weight=args.coverage,
+        optional_weight=args.optional_coverage,
+        techs=args.tech,
+        regions=args.region,
+        required=args.require,
+        excluded=args.exclude,
+        top_k=args.top,
+        time_limit=args.time_limit,
+    )
+    output = {
+        "complete": result.complete,
+        "nodes": result.nodes,
+        "elapsed": round(result.elapsed, 4),
+        "solutions": [solution_to_dict(s) for s in result.solutions],
+    }
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
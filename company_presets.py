@@ -0,0 +1,235 @@
+"""公司组合方案
+
+把常用的公司选择以名称保存到 presets.json，随时载入；也可以把几个方案的汇总
+并排对比，只在部分方案中出现或取值不同的条目会被标出。
+
+汇总通过 CompanyRepository.summarize 取得，结果按 (选择的位集, 数据版本) 缓存，
+反复切换或对比同几个方案时不会重新计算。
+
+    python company_presets.py save 化工 巴斯夫 科汉森
+    python company_presets.py save 钢铁 --query "建筑:炼钢厂"
+    python company_presets.py list
+    python company_presets.py compare 化工 钢铁 --only-diff
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+
+from company_modifiers import format_modifier, parse_modifier
+
+# 默认的方案文件，与 company.ini 放在一起
+DEFAULT_PRESETS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "presets.json"
+)
+
+# 对比的分区：(标题, 汇总字典中的键, 取值方式, 条目的种类)
+# 取值方式 None 只比较是否出现，"count" 比较公司数，"effect" 比较合计数值；
+# 条目的种类用于按显示语言转换条目名（见 company_locale）
+COMPARE_SECTIONS = (
+    ("所需科技", "techs", None, "techs"),
+    ("所需地块", "regions", None, "regions"),
+    ("基础建筑", "buildings", "count", "buildings"),
+    ("可选建筑", "optional_buildings", "count", "buildings"),
+    ("繁荣效果", "modifiers", "effect", "modifiers"),
+    ("名贵商品", "luxuries", None, "goods"),
+    ("公司", "companies", None, "companies"),
+)
+
+# 对比表的一行：分区、条目的种类、条目、各方案的取值（没有该条目时为空串）、
+# 取值是否不同
+ComparisonRow = namedtuple(
+    "ComparisonRow", ["section", "kind", "item", "values", "differs"]
+)
+
+# 条目出现但没有数值时显示的标记
+PRESENT = "✓"
+
+
+class PresetStore:
+    """保存在JSON文件中的方案 {方案名: [公司名]}，每次修改后立即写回"""
+
+    def __init__(self, path=DEFAULT_PRESETS_PATH):
+        self.path = path
+        self.presets = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"方案文件格式错误: {path}")
+            self.presets = {
+                str(name): [str(company) for company in companies]
+                for name, companies in data.items()
+                if isinstance(companies, list)
+            }
+
+    def __contains__(self, name):
+        return name in self.presets
+
+    def __len__(self):
+        return len(self.presets)
+
+    def names(self):
+        """方案名，按名称排序"""
+        return sorted(self.presets)
+
+    def get(self, name):
+        """方案中的公司，不存在时抛出 ValueError"""
+        companies = self.presets.get(name)
+        if companies is None:
+            raise ValueError(f"方案不存在: {name}")
+        return companies
+
+    def save(self, name, companies):
+        """保存（或覆盖）一个方案"""
+        name = name.strip()
+        if not name:
+            raise ValueError("方案名不能为空")
+        self.presets[name] = sorted(set(companies))
+        self._write()
+
+    def delete(self, name):
+        """删除一个方案，不存在时忽略"""
+        if self.presets.pop(name, None) is not None:
+            self._write()
+
+    def _write(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.presets, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+
+
+def _section_values(summary, key, kind):
+    """取出汇总中一个分区的 {条目: 显示的取值}"""
+    items = summary.get(key, [])
+    if kind == "count":
+        return {item["name"]: str(item["count"]) for item in items}
+    if kind == "effect":
+        values = {}
+        for item in items:
+            modifier = parse_modifier(item["effect"])
+            if modifier is None:
+                values[item["effect"]] = PRESENT
+            else:
+                values[modifier.target] = format_modifier(
+                    modifier.value, modifier.unit, ""
+                )
+        return values
+    return dict.fromkeys(items, PRESENT)
+
+
+def compare_summaries(summaries):
+    """并排对比几个汇总 {方案名: summarize 的结果}，返回 [ComparisonRow]
+
+    values 的顺序与 summaries 一致；条目按第一次出现的顺序排列。
+    """
+    summaries = list(summaries.values())
+    rows = []
+    for item, key in (("公司数", "count"), ("特殊名贵商品", "special_luxuries")):
+        values = [str(summary.get(key, 0)) for summary in summaries]
+        rows.append(ComparisonRow("概况", None, item, values, len(set(values)) > 1))
+
+    for title, key, kind, name_kind in COMPARE_SECTIONS:
+        columns = [_section_values(summary, key, kind) for summary in summaries]
+        items = {}
+        for column in columns:
+            items.update(dict.fromkeys(column))
+        for item in items:
+            values = [column.get(item, "") for column in columns]
+            differs = len(set(values)) > 1
+            rows.append(ComparisonRow(title, name_kind, item, values, differs))
+    return rows
+
+
+def compare_selections(repo, selections):
+    """对比几组公司 {方案名: [公司名]}，返回 [ComparisonRow]"""
+    return compare_summaries(
+        {name: repo.summarize(companies) for name, companies in selections.items()}
+    )
+
+
+def row_to_dict(row, names):
+    """把 ComparisonRow 转为可写入JSON的字典"""
+    return {
+        "section": row.section,
+        "item": row.item,
+        "values": dict(zip(names, row.values)),
+        "differs": row.differs,
+    }
+
+
+def main(argv=None):
+    """命令行入口"""
+    from company_core import CompanyRepository
+    from company_data import DEFAULT_INI_PATH
+
+    parser = argparse.ArgumentParser(description="公司组合方案")
+    parser.add_argument("--presets", default=DEFAULT_PRESETS_PATH, help="方案文件")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="列出方案")
+    save = commands.add_parser("save", help="保存方案")
+    save.add_argument("name", help="方案名")
+    save.add_argument("companies", nargs="*", help="公司名")
+    save.add_argument("--query", help="保存搜索结果中的全部公司")
+    delete = commands.add_parser("delete", help="删除方案")
+    delete.add_argument("name", help="方案名")
+    compare = commands.add_parser("compare", help="并排对比几个方案")
+    compare.add_argument("names", nargs="+", help="方案名")
+    compare.add_argument("--only-diff", action="store_true", help="只输出不同的条目")
+    compare.add_argument("--format", choices=("tsv", "json"), default="tsv")
+    args = parser.parse_args(argv)
+
+    store = PresetStore(args.presets)
+    if args.command == "list":
+        for name in store.names():
+            print(f"{name}\t{len(store.get(name))}")
+        return 0
+    if args.command == "delete":
+        store.delete(args.name)
+        return 0
+
+    repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+    if args.command == "save":
+        companies = list(args.companies)
+        if args.query:
+            companies += repo.search(args.query)
+        missing = [name for name in companies if name not in repo]
+        if missing:
+            parser.error(f"公司不存在: {'、'.join(missing)}")
+        store.save(args.name, companies)
+        return 0
+
+    names = list(dict.fromkeys(args.names))
+    try:
+        selections = {name: store.get(name) for name in names}
+    except ValueError as e:
+        parser.error(str(e))
+    rows = compare_selections(repo, selections)
+    if args.only_diff:
+        rows = [row for row in rows if row.differs]
+    if args.format == "json":
+        json.dump(
+            [row_to_dict(row, names) for row in rows],
+            sys.stdout,
+            ensure_ascii=False,
+            indent=2,
+        )
+        sys.stdout.write("\n")
+    else:
+        print("\t".join(["分区", "条目", *names, "不同"]))
+        for row in rows:
+            mark = "*" if row.differs else ""
+            print("\t".join([row.section, row.item, *row.values, mark]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""性能记录工具
+
+- StartupTimeline 记录启动过程中各阶段的起止时间，可以在不同线程中使用
+- HandlerProfiler 记录事件处理函数的调用次数、耗时分布以及每次调用触发的
+  Tk 调用次数，可导出为 trace viewer（chrome://tracing、Perfetto）可读的JSON
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 首次绘制的时间预算（毫秒），超出时在时间线中标注
+FIRST_PAINT_BUDGET_MS = 300
+
+
+class StartupTimeline:
+    """启动时间线，所有时间相对于创建时刻"""
+
+    def __init__(self, budget_ms=FIRST_PAINT_BUDGET_MS):
+        self.origin = time.perf_counter()
+        self.budget_ms = budget_ms
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def now_ms(self):
+        """距离时间线起点的毫秒数"""
+        return (time.perf_counter() - self.origin) * 1000
+
+    def record(self, name, start_ms, end_ms):
+        """记录一个阶段"""
+        with self._lock:
+            self.phases.append((name, start_ms, end_ms))
+
+    @contextmanager
+    def phase(self, name):
+        """用 with 语句记录一个阶段的耗时"""
+        start = self.now_ms()
+        try:
+            yield
+        finally:
+            self.record(name, start, self.now_ms())
+
+    def mark(self, name):
+        """记录一个瞬时事件（如首次绘制完成）"""
+        now = self.now_ms()
+        self.record(name, now, now)
+
+    def get(self, name):
+        """返回阶段的 (开始, 结束)，不存在时返回None"""
+        with self._lock:
+            for phase, start, end in self.phases:
+                if phase == name:
+                    return start, end
+        return None
+
+    def format(self):
+        """生成可读的时间线文本"""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+        lines = [f"{'阶段':<20}{'开始(ms)':>10}{'耗时(ms)':>10}"]
+        for name, start, end in phases:
+            lines.append(f"{name:<20}{start:>10.1f}{end - start:>10.1f}")
+
+        painted = self.get("first_rows_painted")
+        if painted is not None and painted[1] > self.budget_ms:
+            lines.append(f"首次绘制超出预算 {self.budget_ms}ms")
+        return "\n".join(lines)
+
+
+@contextmanager
+def timeline_phase(timeline, name):
+    """timeline 可以为None的阶段记录"""
+    if timeline is None:
+        yield
+    else:
+        with timeline.phase(name):
+            yield
+
+
+# 计入 Tk 调用次数的 tkapp 方法
+_COUNTED_TK_METHODS = frozenset(
+    ("call", "eval", "setvar", "getvar", "globalsetvar", "globalgetvar")
+)
+
+
+class TkCallCounter:
+    """包装 tkapp 对象，统计经过它的 Tk 调用次数
+
+    在创建任何组件之前替换 root.tk，之后创建的组件和变量都会共享这个包装。
+    """
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.count = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._tkapp, name)
+        if name not in _COUNTED_TK_METHODS:
+            return attr
+
+        def counted(*args):
+            self.count += 1
+            return attr(*args)
+
+        return counted
+
+
+class HandlerStats:
+    """单个处理函数的统计"""
+
+    def __init__(self, name, max_samples):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.tk_calls = 0
+        self.samples = deque(maxlen=max_samples)
+        # 以2为底的微秒级直方图：桶 k 记录 [2^k, 2^(k+1)) 微秒的调用数
+        self.histogram = {}
+
+    def record(self, duration, tk_calls):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.tk_calls += tk_calls
+        self.samples.append(duration)
+        bucket = max(int(duration * 1e6), 1).bit_length() - 1
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        """最近样本的百分位耗时（秒）"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+            "tk_calls": self.tk_calls,
+            "tk_calls_per_call": self.tk_calls / self.count if self.count else 0,
+            "histogram_us": {
+                f"{1 << k}-{(1 << (k + 1)) - 1}": n
+                for k, n in sorted(self.histogram.items())
+            },
+        }
+
+
+class HandlerProfiler:
+    """事件处理函数的插桩记录，默认关闭，需显式启用"""
+
+    def __init__(self, max_samples=10000, max_events=100000):
+        self.origin = time.perf_counter()
+        self.max_samples = max_samples
+        self.counter = None
+        self.stats = {}
+        self.events = deque(maxlen=max_events)
+
+    def install(self, root):
+        """替换 root.tk 以统计 Tk 调用，必须在创建组件之前调用"""
+        self.counter = TkCallCounter(root.tk)
+        root.tk = self.counter
+
+    def wrap(self, name, func):
+        """返回记录耗时和 Tk 调用次数的包装函数"""
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats(name, self.max_samples)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            counter = self.counter
+            calls = counter.count if counter is not None else 0
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                tk_calls = counter.count - calls if counter is not None else 0
+                stats.record(end - start, tk_calls)
+                self.events.append(
+                    (name, start, end, tk_calls, threading.get_ident())
+                )
+
+        return wrapper
+
+    def instrument(self, obj, names):
+        """把对象上的一组方法替换为包装后的版本"""
+        for name in names:
+            setattr(obj, name, self.wrap(name, getattr(obj, name)))
+
+    def summary(self):
+        """返回 {处理函数: 统计字典}"""
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
+
+    def format(self):
+        """生成叠加层显示的统计文本"""
+        lines = [f"{'处理函数':<24}{'次数':>6}{'p50ms':>8}{'p99ms':>8}{'Tk/次':>7}"]
+        for name, stats in sorted(self.stats.items()):
+            tk_per_call = stats.tk_calls / stats.count if stats.count else 0
+            lines.append(
+                f"{name:<24}{stats.count:>6}"
+                f"{stats.percentile(0.5) * 1000:>8.2f}"
+                f"{stats.percentile(0.99) * 1000:>8.2f}"
+                f"{tk_per_call:>7.1f}"
+            )
+        if self.counter is not None:
+            lines.append(f"Tk 调用总数: {self.counter.count}")
+        return "\n".join(lines)
+
+    def trace_events(self, timeline=None):
+        """生成 Trace Event Format 的事件列表，时间单位为微秒"""
+        pid = os.getpid()
+        events = []
+        if timeline is not None:
+            offset = (timeline.origin - self.origin) * 1e6
+            for name, start, end in list(timeline.phases):
+                events.append(
+                    {
+                        "name": name,
+                        "cat": "startup",
+                        "ph": "X",
+                        "ts": offset + start * 1000,
+                        "dur": (end - start) * 1000,
+                        "pid": pid,
+                        "tid": 0,
+                    }
+                )
+        for name, start, end, tk_calls, tid in list(self.events):
+            events.append(
+                {
+                    "name": name,
+                    "cat": "handler",
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"tk_calls": tk_calls},
+                }
+            )
+        return events
+
+    def export(self, path, timeline=None):
+        """导出JSON：traceEvents 可直接载入 trace viewer，summary 为统计"""
+        data = {
+            "traceEvents": self.trace_events(timeline),
+            "displayTimeUnit": "ms",
+            "summary": self.summary(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
@@ -0,0 +1,362 @@
+"""读取存档中国家已有的公司、科技和地块
+
+支持文本格式的存档（调试模式下保存，或关闭存档压缩），可以是纯文本文件，
+也可以是 zip 格式（其中的 gamestate）。存档可能有几百MB，因此：
+
+- 纯文本存档通过 mmap 分段读取，zip 存档从压缩流中分段读取
+- BlockScanner 只跟踪花括号层级，不建立完整的语法树；只有路径匹配的块
+  （如 companies 下 database 中的每个公司）才被截取出来单独解析，
+  内存中最多只保留一个这样的块
+
+读取结果与 company.ini 对照后得到两组公司：国家已经建立的（界面中预先选中），
+以及科技或地块条件不满足、暂时无法建立的（界面中显示为灰色）：
+
+    python company_save.py autosave.v3 --game-dir ".../Victoria 3/game"
+    python company_save.py autosave.v3 --country GBR --localization loc/
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import zipfile
+from collections import namedtuple
+
+from company_import import (
+    DEFAULT_LANGUAGE,
+    block_get,
+    block_values,
+    expand_paths,
+    localize,
+    parse_script,
+    read_localization,
+    sub_block,
+)
+from company_eligibility import Conditions, EligibilityEngine
+
+# 每次读取的字节数
+CHUNK_SIZE = 1 << 20
+
+# zip 存档中保存游戏状态的文件
+GAMESTATE_MEMBER = "gamestate"
+
+# 取花括号前的键时最多向前查看的字节数
+KEY_LOOKBACK = 256
+
+# 需要截取的块，"*" 匹配任意键（如 database 中的ID）
+SAVE_BLOCKS = (
+    ("played_country",),
+    ("companies", "database", "*"),
+    ("company_manager", "database", "*"),
+    ("technology", "database", "*"),
+    ("states", "database", "*"),
+    ("country_manager", "database", "*"),
+)
+
+# 字符串和注释，其中的花括号不算层级
+_NOISE_RE = re.compile(rb'"(?:[^"\\\n]|\\.)*"|#[^\n]*')
+
+# 可能含有花括号的字符串或注释（可能误报，误报时只是多做一次替换）
+_NOISY_RE = re.compile(rb'"[^"\n]*[{}][^"\n]*"|#[^\n]*[{}]')
+
+_BRACE_RE = re.compile(rb"[{}]")
+
+# 花括号前的 `key =`
+_KEY_RE = re.compile(rb'([^\s{}=<>!?"#]+)\s*=\s*$')
+
+# 国家块中的国家标签
+_DEFINITION_RE = re.compile(rb'\bdefinition\s*=\s*"?([^\s"{}]+)')
+
+_OPEN = ord("{")
+
+# 存档中国家的状态：国家ID、标签，以及公司、科技、地块的脚本键
+SaveState = namedtuple(
+    "SaveState", ["country", "tag", "companies", "techs", "regions"]
+)
+
+# 与 company.ini 对照的结果，eligibility 是存档条件下的 EligibilityMask
+SaveMatch = namedtuple("SaveMatch", ["state", "owned", "unavailable", "eligibility"])
+
+
+def _path_matches(pattern, path):
+    return len(pattern) == len(path) and all(
+        part == "*" or part == key for part, key in zip(pattern, path)
+    )
+
+
+class BlockScanner:
+    """流式查找路径匹配的块
+
+    feed 接收以换行结尾的数据段，返回其中结束的 [(路径, 块内容)]；
+    块内容是花括号之间的原始字节，可以跨越多个数据段。
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        self.prefixes = {
+            pattern[:n] for pattern in self.patterns for n in range(1, len(pattern))
+        }
+        self.path = []
+        self.depth = 0
+        # 非0时处于被跳过或正在截取的块内，只计算层级
+        self.quiet = 0
+        self.parts = None
+
+    def _wanted(self, path):
+        """返回 (路径是否匹配, 是否可能在其中匹配)"""
+        if any(_path_matches(pattern, path) for pattern in self.patterns):
+            return True, False
+        return False, any(_path_matches(prefix, path) for prefix in self.prefixes)
+
+    def feed(self, data):
+        found = []
+        masked = _mask_noise(data)
+        pos = start = 0
+        while True:
+            if self.quiet:
+                end = self._skip(masked, pos)
+                if end is None:
+                    break
+                if self.parts is not None:
+                    self.parts.append(data[start:end])
+                    found.append((tuple(self.path), b"".join(self.parts)))
+                    self.parts = None
+                self.quiet = 0
+                self.path.pop()
+                self.depth -= 1
+                pos = end + 1
+                continue
+
+            match = _BRACE_RE.search(masked, pos)
+            if match is None:
+                break
+            pos = match.end()
+            if masked[match.start()] == _OPEN:
+                self.depth += 1
+                key = _KEY_RE.search(
+                    masked, max(0, match.start() - KEY_LOOKBACK), match.start()
+                )
+                self.path.append(key and key.group(1).decode("utf-8", "replace"))
+                matched, inside = self._wanted(tuple(self.path))
+                if matched:
+                    self.parts = []
+                    start = pos
+                if matched or not inside:
+                    self.quiet = self.depth
+            elif self.depth:
+                # 多余的右花括号直接忽略
+                self.path.pop()
+                self.depth -= 1
+        if self.parts is not None:
+            self.parts.append(data[start:])
+        return found
+
+    def _skip(self, masked, pos):
+        """在当前块内跳过，返回块结束的右花括号位置，本段内没有结束时返回None
+
+        从 pos 起逐个花括号计算层级，回到块外时立即停止，不扫描块之后的内容。
+        """
+        depth = self.depth
+        outside = self.quiet - 1
+        for match in _BRACE_RE.finditer(masked, pos):
+            if masked[match.start()] == _OPEN:
+                depth += 1
+                continue
+            depth -= 1
+            if depth == outside:
+                self.depth = self.quiet
+                return match.start()
+        self.depth = depth
+        return None
+
+
+def _mask_noise(data):
+    """把含有花括号的字符串和注释替换为等长的空格，其余位置不变"""
+    if _NOISY_RE.search(data) is None:
+        return data
+    return _NOISE_RE.sub(
+        lambda m: b" " * len(m.group()) if _BRACE_RE.search(m.group()) else m.group(),
+        data,
+    )
+
+
+def iter_save_chunks(path, chunk_size=CHUNK_SIZE):
+    """分段读取存档的文本内容，zip 存档读取其中的 gamestate"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            member = GAMESTATE_MEMBER if GAMESTATE_MEMBER in names else names[0]
+            with archive.open(member) as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    yield chunk
+        return
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in range(0, len(mm), chunk_size):
+                yield mm[offset : offset + chunk_size]
+
+
+def scan_save(chunks, patterns=SAVE_BLOCKS):
+    """逐个生成存档中路径匹配的 (路径, 块内容)"""
+    scanner = BlockScanner(patterns)
+    pending = b""
+    first = True
+    for chunk in chunks:
+        if first:
+            # 二进制存档（铁人模式或默认的压缩格式）中有大量 0 字节
+            if b"\x00" in chunk[:4096]:
+                raise ValueError("只支持文本格式的存档（调试模式下保存）")
+            first = False
+        data = pending + chunk
+        # 只处理到最后一个换行，键和值不会被截断在两段之间
+        cut = data.rfind(b"\n") + 1
+        if not cut:
+            pending = data
+            continue
+        pending = data[cut:]
+        yield from scanner.feed(data[:cut])
+    if pending:
+        yield from scanner.feed(pending)
+
+
+def _script_key(value):
+    """去掉 s:STATE_XXX 之类的作用域前缀"""
+    return value.split(":", 1)[1] if ":" in value else value
+
+
+def read_save(path, country=None, chunk_size=CHUNK_SIZE):
+    """读取存档，返回 SaveState
+
+    country 可以是国家标签或数字ID，省略时使用存档的玩家国家。
+    """
+    played = None
+    tags = {}
+    companies, techs, regions = {}, {}, {}
+    for block_path, body in scan_save(iter_save_chunks(path, chunk_size)):
+        section = block_path[0]
+        if section == "country_manager":
+            tag = _DEFINITION_RE.search(body)
+            if tag is not None:
+                tags[block_path[-1]] = tag.group(1).decode("utf-8", "replace")
+            continue
+        block = parse_script(body.decode("utf-8", "replace"))
+        owner = block_get(block, "country")
+        if section == "played_country":
+            played = owner
+        elif not isinstance(owner, str):
+            continue
+        elif section in ("companies", "company_manager"):
+            company_type = block_get(block, "company_type")
+            if isinstance(company_type, str):
+                companies.setdefault(owner, set()).add(company_type)
+        elif section == "technology":
+            acquired = block_values(sub_block(block, "acquired_technologies"))
+            techs.setdefault(owner, set()).update(acquired)
+        elif section == "states":
+            region = block_get(block, "region", block_get(block, "state_region"))
+            if isinstance(region, str):
+                regions.setdefault(owner, set()).add(_script_key(region))
+
+    if country is None:
+        country = played
+    elif country not in tags and not country.isdigit():
+        # 标签转为ID
+        country = next((cid for cid, tag in tags.items() if tag == country), None)
+    if not isinstance(country, str):
+        raise ValueError("存档中没有玩家国家，请指定国家标签")
+    return SaveState(
+        country,
+        tags.get(country),
+        companies.get(country, set()),
+        techs.get(country, set()),
+        regions.get(country, set()),
+    )
+
+
+def _localized_names(keys, localization):
+    return {localize(localization, key) for key in keys} | set(keys)
+
+
+def save_conditions(state, localization=None):
+    """把存档中的科技和地块转为建立条件
+
+    存档中是脚本键（STATE_BADEN），通过本地化表转为 company.ini 中的名称；
+    没有本地化表时按键本身比较。
+    """
+    table = localization or {}
+    return Conditions(
+        _localized_names(state.techs, table),
+        _localized_names(state.regions, table),
+        None,
+    )
+
+
+def match_save(company_data, state, localization=None, engine=None):
+    """把存档状态与公司数据对照，返回 SaveMatch"""
+    if engine is None:
+        engine = EligibilityEngine(company_data)
+    owned = _localized_names(state.companies, localization or {})
+    owned &= set(company_data)
+    eligibility = engine.mask(save_conditions(state, localization))
+    unavailable = set(eligibility.blocked()) - owned
+    return SaveMatch(state, owned, unavailable, eligibility)
+
+
+def load_localization(game_dir=None, paths=(), language=DEFAULT_LANGUAGE):
+    """读取游戏目录和额外给出的本地化文件"""
+    paths = list(paths)
+    if game_dir:
+        paths.append(os.path.join(game_dir, "localization", language))
+    return read_localization(expand_paths(paths, "*.yml"), language)
+
+
+def main(argv=None):
+    """命令行入口"""
+    from company_core import CompanyRepository
+    from company_data import DEFAULT_INI_PATH
+
+    parser = argparse.ArgumentParser(description="读取存档中国家已有的公司")
+    parser.add_argument("save", help="存档文件（文本格式，可以是 zip）")
+    parser.add_argument("--country", help="国家标签或ID，省略时使用玩家国家")
+    parser.add_argument("--game-dir", help="游戏的 game 目录，用于读取本地化")
+    parser.add_argument(
+        "--localization", action="append", default=[], help="本地化文件或目录"
+    )
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="本地化语言")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    args = parser.parse_args(argv)
+
+    state = read_save(args.save, args.country)
+    table = load_localization(args.game_dir, args.localization, args.language)
+    repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+    result = match_save(repo.company_data, state, table)
+    available = [
+        name
+        for name in repo.companies
+        if name not in result.owned and name not in result.unavailable
+    ]
+    json.dump(
+        {
+            "country": state.country,
+            "tag": state.tag,
+            "owned": sorted(result.owned),
+            "available": available,
+            "unavailable": sorted(result.unavailable),
+        },
+        sys.stdout,
+        ensure_ascii=False,
+        indent=2,
+    )
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,714 @@
+"""公司搜索索引与查询语言
+
+在读取数据时一次性建立倒排索引（单字 + 二元组），支持中文子串匹配。
+科技、建筑等字段的索引建立在名称表上，关键词不会跨越列表元素匹配。查询语法示例：
+
+    科技:苯胺 建筑:炼钢厂 -地块:西奈
+    (建筑:造船厂 OR 建筑:军用造船厂) NOT 名贵:精炼钢
+
+- 空格分隔的条件默认为 AND，也可显式写 AND / &
+- OR / | 表示或
+- NOT 或前缀 - 表示非（- 后紧跟数字时视为普通文字，如 -5%）
+- 字段:关键词 限定搜索字段，未限定时搜索全部字段
+- 双引号包裹的内容作为一个整体关键词
+"""
+
+import copy
+import queue
+import threading
+
+from company_model import FIELD_TABLES, TABLES, CompanyModel
+
+# 可搜索的字段，"名称" 对应公司名（ini 的 section 名）
+SEARCH_FIELDS = ("名称", "科技", "地块", "名贵", "建筑", "建筑_可选", "繁荣")
+
+# 字段别名
+FIELD_ALIASES = {
+    "公司": "名称",
+    "可选": "建筑_可选",
+    "可选建筑": "建筑_可选",
+}
+
+# 通过名称表索引的字段
+INDEXED_FIELDS = tuple(field for field in SEARCH_FIELDS if field != "名称")
+
+# 搜索全部字段时使用的内部键
+ALL_FIELDS = "*"
+
+
+def resolve_field(name, aliases=None):
+    """将字段名或别名解析为索引字段，无法识别时返回None
+
+    aliases 是当前语言的字段名 {小写的显示文字: 字段}（见 company_locale）。
+    """
+    if name in SEARCH_FIELDS:
+        return name
+    if aliases:
+        field = aliases.get(name.lower())
+        if field is not None:
+            return field
+    return FIELD_ALIASES.get(name)
+
+
+def _grams(text, n):
+    """返回文本中所有长度为n的片段"""
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class TextIndex:
+    """一组短文本的子串索引：小写文本、单字和二元组 → 文本ID集合
+
+    文本ID即文本在 texts 中的下标，删除的文本留下空串，ID不再复用。
+    """
+
+    def __init__(self):
+        self.texts = []
+        self.unigrams = {}
+        self.bigrams = {}
+
+    def to_state(self):
+        return {
+            "texts": self.texts,
+            "unigrams": self.unigrams,
+            "bigrams": self.bigrams,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls()
+        index.texts = state["texts"]
+        index.unigrams = state["unigrams"]
+        index.bigrams = state["bigrams"]
+        return index
+
+    def add(self, text):
+        """登记一段文本的单字与二元组，返回其ID"""
+        tid = len(self.texts)
+        text = text.lower()
+        self.texts.append(text)
+        unigrams = self.unigrams
+        for gram in set(text):
+            unigrams.setdefault(gram, set()).add(tid)
+        bigrams = self.bigrams
+        for gram in _grams(text, 2):
+            bigrams.setdefault(gram, set()).add(tid)
+        return tid
+
+    def sync(self, names):
+        """登记名称表中新增的名称，使文本ID与名称ID一致"""
+        for vid in range(len(self.texts), len(names)):
+            self.add(names[vid])
+
+    def discard(self, tid):
+        """删除一段文本"""
+        text = self.texts[tid]
+        self.texts[tid] = ""
+        self._discard_grams(self.unigrams, set(text), tid)
+        self._discard_grams(self.bigrams, _grams(text, 2), tid)
+
+    @staticmethod
+    def _discard_grams(postings, grams, tid):
+        """从倒排表中移除一个ID，空的倒排表一并删除"""
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is not None:
+                posting.discard(tid)
+                if not posting:
+                    del postings[gram]
+
+    def match(self, term):
+        """返回包含关键词（小写、非空）的文本ID集合"""
+        if len(term) == 1:
+            return set(self.unigrams.get(term, ()))
+
+        # 取所有二元组的倒排表，从最短的开始求交集
+        postings = []
+        bigrams = self.bigrams
+        for gram in _grams(term, 2):
+            posting = bigrams.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                return result
+
+        # 二元组全部命中不代表连续出现，长关键词需要再核对一次
+        if len(term) > 2:
+            texts = self.texts
+            result = {tid for tid in result if term in texts[tid]}
+        return result
+
+
+class SearchIndex:
+    """公司搜索索引
+
+    公司以整数ID表示，ID即公司在 names 中的下标。删除的公司在 names 中
+    留下None，其ID不再复用。
+
+    公司名逐个建立子串索引；其余字段的值都是名称表中的ID，子串索引只建立在
+    名称表上（每个建筑名只索引一次），再通过 postings（名称ID → 公司ID集合）
+    找到公司。
+
+    localized 返回按某个语言的显示文字匹配的索引，只重建公司名和名称表的
+    子串索引，公司ID、各字段的名称ID和 postings 与本索引共用；本索引原地
+    更新后，对它调用 sync_locale 补上变化的部分。
+    """
+
+    # 显示语言（company_locale.Locale），None 表示直接使用内部ID
+    locale = None
+    # 当前语言的字段名，None 表示只接受 company.ini 中的字段名
+    field_aliases = None
+
+    def __init__(self, model=None):
+        self.model = model if model is not None else CompanyModel()
+        self.names = []
+        self.ids = {}
+        self.all_ids = set()
+        self.name_index = TextIndex()
+        self.vocab = {table: TextIndex() for table in TABLES}
+        # 每个公司各字段的名称ID，以及 名称ID → 公司ID集合
+        self.values = {field: [] for field in INDEXED_FIELDS}
+        self.postings = {field: {} for field in INDEXED_FIELDS}
+
+        for name in sorted(self.model):
+            self.add(name, self.model.record(name))
+
+    def to_state(self):
+        """导出可被 marshal 序列化的索引内容"""
+        return {
+            "names": self.names,
+            "name_index": self.name_index.to_state(),
+            "vocab": {table: index.to_state() for table, index in self.vocab.items()},
+            "values": self.values,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_state(cls, state, model):
+        """从 to_state 导出的内容恢复索引，不重新计算"""
+        index = cls()
+        index.model = model
+        index.names = state["names"]
+        index.ids = {
+            name: cid for cid, name in enumerate(index.names) if name is not None
+        }
+        index.all_ids = set(index.ids.values())
+        index.name_index = TextIndex.from_state(state["name_index"])
+        index.vocab = {
+            table: TextIndex.from_state(vocab)
+            for table, vocab in state["vocab"].items()
+        }
+        index.values = state["values"]
+        index.postings = state["postings"]
+        return index
+
+    def __len__(self):
+        return len(self.all_ids)
+
+    def localized(self, locale):
+        """返回按 locale（company_locale.Locale）的显示文字匹配的索引"""
+        index = copy.copy(self)
+        index.locale = locale
+        index.name_index = TextIndex()
+        index.vocab = {table: TextIndex() for table in TABLES}
+        index.field_aliases = locale.field_aliases()
+        index.sync_locale()
+        return index
+
+    def sync_locale(self):
+        """按显示语言登记新增的公司和名称，删除已删除的公司
+
+        公司ID和名称ID只追加，新增的部分总在末尾。
+        """
+        locale = self.locale
+        names = self.names
+        name_index = self.name_index
+        texts = name_index.texts
+        for cid in range(len(texts)):
+            if texts[cid] and names[cid] is None:
+                name_index.discard(cid)
+        for cid in range(len(texts), len(names)):
+            name = names[cid]
+            name_index.add("" if name is None else locale.text("companies", name))
+        for table, vocab in self.vocab.items():
+            values = self.model.tables[table].names
+            for vid in range(len(vocab.texts), len(values)):
+                vocab.add(locale.text(table, values[vid]))
+
+    def add(self, name, record):
+        """添加一个公司记录到索引，返回其ID"""
+        cid = len(self.names)
+        self.names.append(name)
+        self.ids[name] = cid
+        self.all_ids.add(cid)
+        self.name_index.add(name)
+
+        for field in INDEXED_FIELDS:
+            vids = tuple(record.value_ids(field))
+            self.values[field].append(vids)
+            postings = self.postings[field]
+            for vid in vids:
+                postings.setdefault(vid, set()).add(cid)
+        for table, vocab in self.vocab.items():
+            vocab.sync(self.model.tables[table].names)
+        return cid
+
+    def remove(self, name):
+        """从索引中删除一个公司，返回其原ID，不存在时返回None"""
+        cid = self.ids.pop(name, None)
+        if cid is None:
+            return None
+        self.names[cid] = None
+        self.all_ids.discard(cid)
+        self.name_index.discard(cid)
+
+        for field in INDEXED_FIELDS:
+            values = self.values[field]
+            postings = self.postings[field]
+            for vid in values[cid]:
+                posting = postings.get(vid)
+                if posting is not None:
+                    posting.discard(cid)
+                    if not posting:
+                        del postings[vid]
+            values[cid] = ()
+        return cid
+
+    def update(self, name, record):
+        """重新索引一个公司（新增或修改），返回其新ID"""
+        self.remove(name)
+        return self.add(name, record)
+
+    def _match_values(self, field, term):
+        """返回字段中包含关键词的名称ID集合"""
+        return self.vocab[FIELD_TABLES[field]].match(term)
+
+    def match_term(self, field, term):
+        """返回指定字段包含关键词的公司ID集合"""
+        term = term.lower()
+        if not term:
+            return set(self.all_ids)
+
+        if field == ALL_FIELDS:
+            result = set()
+            for name in SEARCH_FIELDS:
+                result |= self.match_term(name, term)
+            return result
+
+        if field == "名称":
+            return self.name_index.match(term)
+
+        postings = self.postings[field]
+        result = set()
+        for vid in self._match_values(field, term):
+            posting = postings.get(vid)
+            if posting:
+                result |= posting
+        return result
+
+    def search(self, query):
+        """执行查询，返回匹配的公司ID集合"""
+        node = parse_query(query, self.field_aliases)
+        if node is None:
+            return set(self.all_ids)
+        return self._evaluate(node)
+
+    def search_names(self, query):
+        """执行查询，返回按名称排序的公司名列表"""
+        return sorted(self.names[cid] for cid in self.search(query))
+
+    def refine(self, previous_ids, previous_query, query):
+        """新查询只是收窄旧查询时，在旧结果中筛选
+
+        仅当两个查询都是肯定条件的合取，并且旧查询的每个关键词都被新查询中
+        同字段的某个关键词包含时才能收窄，否则返回None。
+        """
+        aliases = self.field_aliases
+        old_terms = _conjunctive_terms(parse_query(previous_query, aliases))
+        new_terms = _conjunctive_terms(parse_query(query, aliases))
+        if not old_terms or new_terms is None:
+            return None
+
+        new_terms = [(field, text.lower()) for field, text in new_terms]
+        for field, text in old_terms:
+            text = text.lower()
+            if not any(f == field and text in t for f, t in new_terms):
+                return None
+
+        # 每个关键词对应若干候选检查，公司满足其中之一即可：
+        # 公司名直接核对文本，其余字段核对名称ID是否命中
+        checks = []
+        for field, text in new_terms:
+            fields = SEARCH_FIELDS if field == ALL_FIELDS else (field,)
+            names, alternatives = None, []
+            for name in fields:
+                if name == "名称":
+                    names = self.name_index.texts
+                else:
+                    matched = self._match_values(name, text)
+                    if matched:
+                        alternatives.append((self.values[name], matched))
+            checks.append((names, text, alternatives))
+        return {cid for cid in previous_ids if self._passes(cid, checks)}
+
+    @staticmethod
+    def _passes(cid, checks):
+        for names, text, alternatives in checks:
+            if names is not None and text in names[cid]:
+                continue
+            if not any(
+                not matched.isdisjoint(values[cid]) for values, matched in alternatives
+            ):
+                return False
+        return True
+
+    def _evaluate(self, node):
+        """递归求值查询语法树"""
+        kind = node[0]
+        if kind == "term":
+            return self.match_term(node[1], node[2])
+
+        if kind == "not":
+            return self.all_ids - self._evaluate(node[1])
+
+        if kind == "or":
+            result = set()
+            for child in node[1]:
+                result |= self._evaluate(child)
+            return result
+
+        # AND：先对肯定条件求交集，再减去否定条件，避免对全集取补
+        positives = [c for c in node[1] if c[0] != "not"]
+        negatives = [c[1] for c in node[1] if c[0] == "not"]
+
+        if positives:
+            sets = sorted((self._evaluate(c) for c in positives), key=len)
+            result = sets[0]
+            for other in sets[1:]:
+                if not result:
+                    break
+                result &= other
+        else:
+            result = set(self.all_ids)
+
+        for child in negatives:
+            if not result:
+                break
+            result -= self._evaluate(child)
+        return result
+
+
+def _conjunctive_terms(node):
+    """若语法树只由肯定关键词的 AND 组成，返回 [(字段, 文本)]，否则返回None"""
+    if node is None:
+        return []
+    if node[0] == "term":
+        return [(node[1], node[2])]
+    if node[0] == "and" and all(child[0] == "term" for child in node[1]):
+        return [(child[1], child[2]) for child in node[1]]
+    return None
+
+
+# ---------------------------------------------------------------------------
+# 后台搜索调度
+# ---------------------------------------------------------------------------
+
+# 输入停顿多久后才开始搜索（毫秒）
+DEBOUNCE_MS = 150
+
+# 等待后台结果时轮询的间隔（毫秒）
+POLL_MS = 15
+
+
+class SearchScheduler:
+    """防抖、可取消的后台搜索
+
+    - 输入时通过 root.after 防抖，只有停顿后的查询才会被提交
+    - 查询在后台线程执行，不阻塞Tk线程
+    - 每次提交递增代数，过期的查询和结果直接丢弃
+    - 新查询只是在上一次查询后继续输入时，直接在上一次的结果中收窄
+
+    Tk不是线程安全的，后台线程只把结果放进队列，由Tk线程轮询取出后
+    调用 on_result(查询, 排序后的公司名列表)。
+    """
+
+    def __init__(self, root, index, on_result, delay=DEBOUNCE_MS):
+        self.root = root
+        self.index = index
+        self.on_result = on_result
+        self.delay = delay
+
+        self.generation = 0
+        self._after_id = None
+        self._poll_id = None
+        self._dispatched = 0
+
+        # 后台线程计算期间持有此锁，修改索引的一方也需先取得它
+        self.lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._request = None
+        self._results = queue.Queue()
+        self._last = None
+        self._index_version = 0
+        self._thread = None
+        self._closed = False
+
+    def set_index(self, index):
+        """更换（或原地修改了）搜索索引，旧的结果不能再用于收窄"""
+        self.cancel()
+        with self._condition:
+            self.index = index
+            self._index_version += 1
+            self._last = None
+
+    def submit(self, query):
+        """提交一个查询，在防抖延迟后进入后台执行"""
+        self.generation += 1
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(
+            self.delay, self._dispatch, self.generation, query
+        )
+
+    def cancel(self):
+        """取消所有尚未应用的查询"""
+        self.generation += 1
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def close(self):
+        """停止后台线程"""
+        self.cancel()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _dispatch(self, generation, query):
+        """防抖结束，把查询交给后台线程"""
+        self._after_id = None
+        if generation != self.generation:
+            return
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+        self._dispatched = generation
+        with self._condition:
+            # 只保留最新的请求，未开始的旧请求被覆盖
+            self._request = (generation, query)
+            self._condition.notify()
+
+        if self._poll_id is None:
+            self._poll_id = self.root.after(POLL_MS, self._poll)
+
+    def _worker(self):
+        """后台线程：取最新的请求并计算结果"""
+        while True:
+            with self._condition:
+                while self._request is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                generation, query = self._request
+                self._request = None
+                index = self.index
+                version = self._index_version
+                last = self._last
+
+            if generation != self.generation:
+                continue
+
+            with self.lock:
+                ids = None
+                if last is not None and last[0] == version:
+                    ids = index.refine(last[2], last[1], query)
+                if ids is None:
+                    ids = index.search(query)
+                names = sorted(index.names[cid] for cid in ids)
+
+            with self._condition:
+                if self._index_version == version:
+                    self._last = (version, query, ids)
+
+            if generation != self.generation:
+                continue
+            self._results.put((generation, query, names))
+
+    def _poll(self):
+        """Tk线程：取出后台结果，只应用最新一代的结果"""
+        self._poll_id = None
+        latest = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if result[0] == self.generation:
+                latest = result
+
+        if latest is not None:
+            self.on_result(latest[1], latest[2])
+            return
+
+        # 当前代的查询仍在后台执行时继续轮询
+        if self._dispatched == self.generation:
+            self._poll_id = self.root.after(POLL_MS, self._poll)
+
+
+# ---------------------------------------------------------------------------
+# 查询解析
+# ---------------------------------------------------------------------------
+
+_OPERATORS = {"OR": "or", "|": "or", "AND": "and", "&": "and", "NOT": "not"}
+
+
+def tokenize(query, aliases=None):
+    """将查询字符串切分为记号列表
+
+    记号为 ("(",) (")",) ("or",) ("and",) ("not",) 或 ("term", 字段, 文本)
+    """
+    tokens = []
+    i = 0
+    length = len(query)
+    while i < length:
+        ch = query[i]
+        if ch.isspace():
+            i += 1
+            continue
+        if ch in "()|&":
+            tokens.append((_OPERATORS.get(ch, ch),))
+            i += 1
+            continue
+        # 前缀 - 表示非，但 -5% 这样的数字修正保留为普通文字
+        if ch == "-" and not (i + 1 < length and query[i + 1].isdigit()):
+            tokens.append(("not",))
+            i += 1
+            continue
+
+        # 读取一个词，允许 字段:"带 空格的 内容"
+        start = i
+        word = []
+        while i < length and not query[i].isspace() and query[i] not in "()|&":
+            if query[i] == '"':
+                end = query.find('"', i + 1)
+                if end == -1:
+                    end = length
+                word.append(query[i + 1 : end])
+                i = end + 1
+                continue
+            word.append(query[i])
+            i += 1
+        text = "".join(word)
+        raw = query[start:i]
+
+        if raw in _OPERATORS:
+            tokens.append((_OPERATORS[raw],))
+            continue
+
+        field = ALL_FIELDS
+        # 同时接受半角与全角冒号，方便中文输入法
+        for colon in (":", "："):
+            head, sep, tail = text.partition(colon)
+            if sep and not raw.startswith('"'):
+                resolved = resolve_field(head, aliases)
+                if resolved is not None:
+                    field, text = resolved, tail
+                    break
+        tokens.append(("term", field, text))
+    return tokens
+
+
+def parse_query(query, aliases=None):
+    """解析查询字符串为语法树，空查询返回None
+
+    解析是宽松的：输入过程中出现的未闭合括号、悬空运算符会被忽略。
+    aliases 是当前语言的字段名，见 resolve_field。
+    """
+    parser = _Parser(tokenize(query, aliases))
+    return parser.parse()
+
+
+class _Parser:
+    """递归下降解析器，优先级 NOT > AND > OR"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][0]
+        return None
+
+    def parse(self):
+        node = self.parse_or()
+        # 多余的右括号直接跳过
+        while self.pos < len(self.tokens):
+            self.pos += 1
+            rest = self.parse_or()
+            if rest is not None:
+                node = rest if node is None else ("and", [node, rest])
+        return node
+
+    def parse_or(self):
+        children = []
+        node = self.parse_and()
+        if node is not None:
+            children.append(node)
+        while self.peek() == "or":
+            self.pos += 1
+            node = self.parse_and()
+            if node is not None:
+                children.append(node)
+        if not children:
+            return None
+        if len(children) == 1:
+            return children[0]
+        return ("or", children)
+
+    def parse_and(self):
+        children = []
+        while True:
+            kind = self.peek()
+            if kind == "and":
+                self.pos += 1
+                continue
+            if kind is None or kind in ("or", ")"):
+                break
+            node = self.parse_unary()
+            if node is not None:
+                children.append(node)
+        if not children:
+            return None
+        if len(children) == 1:
+            return children[0]
+        return ("and", children)
+
+    def parse_unary(self):
+        kind = self.peek()
+        if kind == "not":
+            self.pos += 1
+            node = self.parse_unary()
+            return None if node is None else ("not", node)
+        if kind == "(":
+            self.pos += 1
+            node = self.parse_or()
+            if self.peek() == ")":
+                self.pos += 1
+            return node
+        if kind == "term":
+            token = self.tokens[self.pos]
+            self.pos += 1
+            if not token[2]:
+                return None
+            return token
+        # 运算符出现在不该出现的位置，跳过
+        self.pos += 1
+        return None
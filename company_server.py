@@ -0,0 +1,350 @@
+"""本地 HTTP JSON 查询服务
+
+让叠加层、聊天机器人等外部程序无需通过界面就能使用公司数据：
+
+    python company_server.py --port 8765
+
+    GET  /search?q=科技:苯胺          搜索，返回公司名列表
+    GET  /company?name=巴斯夫         单个公司的信息（也可以是 /company/巴斯夫）
+    POST /aggregate                   汇总：{"companies": [...]} 或 {"query": "..."}
+    POST /query                       任意 company_cli 请求，如 {"op": "optimize", ...}
+    GET  /health                      数据版本和公司数量
+
+只使用标准库（asyncio）。数据只在启动时读取一次并常驻内存，修改数据文件后
+按公司增量热重载。查询和汇总结果按规范化后的请求缓存在 LRU 中，缓存的是编码
+好的响应正文；ETag 由数据集标识和版本号组成，客户端带 If-None-Match 时
+数据未变化即返回 304。所有查询都在事件循环线程中执行，热重载也在同一线程
+应用，不需要加锁；只有耗时的组合优化放到线程池中。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from company_cli import handle_request
+from company_core import CompanyRepository
+from company_data import DEFAULT_INI_PATH
+from company_watch import FileWatcher
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 缓存的响应数
+DEFAULT_CACHE_SIZE = 512
+
+# 请求正文的大小上限（字节）
+MAX_BODY_SIZE = 1 << 20
+
+# 检查数据文件是否被修改的间隔（秒）
+WATCH_INTERVAL = 1.0
+
+# 在线程池中执行的耗时操作：组合优化、公司关系（第一次请求时建立矩阵）、
+# 建立条件（含科技收益排序）和方案对比，避免阻塞事件循环中的其他连接
+BACKGROUND_OPS = ("optimize", "synergy", "eligible", "compare")
+
+
+class HTTPError(Exception):
+    """以指定状态码返回的错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """按规范化请求缓存响应正文的 LRU，数据版本变化时整体失效"""
+
+    def __init__(self, size=DEFAULT_CACHE_SIZE):
+        self.size = size
+        self.version = None
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, version, key):
+        if version != self.version:
+            self.entries.clear()
+            self.version = version
+        body = self.entries.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        self.entries[key] = body
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+def normalize_query(text):
+    """合并多余的空白，等价的查询使用同一个缓存项"""
+    return " ".join(str(text).split())
+
+
+def request_key(request):
+    """把一个 company_cli 请求规范化为缓存键（忽略 id）"""
+    request = {key: value for key, value in request.items() if key != "id"}
+    if request.get("op", "search") == "search":
+        request["query"] = normalize_query(request.get("query", ""))
+    companies = request.get("companies")
+    if isinstance(companies, list):
+        request["companies"] = sorted(set(map(str, companies)))
+    return json.dumps(request, ensure_ascii=False, sort_keys=True)
+
+
+def encode_json(data):
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+class QueryServer:
+    """把 HTTP 请求转为 company_cli 的请求，缓存结果并处理热重载"""
+
+    def __init__(self, repo, cache_size=DEFAULT_CACHE_SIZE, watch=True):
+        self.repo = repo
+        self.cache = ResponseCache(cache_size)
+        # 数据集标识：重启后即使版本号相同，旧的 ETag 也不会被误认
+        self.dataset_id = f"{os.getpid():x}{int(time.time()):x}"
+        self.watcher = FileWatcher(*repo.watch_paths()) if watch else None
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        # 正在线程池中执行的请求数，此时推迟应用热重载
+        self.running = 0
+
+    @property
+    def etag(self):
+        return f'"{self.dataset_id}-{self.repo.version}"'
+
+    # 路由
+
+    def route(self, method, path, query, body):
+        """把HTTP请求转为 company_cli 请求"""
+        if path == "/search" and method == "GET":
+            return {"op": "search", "query": query.get("q", [""])[0]}
+        if path.startswith("/company") and method == "GET":
+            name = path[len("/company/") :] if path.startswith("/company/") else ""
+            name = name or query.get("name", [""])[0]
+            return {"op": "company", "name": name}
+        if path == "/aggregate" and method == "POST":
+            request = self._json_body(body)
+            request["op"] = "aggregate"
+            return request
+        if path == "/query" and method == "POST":
+            return self._json_body(body)
+        if path in ("/search", "/company", "/aggregate", "/query"):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"不支持的方法: {method}")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"未知的路径: {path}")
+
+    @staticmethod
+    def _json_body(body):
+        try:
+            request = json.loads(body or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"请求正文不是JSON: {e}")
+        if not isinstance(request, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "请求正文必须是JSON对象")
+        return request
+
+    async def respond(self, method, target, headers, body):
+        """处理一个请求，返回 (状态码, 额外的响应头, 正文)"""
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/") or "/"
+        if path == "/health":
+            return (
+                HTTPStatus.OK,
+                {},
+                encode_json(
+                    {
+                        "version": self.repo.version,
+                        "companies": len(self.repo),
+                        "cache": {"hits": self.cache.hits, "misses": self.cache.misses},
+                    }
+                ),
+            )
+
+        request = self.route(method, path, parse_qs(url.query), body)
+        etag = self.etag
+        if headers.get("if-none-match") == etag:
+            return HTTPStatus.NOT_MODIFIED, {"ETag": etag}, b""
+
+        version = self.repo.version
+        key = request_key(request)
+        cached = self.cache.get(version, key)
+        if cached is None:
+            cached = await self._execute(request)
+            # 执行期间数据可能已被热重载，只缓存与当前版本一致的结果
+            if self.repo.version == version:
+                self.cache.put(key, cached)
+        return HTTPStatus.OK, {"ETag": etag}, cached
+
+    async def _execute(self, request):
+        try:
+            if request.get("op") in BACKGROUND_OPS:
+                self.running += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(
+                        self.executor, handle_request, self.repo, request
+                    )
+                finally:
+                    self.running -= 1
+            else:
+                result = handle_request(self.repo, request)
+        except KeyError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"缺少或无效的字段: {e.args[0]}")
+        except (TypeError, ValueError) as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            print(f"处理请求出错: {request!r}: {e!r}", flush=True)
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "服务器内部错误")
+        return encode_json(result)
+
+    # HTTP
+
+    async def handle_client(self, reader, writer):
+        """处理一个连接，支持 keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, {}, b"", False)
+                    break
+                headers = await self._read_headers(reader)
+                keep_alive = self._keep_alive(version, headers)
+                length = headers.get("content-length", "0")
+                length = int(length) if length.isdigit() else 0
+                if length > MAX_BODY_SIZE:
+                    error = {"error": "请求正文过大"}
+                    status = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                    await self._send(writer, status, {}, encode_json(error), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, extra, payload = await self.respond(
+                        method.upper(), target, headers, body
+                    )
+                except HTTPError as e:
+                    status, extra = e.status, {}
+                    payload = encode_json({"error": str(e)})
+                except Exception as e:
+                    # 不让单个请求的错误断开连接而没有响应
+                    print(f"处理 {method} {target} 出错: {e!r}", flush=True)
+                    status, extra = HTTPStatus.INTERNAL_SERVER_ERROR, {}
+                    payload = encode_json({"error": "服务器内部错误"})
+                await self._send(writer, status, extra, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_headers(reader):
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line or line in (b"\r\n", b"\n"):
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    @staticmethod
+    def _keep_alive(version, headers):
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    @staticmethod
+    async def _send(writer, status, extra, payload, keep_alive):
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Length": str(len(payload)),
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive" if keep_alive else "close",
+            **extra,
+        }
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    # 热重载
+
+    async def watch(self, interval=WATCH_INTERVAL):
+        """定时检查数据文件，在线程池中解析变化，回到事件循环线程应用"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if self.running or not self.watcher.changed():
+                continue
+            try:
+                patch = await loop.run_in_executor(
+                    self.executor, self.repo.check_changes
+                )
+            except Exception as e:
+                print(f"重新读取文件出错: {e}", flush=True)
+                continue
+            # 等待线程池中的请求结束，它们可能正在读取数据
+            while self.running:
+                await asyncio.sleep(interval / 10)
+            paths = self.repo.watch_paths()
+            if list(self.watcher.paths) != paths:
+                self.watcher = FileWatcher(*paths)
+            if patch is not None:
+                diff = self.repo.apply_patch(patch)
+                print(
+                    f"已重新加载：新增 {len(diff.added)}，修改 {len(diff.modified)}，"
+                    f"删除 {len(diff.removed)}",
+                    flush=True,
+                )
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """启动服务并一直运行"""
+        server = await asyncio.start_server(self.handle_client, host, port)
+        if self.watcher is not None:
+            asyncio.get_running_loop().create_task(self.watch())
+        address = server.sockets[0].getsockname()
+        print(f"公司数据服务: http://{address[0]}:{address[1]}/", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="公司数据本地HTTP查询服务")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="缓存的响应数"
+    )
+    parser.add_argument("--no-watch", action="store_true", help="不监视数据文件")
+    args = parser.parse_args(argv)
+
+    repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+    server = QueryServer(repo, args.cache_size, watch=not args.no_watch)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
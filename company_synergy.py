@@ -0,0 +1,287 @@
+"""公司之间的建筑重叠与互补
+
+每个公司的建筑（建筑 ∪ 建筑_可选）编码为以建筑ID为位的整数位集；
+反过来，每种建筑也有一个以公司下标为位的位集（哪些公司用到它）。
+
+某个公司与所有其他公司的共享建筑数，是把它每种建筑的“公司位集”用
+位切片加法（每一位平面是一个大整数）累加起来得到的，Python 层面的循环
+只与该公司的建筑数有关，与公司总数无关。行按需计算并缓存，
+导出全部公司时逐行生成，不需要在内存中保存完整的 n×n 矩阵。
+
+- shared：两个公司共同涉及的建筑种数
+- jaccard：shared / 两者建筑种类的并集大小
+- fills：A 的基础建筑正是 B 的某个可选建筑（A 可以填补 B 的可选槽位）
+
+也可以在命令行中导出：
+
+    python company_synergy.py --format csv --output synergy.csv
+    python company_synergy.py --company 巴斯夫 --top 10
+"""
+
+import argparse
+import csv
+import json
+import sys
+from collections import namedtuple
+
+# 一对公司之间的关系
+Pair = namedtuple(
+    "Pair", ["other", "shared", "jaccard", "buildings", "fills", "filled_by"]
+)
+
+# 缓存的行数
+ROW_CACHE_SIZE = 256
+
+# 导出的列
+EXPORT_FIELDS = (
+    "company",
+    "other",
+    "shared",
+    "jaccard",
+    "buildings",
+    "fills",
+    "filled_by",
+)
+
+
+def iter_bits(bits):
+    """按从低到高的顺序生成位集中为1的位的下标"""
+    text = bin(bits)[:1:-1]
+    index = text.find("1")
+    while index != -1:
+        yield index
+        index = text.find("1", index + 1)
+
+
+def count_bits(bitsets):
+    """对多个位集做位切片加法，返回 {下标: 出现次数}
+
+    planes[k] 是计数的第 k 个二进制位，每个位集的加法只需要几次大整数运算。
+    """
+    planes = []
+    for carry in bitsets:
+        k = 0
+        while carry:
+            if k == len(planes):
+                planes.append(carry)
+                break
+            plane = planes[k]
+            planes[k] = plane ^ carry
+            carry &= plane
+            k += 1
+
+    counts = {}
+    for k, plane in enumerate(planes):
+        weight = 1 << k
+        for index in iter_bits(plane):
+            counts[index] = counts.get(index, 0) + weight
+    return counts
+
+
+class SynergyMatrix:
+    """按需计算的公司两两重叠矩阵，company_data 是 CompanyModel"""
+
+    def __init__(self, company_data):
+        self.company_data = company_data
+        self.companies = sorted(company_data)
+        self.index = {name: i for i, name in enumerate(self.companies)}
+        self.building_names = company_data.tables["buildings"].names
+
+        # 公司 → 建筑位集
+        self.base = []
+        self.optional = []
+        # 建筑 → 公司位集
+        self.users = {}
+        self.base_users = {}
+        self.optional_users = {}
+        for i, name in enumerate(self.companies):
+            record = company_data.record(name)
+            base = self._mask(record.value_ids("建筑"), self.base_users, i)
+            optional = self._mask(
+                record.value_ids("建筑_可选"), self.optional_users, i
+            )
+            for vid in iter_bits(base | optional):
+                self.users[vid] = self.users.get(vid, 0) | 1 << i
+            self.base.append(base)
+            self.optional.append(optional)
+        self.sizes = [(b | o).bit_count() for b, o in zip(self.base, self.optional)]
+        self._rows = {}
+        self._building_lists = {}
+
+    @staticmethod
+    def _mask(vids, users, i):
+        mask = 0
+        for vid in vids:
+            mask |= 1 << vid
+            users[vid] = users.get(vid, 0) | 1 << i
+        return mask
+
+    def __len__(self):
+        return len(self.companies)
+
+    def buildings(self, i):
+        """公司涉及的建筑位集"""
+        return self.base[i] | self.optional[i]
+
+    def building_list(self, mask):
+        """把建筑位集还原为名称列表，不同的组合很少，结果会被复用"""
+        names = self._building_lists.get(mask)
+        if names is None:
+            names = [self.building_names[vid] for vid in iter_bits(mask)]
+            self._building_lists[mask] = names
+        return names
+
+    def fillers(self, i):
+        """基础建筑能填补公司 i 可选槽位的公司位集"""
+        mask = 0
+        for vid in iter_bits(self.optional[i]):
+            mask |= self.base_users.get(vid, 0)
+        return mask & ~(1 << i)
+
+    def filled(self, i):
+        """公司 i 的基础建筑能填补其可选槽位的公司位集"""
+        mask = 0
+        for vid in iter_bits(self.base[i]):
+            mask |= self.optional_users.get(vid, 0)
+        return mask & ~(1 << i)
+
+    def row(self, company):
+        """返回与公司有关系的其他公司 [Pair]，按共享数和相似度降序"""
+        i = self.index[company]
+        pairs = self._rows.get(i)
+        if pairs is not None:
+            return pairs
+
+        mine = self.buildings(i)
+        counts = count_bits(self.users[vid] for vid in iter_bits(mine))
+        counts.pop(i, None)
+        fills, filled_by = self.filled(i), self.fillers(i)
+        for j in iter_bits(fills | filled_by):
+            counts.setdefault(j, 0)
+
+        fills, filled_by = set(iter_bits(fills)), set(iter_bits(filled_by))
+        pairs = []
+        size, sizes = self.sizes[i], self.sizes
+        base, optional, companies = self.base, self.optional, self.companies
+        for j, shared in counts.items():
+            union = size + sizes[j] - shared
+            pairs.append(
+                Pair(
+                    companies[j],
+                    shared,
+                    shared / union if union else 0.0,
+                    self.building_list(mine & (base[j] | optional[j])),
+                    j in fills,
+                    j in filled_by,
+                )
+            )
+        pairs.sort(key=lambda p: (-p.shared, -p.jaccard, p.other))
+
+        if len(self._rows) >= ROW_CACHE_SIZE:
+            self._rows.pop(next(iter(self._rows)))
+        self._rows[i] = pairs
+        return pairs
+
+    def pair(self, a, b):
+        """返回两个公司之间的 Pair，没有任何关系时 shared 为0"""
+        for pair in self.row(a):
+            if pair.other == b:
+                return pair
+        return Pair(b, 0, 0.0, [], False, False)
+
+    def iter_pairs(self, min_shared=1, companies=None):
+        """逐个生成 (公司, Pair)；每对公司只出现一次
+
+        传入 companies 时只生成至少一方在其中的关系。
+        """
+        names = self.companies if companies is None else sorted(companies)
+        requested = None if companies is None else set(companies)
+        for name in names:
+            i = self.index[name]
+            for pair in self.row(name):
+                # 对方也会作为 name 出现时，只在排序靠前的一方生成
+                if self.index[pair.other] <= i and (
+                    requested is None or pair.other in requested
+                ):
+                    continue
+                if pair.shared >= min_shared or pair.fills or pair.filled_by:
+                    yield name, pair
+
+
+def pair_to_dict(company, pair):
+    """把一对公司的关系转为可写入JSON的字典"""
+    return {
+        "company": company,
+        "other": pair.other,
+        "shared": pair.shared,
+        "jaccard": round(pair.jaccard, 4),
+        "buildings": pair.buildings,
+        "fills": pair.fills,
+        "filled_by": pair.filled_by,
+    }
+
+
+def export(pairs, output, fmt="csv"):
+    """把 (公司, Pair) 流式写出为 CSV 或 JSON Lines，返回写出的行数"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_FIELDS)
+        for company, pair in pairs:
+            row = pair_to_dict(company, pair)
+            row["buildings"] = "|".join(row["buildings"])
+            writer.writerow([row[field] for field in EXPORT_FIELDS])
+            count += 1
+    else:
+        for company, pair in pairs:
+            output.write(json.dumps(pair_to_dict(company, pair), ensure_ascii=False))
+            output.write("\n")
+            count += 1
+    return count
+
+
+def main(argv=None):
+    """命令行入口"""
+    from company_core import CompanyRepository
+    from company_data import DEFAULT_INI_PATH
+
+    parser = argparse.ArgumentParser(description="公司建筑重叠与互补关系")
+    parser.add_argument("--ini", default=DEFAULT_INI_PATH, help="公司数据文件")
+    parser.add_argument(
+        "--overlay", action="append", default=[], help="覆盖层文件或目录，可重复"
+    )
+    parser.add_argument("--company", action="append", help="只输出这些公司的关系")
+    parser.add_argument("--min-shared", type=int, default=1, help="最少共享建筑数")
+    parser.add_argument("--top", type=int, help="每个公司最多输出的关系数")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    parser.add_argument("--output", help="输出文件，省略时输出到标准输出")
+    args = parser.parse_args(argv)
+
+    repo = CompanyRepository.load(args.ini, overlays=args.overlay)
+    matrix = repo.synergy()
+    for name in args.company or ():
+        if name not in matrix.index:
+            parser.error(f"公司不存在: {name}")
+
+    pairs = matrix.iter_pairs(args.min_shared, args.company)
+    if args.top:
+        pairs = _limit_per_company(pairs, args.top)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            export(pairs, f, args.format)
+    else:
+        export(pairs, sys.stdout, args.format)
+    return 0
+
+
+def _limit_per_company(pairs, top):
+    counts = {}
+    for company, pair in pairs:
+        counts[company] = counts.get(company, 0) + 1
+        if counts[company] <= top:
+            yield company, pair
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""数据文件监视
+
+FileWatcher 只比较文件（或目录）的 inode、mtime 和大小，开销很小，适合定时轮询。
+不依赖任何外部服务或第三方库。
+"""
+
+import os
+
+
+def file_signature(path):
+    """返回文件的 (inode, mtime, 大小)，文件不存在时返回None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class FileWatcher:
+    """轮询一个或多个文件（或目录）是否被修改"""
+
+    def __init__(self, *paths):
+        self.paths = paths
+        self.signature = self._signature()
+
+    def _signature(self):
+        return tuple(file_signature(path) for path in self.paths)
+
+    def changed(self):
+        """自上次检查以来是否有文件变化
+
+        第一个路径（基础数据文件）被删除时不算变化，等待重新写入；
+        其余路径被删除（例如移除了一个覆盖文件）算作变化。
+        """
+        signature = self._signature()
+        if signature[0] is None or signature == self.signature:
+            return False
+        self.signature = signature
+        return True
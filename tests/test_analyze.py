@@ -0,0 +1,40 @@
+"""company_analyze：不需要显示器的界面逻辑（使用基准测试的替身组件）"""
+
+import os
+import shutil
+
+import company_bench
+from company_core import CompanyRepository
+from company_watch import FileWatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INI_PATH = os.path.join(ROOT, "company.ini")
+
+
+def test_reload_during_row_prerendering(tmp_path):
+    ini_path = str(tmp_path / "company.ini")
+    shutil.copy(INI_PATH, ini_path)
+    app = company_bench._stub_analyzer(0.001)
+    app.search_var.set("")
+    repo = CompanyRepository.load(ini_path, use_cache=False)
+    app.apply_company_data(repo)
+    # 行文字的预生成在 after_idle 中分片执行，此时还没有开始
+    app.populate_company_list()
+
+    removed = repo.companies[-5:]
+    with open(ini_path, encoding="utf-8") as f:
+        text = f.read()
+    for name in removed:
+        start = text.index(f"[{name}]")
+        end = text.find("\n[", start)
+        text = text[:start] + (text[end + 1 :] if end >= 0 else "")
+    with open(ini_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    app._reloading = True
+    app.watcher = FileWatcher(ini_path)
+    app.apply_reload(repo.check_changes())
+    app.root.drain()
+
+    assert not set(removed) & set(repo.companies)
+    assert set(app.row_texts) == set(repo.companies)
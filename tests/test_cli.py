@@ -0,0 +1,59 @@
+"""company_cli：请求参数的校验"""
+
+import pytest
+
+from company_cli import handle_request
+from company_core import CompanyRepository
+
+
+def _repo():
+    info = {"特殊前置": None, "建筑_可选": None, "繁荣": ["+10%创新力"]}
+    return CompanyRepository(
+        {
+            "巴斯夫": {**info, "科技": "苯胺", "地块": "巴登", "建筑": ["化学合成厂"]},
+            "科汉森": {**info, "科技": None, "地块": "西兰", "建筑": ["食品厂"]},
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        {"op": "optimize", "slots": 0},
+        {"op": "optimize", "slots": 2, "weights": [1]},
+        {"op": "optimize", "slots": 2, "techs": "苯胺"},
+        {"op": "optimize", "slots": 2, "regions": "巴登"},
+        {"op": "optimize", "slots": 2, "required": "巴斯夫"},
+        {"op": "optimize", "slots": 2, "excluded": [1]},
+        {"op": "eligible", "techs": "苯胺"},
+        {"op": "eligible", "techs": [], "regions": "巴登"},
+        {"op": "eligible", "prereqs": {"a": 1}},
+        {"op": "compare", "selections": {"a": "巴斯夫"}},
+        {"op": "compare", "selections": {"a": ["巴斯夫"], "b": [1]}},
+    ],
+)
+def test_invalid_requests_raise_value_error(request_):
+    with pytest.raises(ValueError):
+        handle_request(_repo(), request_)
+
+
+def test_optimize_with_limits():
+    result = handle_request(
+        _repo(), {"op": "optimize", "slots": 2, "techs": [], "regions": ["西兰"]}
+    )
+    assert [s["companies"] for s in result["solutions"]] == [["科汉森"]]
+
+
+def test_eligible():
+    result = handle_request(
+        _repo(), {"op": "eligible", "techs": ["苯胺"], "regions": ["巴登"]}
+    )
+    assert result["companies"] == ["巴斯夫"]
+
+
+def test_compare():
+    result = handle_request(
+        _repo(), {"op": "compare", "selections": {"a": ["巴斯夫"], "b": ["科汉森"]}}
+    )
+    assert result["names"] == ["a", "b"]
+    assert result["rows"][0]["values"] == {"a": "1", "b": "1"}
@@ -0,0 +1,161 @@
+"""company_import：用 fixtures/game 中的合成脚本和本地化测试导入与刷新"""
+
+import os
+
+import pytest
+
+import company_cache
+import company_import
+from company_model import CompanyModel
+
+GAME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "game")
+
+EXISTING_INI = """;测试数据
+
+[测试化工]
+特殊前置 = "化工联合体"
+科技 = "苯胺"
+地块 = "巴登"
+建筑 = ["肥料厂"]
+建筑_可选 = NULL
+繁荣 = NULL
+名贵 = "德意志苯胺"
+特殊名贵 = True
+
+[手工公司]
+特殊前置 = NULL
+科技 = NULL
+地块 = "西兰"
+建筑 = ["食品厂"]
+建筑_可选 = NULL
+繁荣 = ["+5%畜牧场吞吐量"]
+名贵 = NULL
+特殊名贵 = False
+;手工维护的公司，导入时保持不变
+"""
+
+EXPECTED_INI = """;测试数据
+
+[测试化工]
+特殊前置 = "化工联合体"
+科技 = "苯胺"
+地块 = "巴登"
+建筑 = ["肥料厂","化学合成厂"]
+建筑_可选 = ["硫矿"]
+繁荣 = ["+2创新力","+5%油井吞吐量"]
+名贵 = "德意志苯胺"
+特殊名贵 = True
+
+[手工公司]
+特殊前置 = NULL
+科技 = NULL
+地块 = "西兰"
+建筑 = ["食品厂"]
+建筑_可选 = NULL
+繁荣 = ["+5%畜牧场吞吐量"]
+名贵 = NULL
+特殊名贵 = False
+;手工维护的公司，导入时保持不变
+
+[测试铁路]
+特殊前置 = NULL
+科技 = "铁路"
+地块 = "中匈牙利"
+建筑 = ["汽车工业"]
+建筑_可选 = NULL
+繁荣 = ["+10%铁路吞吐量"]
+名贵 = NULL
+特殊名贵 = False
+
+"""
+
+
+def _import():
+    localization = company_import.read_localization(
+        company_import.expand_paths(
+            [os.path.join(GAME_DIR, "localization", "simp_chinese")], "*.yml"
+        )
+    )
+    files = company_import.expand_paths(
+        [os.path.join(GAME_DIR, "common", "company_types")], "*.txt"
+    )
+    return company_import.import_companies(files, localization)
+
+
+def _cached_model(ini_path):
+    cached = company_cache.load(ini_path)
+    return None if cached is None else CompanyModel.from_state(cached["model"])
+
+
+def test_localization_reads_only_the_requested_language():
+    paths = company_import.expand_paths(
+        [os.path.join(GAME_DIR, "localization")], "*.yml"
+    )
+    table = company_import.read_localization(paths)
+    assert table["company_test_chemicals"] == "测试化工"
+    assert company_import.localize(table, "railways") == "铁路"
+    assert "Test Chemicals" not in table.values()
+
+
+def test_import_companies():
+    companies = _import()
+    # 不是块的顶层条目被跳过
+    assert list(companies) == ["测试化工", "测试铁路"]
+    assert companies["测试化工"] == {
+        "特殊前置": None,
+        "科技": "苯胺",
+        "地块": "巴登",
+        "建筑": ["肥料厂", "化学合成厂"],
+        "建筑_可选": ["硫矿"],
+        "繁荣": ["+2创新力", "+5%油井吞吐量"],
+        "名贵": "德意志苯胺",
+        "特殊名贵": False,
+    }
+    rail = companies["测试铁路"]
+    # 地块取自 preferred_headquarters；无法解析数值的繁荣效果被跳过
+    assert rail["地块"] == "中匈牙利"
+    assert rail["繁荣"] == ["+10%铁路吞吐量"]
+    assert rail["建筑_可选"] is None
+
+
+def test_refresh_ini_text():
+    text, added, updated = company_import.refresh_ini_text(EXISTING_INI, _import())
+    assert text == EXPECTED_INI
+    assert (added, updated) == (1, 1)
+    # 再次导入没有变化
+    assert company_import.refresh_ini_text(text, _import()) == (text, 0, 0)
+
+
+def test_main_refreshes_ini_and_cache(tmp_path):
+    ini_path = str(tmp_path / "company.ini")
+    with open(ini_path, "w", encoding="utf-8") as f:
+        f.write(EXISTING_INI)
+    assert company_import.main(["--game-dir", GAME_DIR, "--ini", ini_path]) == 0
+
+    with open(ini_path, encoding="utf-8") as f:
+        assert f.read() == EXPECTED_INI
+    model = _cached_model(ini_path)
+    assert sorted(model) == ["手工公司", "测试化工", "测试铁路"]
+    assert model["测试化工"]["建筑"] == ["肥料厂", "化学合成厂"]
+
+
+def test_refresh_replaces_stale_cache(tmp_path):
+    ini_path = str(tmp_path / "company.ini")
+    companies = _import()
+    company_import.refresh_ini(ini_path, companies)
+    assert _cached_model(ini_path)["测试铁路"]["名贵"] is None
+
+    companies["测试铁路"] = dict(companies["测试铁路"], 名贵="精密工具")
+    company_import.refresh_ini(ini_path, companies, rebuild_cache=False)
+    # 不重建时旧缓存因文件变化而失效，不会被使用
+    assert _cached_model(ini_path) is None
+
+    company_import.refresh_ini(ini_path, companies)
+    assert _cached_model(ini_path)["测试铁路"]["名贵"] == "精密工具"
+
+
+@pytest.mark.parametrize("text", ["", "@x = 1\n", "company_a = yes\n"])
+def test_import_skips_files_without_companies(tmp_path, text):
+    path = tmp_path / "empty.txt"
+    path.write_text(text, encoding="utf-8")
+    assert company_import.import_companies([str(path)], {}) == {}
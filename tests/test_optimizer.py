@@ -0,0 +1,34 @@
+"""company_optimizer：前 k 个组合"""
+
+from company_model import CompanyModel
+from company_optimizer import PortfolioOptimizer
+
+
+def _optimizer():
+    info = {"特殊前置": None, "科技": None, "地块": None, "建筑_可选": None}
+    return PortfolioOptimizer(
+        CompanyModel(
+            {
+                "甲": {**info, "建筑": ["炼钢厂"], "繁荣": ["+10%创新力"]},
+                "乙": {**info, "建筑": ["铁矿"], "繁荣": ["+5%创新力"]},
+                "丙": {**info, "建筑": ["煤矿"], "繁荣": ["+3%创新力"]},
+                "丁": {**info, "建筑": ["食品厂"], "繁荣": ["+1%创新力"]},
+            }
+        )
+    )
+
+
+def test_top_k_has_no_partial_prefixes():
+    result = _optimizer().optimize(2, weights={"创新力": 1}, top_k=4)
+    combos = [set(solution.companies) for solution in result.solutions]
+    assert combos[0] == {"甲", "乙"}
+    # 每个结果都用满了两个位置，不会出现 {甲} 这样的前缀
+    assert all(len(combo) == 2 for combo in combos)
+    assert len(combos) == 4
+
+
+def test_short_combination_when_nothing_else_helps():
+    result = _optimizer().optimize(
+        3, weights={"创新力": 1}, excluded=["乙", "丙", "丁"], top_k=3
+    )
+    assert [solution.companies for solution in result.solutions] == [["甲"]]
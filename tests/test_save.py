@@ -0,0 +1,129 @@
+"""company_save：用 fixtures/saves 中的合成存档测试分段扫描和对照"""
+
+import os
+import time
+import zipfile
+
+import pytest
+
+from company_import import block_get, parse_script
+from company_model import CompanyModel
+from company_save import (
+    CHUNK_SIZE,
+    SaveState,
+    iter_save_chunks,
+    match_save,
+    read_save,
+    scan_save,
+)
+
+SAVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "saves")
+PLAIN_SAVE = os.path.join(SAVE_DIR, "plain.v3")
+ZIPPED_SAVE = os.path.join(SAVE_DIR, "zipped.v3")
+
+with open(PLAIN_SAVE, "rb") as _f:
+    _GAMESTATE = _f.read()
+
+# 分段大小：逐字节、较小的段、在 companies={ 中间切开的段，以及默认大小
+_HEADER = _GAMESTATE.index(b"companies={")
+CHUNK_SIZES = (
+    1,
+    7,
+    64,
+    _HEADER + len(b"compa"),
+    _HEADER + len(b"companies="),
+    CHUNK_SIZE,
+)
+
+LOCALIZATION = {
+    "company_basf": "巴斯夫",
+    "company_unknown": "不存在的公司",
+    "aniline": "苯胺",
+    "railways": "铁路",
+    "steelworking": "炼钢",
+    "STATE_BADEN": "巴登",
+    "STATE_WEST_PRUSSIA": "西普鲁士",
+}
+
+
+def _model():
+    info = {"特殊前置": None, "建筑": ["化学合成厂"], "建筑_可选": None, "繁荣": None}
+    return CompanyModel(
+        {
+            "巴斯夫": {**info, "科技": "苯胺", "地块": "巴登"},
+            "莱茵钢铁": {**info, "科技": "铁路", "地块": "巴登"},
+            "科汉森": {**info, "科技": None, "地块": "西兰"},
+            "克虏伯": {**info, "科技": "炼钢", "地块": None},
+            "通用公司": {**info, "科技": None, "地块": None},
+        }
+    )
+
+
+def test_zip_fixture_wraps_the_plain_gamestate():
+    with zipfile.ZipFile(ZIPPED_SAVE) as archive:
+        assert archive.read("gamestate") == _GAMESTATE
+
+
+@pytest.mark.parametrize("path", [PLAIN_SAVE, ZIPPED_SAVE])
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_scan_is_independent_of_chunk_size(path, chunk_size):
+    expected = list(scan_save([_GAMESTATE]))
+    assert list(scan_save(iter_save_chunks(path, chunk_size))) == expected
+
+    companies = [
+        block_get(parse_script(body.decode("utf-8")), "company_type")
+        for block_path, body in expected
+        if block_path[0] == "companies"
+    ]
+    # 字符串中的花括号不影响层级，database 中的 none 不是块
+    assert companies == ["company_basf", "company_unknown"]
+
+
+@pytest.mark.parametrize("path", [PLAIN_SAVE, ZIPPED_SAVE])
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_read_save(path, chunk_size):
+    assert read_save(path, chunk_size=chunk_size) == SaveState(
+        "1", "DEU", {"company_basf"}, {"aniline", "railways"}, {"STATE_BADEN"}
+    )
+    assert read_save(path, "GBR", chunk_size) == SaveState(
+        "0", "GBR", {"company_unknown"}, {"steelworking"}, {"STATE_WEST_PRUSSIA"}
+    )
+
+
+@pytest.mark.parametrize("path", [PLAIN_SAVE, ZIPPED_SAVE])
+def test_match_save_selection(path):
+    model = _model()
+    result = match_save(model, read_save(path, chunk_size=1), LOCALIZATION)
+    # 已建立的公司预先选中；不在数据中的公司被忽略
+    assert result.owned == {"巴斯夫"}
+    # 科汉森缺少地块，克虏伯缺少科技
+    assert result.unavailable == {"科汉森", "克虏伯"}
+    assert set(result.eligibility.names()) == {"巴斯夫", "莱茵钢铁", "通用公司"}
+
+
+def test_binary_save_is_rejected(tmp_path):
+    path = tmp_path / "binary.v3"
+    path.write_bytes(b"SAV01\x00\x00\x01" + bytes(64))
+    with pytest.raises(ValueError):
+        read_save(str(path))
+
+
+def test_many_blocks_scan_in_linear_time(tmp_path):
+    # 2万个州的存档约 1.8MB；每个块都重新扫描整段剩余内容时需要数十秒
+    count = 20000
+    parts = ["played_country={\n\tcountry=1\n}\n", "states={\n\tdatabase={\n"]
+    for i in range(count):
+        parts.append(
+            f"\t\t{i}={{\n\t\t\tcountry={i % 7}\n"
+            f'\t\t\tregion="s:STATE_{i}"\n'
+            "\t\t\tpop_statistics={ a=1 b={ c=2 } }\n\t\t}\n"
+        )
+    parts.append("\t}\n}\n")
+    path = tmp_path / "many_states.v3"
+    path.write_text("".join(parts), encoding="utf-8")
+
+    start = time.perf_counter()
+    state = read_save(str(path))
+    elapsed = time.perf_counter() - start
+    assert state.regions == {f"STATE_{i}" for i in range(1, count, 7)}
+    assert elapsed < 8.0
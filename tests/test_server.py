@@ -0,0 +1,110 @@
+"""company_server：请求错误时的状态码和错误信息"""
+
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+import pytest
+
+import company_server
+from company_core import CompanyRepository
+from company_server import HTTPError, QueryServer
+
+
+def _server():
+    info = {"特殊前置": None, "地块": None, "建筑_可选": None, "繁荣": ["+10%创新力"]}
+    repo = CompanyRepository(
+        {
+            "巴斯夫": {**info, "科技": "苯胺", "建筑": ["化学合成厂"]},
+            "科汉森": {**info, "科技": None, "建筑": ["食品厂"]},
+        }
+    )
+    return QueryServer(repo, watch=False)
+
+
+def _query(server, request):
+    body = json.dumps(request, ensure_ascii=False).encode("utf-8")
+    return asyncio.run(server.respond("POST", "/query", {}, body))
+
+
+@pytest.mark.parametrize(
+    "request_, message",
+    [
+        ({"op": "optimize", "slots": 2, "weights": [1]}, "weights"),
+        ({"op": "optimize", "slots": 0}, "slots"),
+        ({"op": "optimize"}, "slots"),
+        ({"op": "search", "query": {"a": 1}}, "query"),
+        ({"op": "company", "name": ["巴斯夫"]}, "name"),
+        ({"op": "aggregate", "companies": "巴斯夫"}, "companies"),
+    ],
+)
+def test_invalid_requests_return_400(request_, message):
+    with pytest.raises(HTTPError) as info:
+        _query(_server(), request_)
+    assert info.value.status == HTTPStatus.BAD_REQUEST
+    assert message in str(info.value)
+
+
+def test_key_error_names_the_field(monkeypatch):
+    def handle_request(repo, request):
+        return request["missing"]
+
+    monkeypatch.setattr(company_server, "handle_request", handle_request)
+    with pytest.raises(HTTPError) as info:
+        _query(_server(), {"op": "search"})
+    assert info.value.status == HTTPStatus.BAD_REQUEST
+    assert str(info.value) == "缺少或无效的字段: missing"
+
+
+def test_unexpected_error_returns_500(monkeypatch):
+    def handle_request(repo, request):
+        raise AttributeError("boom")
+
+    monkeypatch.setattr(company_server, "handle_request", handle_request)
+    with pytest.raises(HTTPError) as info:
+        _query(_server(), {"op": "optimize", "slots": 1})
+    assert info.value.status == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def test_connection_gets_a_response_on_unexpected_error(monkeypatch):
+    server = _server()
+
+    async def respond(method, target, headers, body):
+        raise AttributeError("boom")
+
+    monkeypatch.setattr(server, "respond", respond)
+
+    async def run():
+        listener = await asyncio.start_server(server.handle_client, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /search?q=x HTTP/1.1\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    response = asyncio.run(run())
+    assert response.startswith(b"HTTP/1.1 500 ")
+    assert "服务器内部错误".encode("utf-8") in response
+
+
+def test_valid_query():
+    status, _, payload = _query(_server(), {"op": "search", "query": "科技:苯胺"})
+    assert status == HTTPStatus.OK
+    assert json.loads(payload)["companies"] == ["巴斯夫"]
+
+
+@pytest.mark.parametrize("op", ["optimize", "synergy", "eligible", "compare"])
+def test_slow_ops_run_off_the_event_loop(monkeypatch, op):
+    threads = []
+
+    def handle_request(repo, request):
+        threads.append(threading.current_thread())
+        return {"op": request["op"]}
+
+    monkeypatch.setattr(company_server, "handle_request", handle_request)
+    _query(_server(), {"op": op})
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,39 @@
+"""company_synergy：公司之间的建筑重叠"""
+
+from company_model import CompanyModel
+from company_synergy import SynergyMatrix
+
+
+def _matrix():
+    info = {"科技": None, "地块": None, "建筑_可选": None, "繁荣": None}
+    return SynergyMatrix(
+        CompanyModel(
+            {
+                "甲": {**info, "建筑": ["炼钢厂", "铁矿"]},
+                "乙": {**info, "建筑": ["炼钢厂", "煤矿"]},
+                "丙": {**info, "建筑": ["铁矿", "煤矿"]},
+                "丁": {**info, "建筑": ["食品厂"]},
+            }
+        )
+    )
+
+
+def _pairs(pairs):
+    return sorted(tuple(sorted((name, pair.other))) for name, pair in pairs)
+
+
+def test_iter_pairs_yields_each_pair_once():
+    pairs = _pairs(_matrix().iter_pairs())
+    assert pairs == [("丙", "乙"), ("丙", "甲"), ("乙", "甲")]
+
+
+def test_iter_pairs_with_companies():
+    matrix = _matrix()
+    # 两个公司都在其中的关系只出现一次，对方不在其中的关系保留
+    assert _pairs(matrix.iter_pairs(companies=["甲", "乙"])) == [
+        ("丙", "乙"),
+        ("丙", "甲"),
+        ("乙", "甲"),
+    ]
+    assert _pairs(matrix.iter_pairs(companies=["丁"])) == []
+    assert _pairs(matrix.iter_pairs(companies=["甲"])) == [("丙", "甲"), ("乙", "甲")]